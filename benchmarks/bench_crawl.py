@@ -0,0 +1,190 @@
+"""
+End-to-end crawl benchmark against the synthetic shop.
+
+Starts synthetic_shop.py in its own process and crawls it in the async
+mode (one EcommerceCrawler) and the parallel mode (ParallelCrawler with
+the shop sharded across --processes workers). Each mode runs in a fresh
+process so its CPU time and peak RSS can be measured on their own.
+
+Reported per mode: pages/s, products/s, catalog coverage, p50/p99 time to
+first byte (from the crawler's request metrics), CPU seconds (including
+worker processes, as reported by the workers themselves) and peak RSS of
+the largest process. With --start-method forkserver the fork server is
+started before the timed region.
+
+Usage:
+    python benchmarks/bench_crawl.py [--modes async parallel] [--concurrency N] ...
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from crawler.crawler import EcommerceCrawler  # noqa: E402
+from crawler.parallel_crawler import ParallelCrawler  # noqa: E402
+from crawler.utils.metrics import histogram_quantile, merge_snapshots  # noqa: E402
+from crawler.utils.processes import (  # noqa: E402
+    START_METHODS,
+    get_process_context,
+    set_start_method,
+)
+from synthetic_shop import (  # noqa: E402
+    ShopConfig,
+    add_shop_arguments,
+    shop_config_from_args,
+    start_shop,
+)
+
+MODES = ("async", "parallel")
+
+def add_crawl_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--concurrency', type=int, default=20, help='Concurrent requests per process')
+    parser.add_argument('--processes', type=int, default=2, help='Worker processes in parallel mode')
+    parser.add_argument('--frontier', choices=['best-first', 'bfs'], default='best-first')
+    parser.add_argument('--crawl-parser', choices=['stream', 'soup'], default='stream')
+    parser.add_argument(
+        '--start-method',
+        choices=START_METHODS,
+        default='default',
+        help='How parallel-mode workers are started'
+    )
+
+def _cpu_seconds(usage) -> float:
+    return usage.ru_utime + usage.ru_stime
+
+def _rss_mb(max_rss: int) -> float:
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+def _run_mode(
+    mode: str, domain: str, config: dict, processes: int, start_method: str, results
+) -> None:
+    logging.getLogger().setLevel(logging.WARNING)
+    set_start_method(start_method)
+    if mode == "parallel":
+        # Start a fork server, if any, outside the timed region
+        get_process_context()
+    self_before = resource.getrusage(resource.RUSAGE_SELF)
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+
+    if mode == "async":
+        crawler = EcommerceCrawler(**config)
+        crawl_results = asyncio.run(crawler.crawl_domains([domain]))
+        snapshot = crawler.metrics.snapshot()
+    else:
+        crawler = ParallelCrawler(
+            max_processes=processes,
+            shard_domains=[domain],
+            **config
+        )
+        crawl_results = crawler.crawl([domain])
+        snapshot = merge_snapshots(crawler.metrics_snapshots.values())
+
+    elapsed = time.perf_counter() - start
+    self_after = resource.getrusage(resource.RUSAGE_SELF)
+    children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    cpu_seconds = _cpu_seconds(self_after) - _cpu_seconds(self_before)
+    peak_rss_mb = _rss_mb(self_after.ru_maxrss)
+    if mode == "async":
+        cpu_seconds += _cpu_seconds(children_after) - _cpu_seconds(children_before)
+        peak_rss_mb = max(peak_rss_mb, _rss_mb(children_after.ru_maxrss))
+    else:
+        # Workers forked by a fork server are not children of this
+        # process, so they report their own usage
+        for usage in crawler.worker_usage.values():
+            cpu_seconds += usage.get("cpu_seconds", 0.0)
+            peak_rss_mb = max(peak_rss_mb, usage.get("peak_rss_mb", 0.0))
+
+    stats = crawl_results[domain].get("stats", {})
+    ttfb = snapshot["hosts"].get(domain, {}).get("phases", {}).get("ttfb")
+    quantiles = {}
+    for name, q in (("p50", 0.5), ("p99", 0.99)):
+        value = histogram_quantile(ttfb, snapshot["buckets"], q) if ttfb else None
+        quantiles[f"latency_{name}_ms"] = value * 1000 if value is not None else None
+
+    results.put({
+        "seconds": elapsed,
+        "pages": stats.get("total_urls_visited", 0),
+        "products": stats.get("total_urls_found", 0),
+        "pages_per_second": stats.get("total_urls_visited", 0) / elapsed,
+        "products_per_second": stats.get("total_urls_found", 0) / elapsed,
+        **quantiles,
+        "cpu_seconds": cpu_seconds,
+        "peak_rss_mb": peak_rss_mb,
+        "error": crawl_results[domain].get("error"),
+    })
+
+def run_crawl_benchmarks(shop: ShopConfig, args: argparse.Namespace) -> dict:
+    """
+    Run each of args.modes against a freshly started shop.
+
+    Returns:
+        dict: Mode name to its measurements
+    """
+    pages_per_category = -(-shop.products_per_category // shop.page_size)
+    measurements = {}
+    for mode in args.modes:
+        # A new server per mode so every run sees the same attempt counters
+        server, domain = start_shop(shop)
+        try:
+            with tempfile.TemporaryDirectory() as output_dir:
+                config = {
+                    "max_concurrent_requests": args.concurrency,
+                    "crawl_delay": 0,
+                    "max_depth": pages_per_category + 2,
+                    "retry_delay": 0.05,
+                    "output_dir": output_dir,
+                    "parser": args.crawl_parser,
+                    "frontier_mode": args.frontier,
+                }
+                results = multiprocessing.Queue()
+                process = multiprocessing.Process(
+                    target=_run_mode,
+                    args=(mode, domain, config, args.processes, args.start_method, results)
+                )
+                process.start()
+                measurement = results.get()
+                process.join()
+        finally:
+            server.terminate()
+            server.join()
+        measurement["coverage"] = measurement["products"] / shop.catalog_size
+        measurements[mode] = measurement
+    return measurements
+
+def print_crawl_results(measurements: dict) -> None:
+    for mode, m in measurements.items():
+        latency = (
+            f"ttfb p50 {m['latency_p50_ms']:.1f} ms, p99 {m['latency_p99_ms']:.1f} ms"
+            if m["latency_p50_ms"] is not None else "no latency data"
+        )
+        print(
+            f"{mode:>9}: {m['pages_per_second']:8.1f} pages/s, {m['products_per_second']:9.1f} products/s, "
+            f"coverage {m['coverage']:.1%}, {latency}, cpu {m['cpu_seconds']:.2f}s, "
+            f"peak rss {m['peak_rss_mb']:.0f} MB"
+        )
+        if m["error"]:
+            print(f"{'':>11}error: {m['error']}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark crawl modes against the synthetic shop')
+    add_shop_arguments(parser)
+    add_crawl_arguments(parser)
+    args = parser.parse_args()
+    shop = shop_config_from_args(args)
+    print(f"Synthetic shop: {shop.catalog_size} products")
+    print_crawl_results(run_crawl_benchmarks(shop, args))
+
+if __name__ == "__main__":
+    main()
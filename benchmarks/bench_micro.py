@@ -0,0 +1,97 @@
+"""
+Micro-benchmarks for the hot per-link and per-page functions.
+
+Measures is_product_url, extract_product_id and both link extraction
+backends on synthetic inputs (the URL mix of bench_url_patterns.py and
+the listing pages of bench_parse_modes.py). The best of --repeat runs is
+reported.
+
+Usage:
+    python benchmarks/bench_micro.py [--urls N] [--repeat N] [--extract-page-kb N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from crawler.utils.link_extractor import extract_links  # noqa: E402
+from crawler.utils.url_patterns import (  # noqa: E402
+    extract_product_id,
+    get_default_classifier,
+    is_product_url,
+)
+from bench_parse_modes import make_page  # noqa: E402
+from bench_url_patterns import make_urls  # noqa: E402
+
+def add_micro_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--urls', type=int, default=50000, help='URLs per classification run')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per benchmark (best is reported)')
+    parser.add_argument('--extract-pages', type=int, default=20, help='Pages per link extraction run')
+    parser.add_argument('--extract-page-kb', type=int, default=256, help='Size of each page in KB')
+
+def best_time(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run_micro_benchmarks(args: argparse.Namespace) -> dict:
+    """
+    Returns:
+        dict: Benchmark name to {"seconds", "ops_per_second", ...}
+    """
+    results = {}
+    urls = make_urls(args.urls)
+
+    def url_benchmark(name, func, reset=None):
+        def run():
+            if reset is not None:
+                reset()
+            for url in urls:
+                func(url)
+        seconds = best_time(run, args.repeat)
+        results[name] = {"seconds": seconds, "ops_per_second": len(urls) / seconds}
+
+    # Cold: the classifier's path cache is cleared before every run
+    classifier = get_default_classifier()
+    url_benchmark("is_product_url_cold", is_product_url, classifier.cache_clear)
+    url_benchmark("is_product_url", is_product_url)
+    url_benchmark("extract_product_id", extract_product_id)
+
+    pages = [make_page(i, args.extract_page_kb) for i in range(args.extract_pages)]
+    megabytes = sum(len(page) for page in pages) / (1024 * 1024)
+    for parser in ("stream", "soup"):
+        links = 0
+
+        def run():
+            nonlocal links
+            links = sum(len(extract_links(page, "utf-8", parser)) for page in pages)
+
+        seconds = best_time(run, args.repeat)
+        results[f"extract_links_{parser}"] = {
+            "seconds": seconds,
+            "ops_per_second": len(pages) / seconds,
+            "links_per_second": links / seconds,
+            "mb_per_second": megabytes / seconds,
+        }
+    return results
+
+def print_micro_results(results: dict) -> None:
+    for name, result in results.items():
+        line = f"{name:>22}: {result['ops_per_second']:12,.0f} ops/s"
+        if "mb_per_second" in result:
+            line += f" ({result['mb_per_second']:.1f} MB/s, {result['links_per_second']:,.0f} links/s)"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmarks for URL classification and link extraction')
+    add_micro_arguments(parser)
+    print_micro_results(run_micro_benchmarks(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Compare inline (event loop) parsing with the process-pool parse mode.
+
+Simulated fetches hand synthetic HTML pages to either parse_page on the
+event loop or to a ParsePool. The script reports pages/sec and the worst
+event loop lag seen by a heartbeat task, which is what starves sockets
+during a real crawl.
+
+Usage:
+    python benchmarks/bench_parse_modes.py [--pages N] [--page-kb N] [--workers N]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from crawler.parsing import ParsePool, parse_page  # noqa: E402
+
+DOMAIN = "shop.example.com"
+
+def make_page(index: int, size_kb: int) -> bytes:
+    """
+    Build a listing-style page of roughly size_kb kilobytes.
+    """
+    parts = ["<html><head><title>Listing</title></head><body>"]
+    size = 0
+    n = 0
+    while size < size_kb * 1024:
+        chunk = (
+            f'<div class="tile"><a href="/products/item-{index}-{n}">Item {n}</a>'
+            f'<span class="price">{n % 97}.99</span>'
+            f'<a href="/category/c{n % 20}?page={n % 7}">More</a></div>\n'
+        )
+        parts.append(chunk)
+        size += len(chunk)
+        n += 1
+    parts.append("</body></html>")
+    return "".join(parts).encode()
+
+async def heartbeat(interval: float, lags: list) -> None:
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+async def run(pages, concurrency: int, parse_pool=None) -> dict:
+    lags = []
+    beat = asyncio.create_task(heartbeat(0.005, lags))
+    queue = asyncio.Queue()
+    for page in pages:
+        queue.put_nowait(page)
+
+    async def worker():
+        while not queue.empty():
+            body = queue.get_nowait()
+            await asyncio.sleep(0.001)  # stand-in for network I/O
+            base_url = f"https://{DOMAIN}/category/listing"
+            if parse_pool is not None:
+                await parse_pool.parse(body, "utf-8", base_url, DOMAIN, "stream")
+            else:
+                parse_page(body, "utf-8", base_url, DOMAIN, "stream")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    beat.cancel()
+
+    return {
+        "seconds": elapsed,
+        "pages_per_second": len(pages) / elapsed,
+        "max_loop_lag_ms": max(lags, default=0.0) * 1000,
+    }
+
+async def main_async(args) -> None:
+    pages = [make_page(i, args.page_kb) for i in range(args.pages)]
+
+    inline = await run(pages, args.concurrency)
+    async with ParsePool(args.workers) as parse_pool:
+        # Warm up the worker processes before timing
+        await asyncio.gather(*(
+            parse_pool.parse(pages[0], "utf-8", f"https://{DOMAIN}/", DOMAIN, "stream")
+            for _ in range(args.workers)
+        ))
+        pooled = await run(pages, args.concurrency, parse_pool)
+
+    print(f"{args.pages} pages of ~{args.page_kb} KB, concurrency {args.concurrency}")
+    for name, result in (("inline", inline), (f"pool x{args.workers}", pooled)):
+        print(
+            f"{name:>10}: {result['pages_per_second']:8.1f} pages/s, "
+            f"max loop lag {result['max_loop_lag_ms']:7.1f} ms"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark inline vs process-pool parsing')
+    parser.add_argument('--pages', type=int, default=200, help='Number of pages to parse')
+    parser.add_argument('--page-kb', type=int, default=1024, help='Approximate page size in KB')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='Parse pool size')
+    parser.add_argument('--concurrency', type=int, default=10, help='Concurrent simulated fetches')
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Startup benchmarks: import time, crawler initialization and worker
+process start.
+
+Import times are measured in a fresh interpreter per module. Crawler
+initialization covers EcommerceCrawler() and the first request headers,
+which load the User-Agent pool. Worker start is the time until
+--startup-processes new processes have imported the crawler and loaded the
+User-Agent pool, for every available start method; "forkserver" uses the
+crawler's preloading fork server (see set_start_method()), and its
+first run, which also starts the server, is reported as
+"forkserver_cold". The best of --repeat runs is reported.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat N] [--startup-processes N]
+"""
+
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+from crawler.utils.processes import get_process_context, set_start_method  # noqa: E402
+
+# Modules whose import time is tracked, heaviest dependencies first
+IMPORTED_MODULES = (
+    "aiohttp",
+    "bs4",
+    "fake_useragent",
+    "crawler.crawler",
+    "crawler.parallel_crawler",
+    "crawler.distributed",
+)
+
+INIT_SCRIPT = """
+import sys, tempfile, time
+sys.path.insert(0, {src!r})
+from crawler.crawler import EcommerceCrawler
+start = time.perf_counter()
+crawler = EcommerceCrawler(output_dir=tempfile.mkdtemp())
+crawler._request_headers("example.com")
+print(time.perf_counter() - start)
+"""
+
+def add_startup_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        '--startup-processes',
+        type=int,
+        default=4,
+        help='Worker processes started per start-method run'
+    )
+    parser.add_argument('--startup-repeat', type=int, default=3, help='Runs per startup benchmark (best is reported)')
+
+def _run_python(code: str) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+def _import_seconds(module: str) -> float:
+    return _run_python(
+        f"import sys, time; sys.path.insert(0, {SRC_DIR!r}); "
+        f"start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    )
+
+def _worker_ready(ready) -> None:
+    from crawler.crawler import EcommerceCrawler  # noqa: F401
+    from crawler.utils.user_agents import get_user_agent_pool
+    get_user_agent_pool()
+    ready.put(os.getpid())
+
+def _start_workers(context, count: int) -> float:
+    ready = context.Queue()
+    start = time.perf_counter()
+    processes = [context.Process(target=_worker_ready, args=(ready,)) for _ in range(count)]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.get()
+    seconds = time.perf_counter() - start
+    for process in processes:
+        process.join()
+    return seconds
+
+def run_startup_benchmarks(args: argparse.Namespace) -> dict:
+    """
+    Returns:
+        dict: Benchmark name to {"seconds"}
+    """
+    results = {}
+    for module in IMPORTED_MODULES:
+        seconds = min(_import_seconds(module) for _ in range(args.startup_repeat))
+        results[f"import_{module}"] = {"seconds": seconds}
+
+    seconds = min(
+        _run_python(INIT_SCRIPT.format(src=SRC_DIR)) for _ in range(args.startup_repeat)
+    )
+    results["crawler_init"] = {"seconds": seconds}
+
+    contexts = {
+        method: multiprocessing.get_context(method)
+        for method in multiprocessing.get_all_start_methods()
+        if method != "forkserver"
+    }
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        set_start_method("forkserver")
+        context = get_process_context()
+        results["forkserver_cold"] = {"seconds": _start_workers(context, args.startup_processes)}
+        contexts["forkserver"] = context
+    for method, context in contexts.items():
+        seconds = min(
+            _start_workers(context, args.startup_processes) for _ in range(args.startup_repeat)
+        )
+        results[f"start_workers_{method}"] = {"seconds": seconds}
+    return results
+
+def print_startup_results(results: dict) -> None:
+    for name, result in results.items():
+        print(f"{name:>32}: {result['seconds'] * 1000:10.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description='Import, initialization and worker start benchmarks')
+    add_startup_arguments(parser)
+    print_startup_results(run_startup_benchmarks(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
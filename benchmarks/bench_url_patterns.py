@@ -0,0 +1,97 @@
+"""
+Micro-benchmark for product URL classification.
+
+Compares the original per-call implementation of is_product_url (which
+recompiled every pattern on each call) against ProductUrlClassifier.
+
+Usage:
+    python benchmarks/bench_url_patterns.py [--urls N] [--repeat N]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from crawler.utils.url_patterns import (  # noqa: E402
+    PRODUCT_URL_PATTERNS,
+    NON_PRODUCT_PREFIXES,
+    ProductUrlClassifier,
+)
+
+def legacy_is_product_url(url: str) -> bool:
+    """
+    The pre-classifier implementation, kept here as the baseline.
+    """
+    path = urlparse(url).path.lower()
+    if any(path.startswith(prefix) for prefix in NON_PRODUCT_PREFIXES):
+        return False
+    patterns = [re.compile(pattern, re.IGNORECASE) for pattern in PRODUCT_URL_PATTERNS]
+    return any(pattern.search(path) is not None for pattern in patterns)
+
+def make_urls(count: int, seed: int = 42) -> list:
+    """
+    Build a link mix resembling a category page: many repeated navigation
+    links plus a long tail of product and listing URLs.
+    """
+    rng = random.Random(seed)
+    templates = [
+        "/products/item-{n}",
+        "/p/{n}",
+        "/dp/B0{n:08d}",
+        "/collections/shoes/shoe-{n}-p-{n}",
+        "/category/shoes?page={n}",
+        "/blog/post-{n}",
+        "/help/article-{n}",
+        "/shop/dept/{n}",
+        "/",
+        "/cart",
+        "/account/login",
+    ]
+    urls = []
+    for _ in range(count):
+        template = rng.choice(templates)
+        urls.append("https://shop.example.com" + template.format(n=rng.randint(1, count // 4 or 1)))
+    return urls
+
+def timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark product URL classification')
+    parser.add_argument('--urls', type=int, default=50000, help='Number of URLs per run')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of runs (best is reported)')
+    args = parser.parse_args()
+
+    urls = make_urls(args.urls)
+
+    classifier = ProductUrlClassifier()
+    expected = [legacy_is_product_url(url) for url in urls]
+    if classifier.classify_urls(urls) != expected:
+        sys.exit("ProductUrlClassifier disagrees with the legacy implementation")
+
+    legacy = min(
+        timed(lambda: [legacy_is_product_url(url) for url in urls])
+        for _ in range(args.repeat)
+    )
+    # A fresh classifier per run so the first pass pays for cache misses
+    cold = min(
+        timed(ProductUrlClassifier().classify_urls, urls)
+        for _ in range(args.repeat)
+    )
+    warm = min(timed(classifier.classify_urls, urls) for _ in range(args.repeat))
+
+    print(f"URLs per run:            {len(urls)}")
+    print(f"legacy is_product_url:   {legacy:.3f}s ({len(urls) / legacy:,.0f} urls/s)")
+    print(f"classifier (cold cache): {cold:.3f}s ({len(urls) / cold:,.0f} urls/s, {legacy / cold:.1f}x)")
+    print(f"classifier (warm cache): {warm:.3f}s ({len(urls) / warm:,.0f} urls/s, {legacy / warm:.1f}x)")
+
+if __name__ == "__main__":
+    main()
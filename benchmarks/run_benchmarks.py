@@ -0,0 +1,132 @@
+"""
+Run the benchmark suite and compare it against a saved baseline.
+
+Runs the micro-benchmarks (bench_micro.py), the startup benchmarks
+(bench_startup.py) and the crawl benchmarks against the synthetic shop
+(bench_crawl.py), prints the results and
+optionally saves them as JSON. With --baseline, every measurement is
+compared with the same one in an earlier results file.
+
+Usage:
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --baseline results.json [--skip-crawl]
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+from dataclasses import asdict
+from datetime import datetime
+
+from bench_crawl import add_crawl_arguments, print_crawl_results, run_crawl_benchmarks
+from bench_micro import add_micro_arguments, print_micro_results, run_micro_benchmarks
+from bench_startup import add_startup_arguments, print_startup_results, run_startup_benchmarks
+from synthetic_shop import add_shop_arguments, shop_config_from_args
+
+# Measurements where a smaller value is an improvement
+LOWER_IS_BETTER = ("seconds", "latency_p50_ms", "latency_p99_ms", "cpu_seconds", "peak_rss_mb")
+
+# Measurements that describe the run rather than its speed
+NOT_COMPARED = ("pages", "products", "coverage", "error")
+
+def _flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def compare(current: dict, baseline: dict, threshold: float) -> int:
+    """
+    Print the relative change of every measurement found in both runs.
+
+    Returns:
+        int: Number of measurements that got worse by more than threshold
+    """
+    sections = ("micro", "startup", "crawl")
+    current_flat = _flatten({section: current.get(section, {}) for section in sections})
+    baseline_flat = _flatten({section: baseline.get(section, {}) for section in sections})
+    regressions = 0
+    print(f"\nCompared with baseline from {baseline.get('created', 'unknown')}:")
+    for name, value in current_flat.items():
+        metric = name.rsplit(".", 1)[-1]
+        old = baseline_flat.get(name)
+        if metric in NOT_COMPARED or not old:
+            continue
+        change = (value - old) / old
+        worse = -change if metric not in LOWER_IS_BETTER else change
+        flag = ""
+        if worse > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif -worse > threshold:
+            flag = "  improved"
+        print(f"{name:>48}: {old:14.3f} -> {value:14.3f} ({change:+.1%}){flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the benchmark suite')
+    add_shop_arguments(parser)
+    add_crawl_arguments(parser)
+    add_micro_arguments(parser)
+    add_startup_arguments(parser)
+    parser.add_argument('--skip-micro', action='store_true', help='Do not run the micro-benchmarks')
+    parser.add_argument('--skip-startup', action='store_true', help='Do not run the startup benchmarks')
+    parser.add_argument('--skip-crawl', action='store_true', help='Do not run the crawl benchmarks')
+    parser.add_argument('--output', help='Save the results to this JSON file')
+    parser.add_argument('--baseline', help='Results file to compare against')
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=0.1,
+        help='Relative change reported as a regression or improvement'
+    )
+    args = parser.parse_args()
+    shop = shop_config_from_args(args)
+
+    results = {
+        "created": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "shop": asdict(shop),
+        "crawl_settings": {
+            "concurrency": args.concurrency,
+            "processes": args.processes,
+            "frontier": args.frontier,
+            "parser": args.crawl_parser,
+        },
+    }
+    if not args.skip_micro:
+        print("Micro-benchmarks:")
+        results["micro"] = run_micro_benchmarks(args)
+        print_micro_results(results["micro"])
+    if not args.skip_startup:
+        print("\nStartup benchmarks:")
+        results["startup"] = run_startup_benchmarks(args)
+        print_startup_results(results["startup"])
+    if not args.skip_crawl:
+        print(f"\nCrawl benchmarks (synthetic shop with {shop.catalog_size} products):")
+        results["crawl"] = run_crawl_benchmarks(shop, args)
+        print_crawl_results(results["crawl"])
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("shop") != results["shop"]:
+            print("Warning: the baseline used a different synthetic shop configuration")
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
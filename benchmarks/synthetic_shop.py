@@ -0,0 +1,209 @@
+"""
+Deterministic synthetic e-commerce site for benchmarks.
+
+The shop has a home page linking to categories, paginated category
+listings, product pages with related-product links, and help/blog pages
+that only carry site chrome. Every page, latency and injected error is
+derived from the seed, the path and the request attempt, so two runs with
+the same configuration see the same site.
+
+Served over HTTPS with a throwaway self-signed certificate (the crawler
+always starts from https://), which needs the openssl command.
+
+Usage:
+    python benchmarks/synthetic_shop.py [--port N] [--categories N] ...
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import socket
+import ssl
+import subprocess
+import tempfile
+import time
+import zlib
+from collections import defaultdict
+from dataclasses import asdict, dataclass, fields
+
+from aiohttp import web
+
+@dataclass
+class ShopConfig:
+    categories: int = 20
+    products_per_category: int = 200
+    page_size: int = 24
+    fanout: int = 4
+    chrome_links: int = 20
+    page_kb: int = 20
+    latency_ms: float = 20.0
+    latency_sigma: float = 0.5
+    error_rate: float = 0.0
+    rate_429: float = 0.0
+    seed: int = 1
+
+    @property
+    def catalog_size(self) -> int:
+        return self.categories * self.products_per_category
+
+def add_shop_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Add one --option per ShopConfig field.
+    """
+    for field in fields(ShopConfig):
+        parser.add_argument(
+            f"--{field.name.replace('_', '-')}",
+            type=field.type if isinstance(field.type, type) else type(field.default),
+            default=field.default
+        )
+
+def shop_config_from_args(args: argparse.Namespace) -> ShopConfig:
+    return ShopConfig(**{field.name: getattr(args, field.name) for field in fields(ShopConfig)})
+
+def _rng(config: ShopConfig, key: str) -> random.Random:
+    return random.Random(zlib.crc32(f"{config.seed}:{key}".encode()))
+
+def _render(links, texts, padding: int) -> str:
+    anchors = "".join(f'<a href="{link}">{texts.get(link, "link")}</a>\n' for link in links)
+    filler = "<p>" + "lorem ipsum " * max(padding // 12, 0) + "</p>" if padding > 0 else ""
+    return f"<html><head><title>Shop</title></head><body>{anchors}{filler}</body></html>"
+
+def create_app(config: ShopConfig) -> web.Application:
+    """
+    Build the aiohttp application serving the shop described by config.
+    """
+    chrome = (
+        [f"/help/topic-{i}" for i in range(config.chrome_links // 2)]
+        + [f"/blog/post-{i}" for i in range(config.chrome_links - config.chrome_links // 2)]
+    )
+    pages_per_category = max(-(-config.products_per_category // config.page_size), 1)
+    attempts = defaultdict(int)
+
+    def page_links(path: str, page: int):
+        texts = {}
+        if path == "/":
+            links = [f"/collections/c{i}" for i in range(config.categories)]
+            texts = {link: "Shop now" for link in links}
+        elif path.startswith("/collections/c"):
+            category = int(path.rsplit("c", 1)[1])
+            if category >= config.categories or page > pages_per_category:
+                return None, texts
+            first = (page - 1) * config.page_size
+            last = min(first + config.page_size, config.products_per_category)
+            links = [f"/products/c{category}-{j}" for j in range(first, last)]
+            if page < pages_per_category:
+                next_page = f"/collections/c{category}?page={page + 1}"
+                links.append(next_page)
+                texts[next_page] = "Next"
+        elif path.startswith("/products/c"):
+            category, _, number = path[len("/products/c"):].partition("-")
+            if not (category.isdigit() and number.isdigit()):
+                return None, texts
+            rng = _rng(config, path)
+            links = [
+                f"/products/c{category}-{rng.randrange(config.products_per_category)}"
+                for _ in range(config.fanout)
+            ]
+        elif path.startswith(("/help/", "/blog/")):
+            links = []
+        else:
+            return None, texts
+        return links + chrome, texts
+
+    async def handler(request: web.Request) -> web.Response:
+        path = request.path
+        page = int(request.query.get("page", "1") or 1)
+        key = request.path_qs
+        attempt = attempts[key]
+        attempts[key] += 1
+
+        rng = _rng(config, f"{key}#{attempt}")
+        delay = config.latency_ms / 1000
+        if config.latency_sigma > 0:
+            delay *= rng.lognormvariate(0, config.latency_sigma)
+        await asyncio.sleep(delay)
+
+        roll = rng.random()
+        if roll < config.rate_429:
+            return web.Response(status=429, headers={"Retry-After": "0"})
+        if roll < config.rate_429 + config.error_rate:
+            return web.Response(status=503)
+
+        links, texts = page_links(path, page)
+        if links is None:
+            raise web.HTTPNotFound()
+        return web.Response(
+            text=_render(links, texts, config.page_kb * 1024),
+            content_type="text/html"
+        )
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+    return app
+
+def create_ssl_context(directory: str) -> ssl.SSLContext:
+    """
+    Create a server SSL context with a new self-signed certificate.
+    """
+    cert_file = os.path.join(directory, "cert.pem")
+    key_file = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-keyout", key_file, "-out", cert_file],
+        check=True, capture_output=True
+    )
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert_file, key_file)
+    return context
+
+def serve(config: ShopConfig, port: int, host: str = "127.0.0.1") -> None:
+    """
+    Serve the shop until the process is terminated.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        web.run_app(
+            create_app(config), host=host, port=port,
+            ssl_context=create_ssl_context(directory), print=None, access_log=None
+        )
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_shop(config: ShopConfig, port: int = 0, timeout: float = 30.0):
+    """
+    Start the shop in a separate process and wait until it accepts connections.
+
+    Returns:
+        (process, domain): The server process (terminate it when done) and
+        the "127.0.0.1:port" domain to crawl
+    """
+    port = port or free_port()
+    process = multiprocessing.Process(target=serve, args=(config, port), daemon=True)
+    process.start()
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                break
+        except OSError:
+            if not process.is_alive() or time.monotonic() > deadline:
+                process.terminate()
+                raise RuntimeError("Synthetic shop did not start")
+            time.sleep(0.1)
+    return process, f"127.0.0.1:{port}"
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the synthetic benchmark shop')
+    parser.add_argument('--port', type=int, default=8443)
+    add_shop_arguments(parser)
+    args = parser.parse_args()
+    config = shop_config_from_args(args)
+    print(f"Serving {config.catalog_size} products on https://127.0.0.1:{args.port}/ ({asdict(config)})")
+    serve(config, args.port)
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,54 @@
 import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
 import aiohttp
 import logging
-from bs4 import BeautifulSoup
-from typing import List, Dict, Set, Optional
-from urllib.parse import urljoin, urlparse
-from fake_useragent import UserAgent
+from typing import AsyncIterator, Callable, List, Dict, Optional
 import json
+import math
 import os
+import time
 from datetime import datetime
-from .utils.url_patterns import is_product_url, get_common_product_patterns
-from .utils.rate_limiter import RateLimiter
+from .utils.url_patterns import (
+    ProductIdExtractor, get_default_classifier, get_default_product_id_extractor, is_non_html_url
+)
+from .utils.rate_limiter import RateLimiter, parse_retry_after
+from .utils.link_extractor import create_link_extractor, read_body, read_links
+from .events import CrawlEvent, EventChannel
+from .frontier import Frontier, TemplateBudget
+from .parsing import PageResult, ParsePool, parse_page, resolve_anchor_context, resolve_links
+from .utils.state_store import CrawlStateStore
+from .utils.seen_set import SeenSet, create_seen_set
+from .utils.canonicalize import UrlCanonicalizer
+from .utils.result_sink import JsonlResultSink, build_summary
+from .utils.http_cache import ValidatorCache
+from .sitemap import SitemapDiscovery
+from .utils.http_session import ConnectionStats, create_session
+from .sharding import DomainShard
+from .utils.link_scoring import LinkScorer
+from .utils.metrics import CrawlMetrics, MetricsPublisher
+from .utils.page_archive import PageArchive
+from .utils.simhash import NearDuplicateIndex, link_set_fingerprint
+from .utils.scheduler import FairScheduler
+from .utils.product_index import ProductIndex, create_product_index
+from .utils.user_agents import get_user_agent_pool
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# off: link crawl only; seed: sitemap entries seed the link crawl;
+# only: skip the link crawl when the sitemaps list any products
+SITEMAP_MODES = ("off", "seed", "only")
+
+# Sitemap entries are resolved and classified in batches of this size
+SITEMAP_BATCH_SIZE = 1000
+
+# bfs: fetch in discovery order; best-first: fetch the links most likely to
+# lead to new products first (see LinkScorer)
+FRONTIER_MODES = ("bfs", "best-first")
+
+# Stats counter of each PageResult.cache_status
+CACHE_COUNTERS = {"hit": "cache_hits", "skip": "cache_skips", "miss": "cache_misses"}
+
 class EcommerceCrawler:
     def __init__(
         self,
@@ -23,7 +58,50 @@ class EcommerceCrawler:
         timeout: int = 30,
         output_dir: str = "output",
         max_retries: int = 3,
-        retry_delay: float = 2.0
+        retry_delay: float = 2.0,
+        parser: str = "stream",
+        max_body_size: int = 5 * 1024 * 1024,
+        parse_workers: int = 0,
+        max_parse_jobs: Optional[int] = None,
+        state_file: Optional[str] = None,
+        resume: bool = False,
+        checkpoint_interval: float = 5.0,
+        seen_mode: str = "exact",
+        seen_capacity: int = 1024,
+        bloom_fp_rate: float = 0.001,
+        canonicalize: bool = True,
+        canonical_rules: Optional[str] = None,
+        output_compress: bool = False,
+        output_max_file_size: int = 256 * 1024 * 1024,
+        collect_product_urls: bool = False,
+        cache_file: Optional[str] = None,
+        incremental: bool = False,
+        cache_max_age: float = 7 * 24 * 3600,
+        sitemap_mode: str = "off",
+        adaptive_rate: bool = False,
+        max_rate: float = 20.0,
+        rate_burst: int = 1,
+        connection_limit: int = 100,
+        connections_per_host: Optional[int] = None,
+        dns_ttl: int = 300,
+        keepalive_timeout: float = 30.0,
+        frontier_mode: str = "bfs",
+        max_pages_per_domain: Optional[int] = None,
+        max_domain_time: Optional[float] = None,
+        metrics_file: Optional[str] = None,
+        metrics_port: Optional[int] = None,
+        metrics_interval: float = 10.0,
+        archive_dir: Optional[str] = None,
+        archive_segment_size: int = 256 * 1024 * 1024,
+        near_duplicates: bool = True,
+        near_duplicate_distance: int = 3,
+        template_budget: int = 1000,
+        prefetch_filter: bool = True,
+        product_dedup: bool = True,
+        product_id_rules: Optional[str] = None,
+        max_in_flight: Optional[int] = None,
+        domain_weights: Optional[Dict[str, float]] = None,
+        deadline: Optional[float] = None
     ):
         self.max_concurrent_requests = max_concurrent_requests
         self.crawl_delay = crawl_delay
@@ -32,179 +110,897 @@ class EcommerceCrawler:
         self.output_dir = output_dir
         self.max_retries = max_retries
         self.retry_delay = retry_delay
-        self.user_agent = UserAgent()
+        self.parser = parser
+        self.max_body_size = max_body_size
+        self.parse_workers = parse_workers
+        self.max_parse_jobs = max_parse_jobs
+        self._parse_pool: Optional[ParsePool] = None
+        self.state_file = state_file
+        self.resume = resume
+        self.checkpoint_interval = checkpoint_interval
+        self._state_store: Optional[CrawlStateStore] = None
+        self.seen_mode = seen_mode
+        self.seen_capacity = seen_capacity
+        self.bloom_fp_rate = bloom_fp_rate
+        self.canonicalizer: Optional[UrlCanonicalizer] = None
+        if canonical_rules:
+            self.canonicalizer = UrlCanonicalizer.from_file(canonical_rules)
+        elif canonicalize:
+            self.canonicalizer = UrlCanonicalizer()
+        self.output_compress = output_compress
+        self.output_max_file_size = output_max_file_size
+        self.collect_product_urls = collect_product_urls
+        self.product_files: List[str] = []
+        self._sink: Optional[JsonlResultSink] = None
+        self._collected_products: Dict[str, List[str]] = {}
+        self.cache_file = cache_file
+        self.incremental = incremental
+        self.cache_max_age = cache_max_age
+        self._cache: Optional[ValidatorCache] = None
+        if sitemap_mode not in SITEMAP_MODES:
+            raise ValueError(f"Unknown sitemap mode: {sitemap_mode}")
+        self.sitemap_mode = sitemap_mode
+        self.adaptive_rate = adaptive_rate
+        self.max_rate = max_rate
+        self.rate_burst = rate_burst
+        self.connection_limit = connection_limit
+        self.connections_per_host = connections_per_host or max_concurrent_requests
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.connection_stats = ConnectionStats()
+        if frontier_mode not in FRONTIER_MODES:
+            raise ValueError(f"Unknown frontier mode: {frontier_mode}")
+        self.frontier_mode = frontier_mode
+        self.max_pages_per_domain = max_pages_per_domain
+        self.max_domain_time = max_domain_time
+        self.metrics = CrawlMetrics()
+        self.metrics_file = metrics_file
+        self.metrics_port = metrics_port
+        self.metrics_interval = metrics_interval
+        self.archive_dir = archive_dir
+        self.archive_segment_size = archive_segment_size
+        self._archive: Optional[PageArchive] = None
+        self.near_duplicates = near_duplicates
+        self.near_duplicate_distance = near_duplicate_distance
+        self.template_budget = template_budget
+        self.prefetch_filter = prefetch_filter
+        self.product_ids: Optional[ProductIdExtractor] = None
+        if product_id_rules:
+            self.product_ids = ProductIdExtractor.from_file(product_id_rules)
+        elif product_dedup:
+            self.product_ids = get_default_product_id_extractor()
+        # Defaults to the connection limit; 0 disables the global limit
+        self.max_in_flight = connection_limit if max_in_flight is None else max_in_flight
+        self.domain_weights = domain_weights
+        self.deadline = deadline
+        self._scheduler: Optional[FairScheduler] = None
+        self._deadline_at: Optional[float] = None
+        # Set while events are streamed, by stream() or a streaming worker process
+        self._events: Optional[EventChannel] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._domain_headers: Dict[str, Dict[str, str]] = {}
+        self.classifier = get_default_classifier()
         self.rate_limiters: Dict[str, RateLimiter] = {}
         
         # Create output directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
 
+    async def open_session(self) -> aiohttp.ClientSession:
+        """
+        Open the HTTP session shared by every later crawl_domains() call.
+
+        Keeping one session per process lets connections and cached DNS
+        entries be reused across domains and calls. Close it with close().
+        """
+        if self._session is None or self._session.closed:
+            self._session = create_session(
+                self.connection_stats,
+                limit=self.connection_limit,
+                limit_per_host=self.connections_per_host,
+                dns_ttl=self.dns_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+                metrics=self.metrics
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """
+        Close the session opened by open_session().
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @asynccontextmanager
+    async def running(self) -> AsyncIterator["EcommerceCrawler"]:
+        """
+        Open the session, result sink and other per-run resources.
+
+        crawl_domain() may be called any number of times, concurrently,
+        inside the block; their requests share max_in_flight slots fairly
+        and every crawl stops at the run deadline, counted from entering
+        the block. product_files is set when the block exits.
+        Metric snapshots are published every metrics_interval seconds while
+        the block runs when metrics_file or metrics_port is set.
+        """
+        async with AsyncExitStack() as stack:
+            if self._session is None:
+                stack.push_async_callback(self.close)
+            await self.open_session()
+            if self.max_in_flight:
+                self._scheduler = FairScheduler(self.max_in_flight, self.domain_weights)
+            if self.deadline:
+                self._deadline_at = asyncio.get_running_loop().time() + self.deadline
+            if self.metrics_file or self.metrics_port:
+                publisher = MetricsPublisher(self.metrics_file, self.metrics_port).start()
+                stack.callback(publisher.close)
+                stack.push_async_callback(self._publish_metrics, publisher, None)
+                publish_task = asyncio.create_task(
+                    self._publish_metrics(publisher, self.metrics_interval)
+                )
+                stack.callback(publish_task.cancel)
+            self._sink = await stack.enter_async_context(JsonlResultSink(
+                self.output_dir,
+                compress=self.output_compress,
+                max_file_size=self.output_max_file_size
+            ))
+            if self.parse_workers > 0:
+                # Hand page parsing to worker processes so the event loop
+                # only does socket I/O
+                self._parse_pool = await stack.enter_async_context(
+                    ParsePool(self.parse_workers, self.max_parse_jobs)
+                )
+            if self.cache_file:
+                self._cache = await stack.enter_async_context(
+                    ValidatorCache(self.cache_file)
+                )
+            if self.archive_dir:
+                self._archive = await stack.enter_async_context(
+                    PageArchive(self.archive_dir, self.archive_segment_size)
+                )
+            if self.state_file:
+                # Entered last so pending checkpoints are flushed first on
+                # exit, including when the crawl is interrupted
+                self._state_store = await stack.enter_async_context(
+                    CrawlStateStore(self.state_file, self.checkpoint_interval)
+                )
+            try:
+                yield self
+            finally:
+                self.product_files = list(self._sink.files)
+
+        self._parse_pool = None
+        self._state_store = None
+        self._sink = None
+        self._cache = None
+        self._archive = None
+        self._scheduler = None
+        self._deadline_at = None
+
+    async def _publish_metrics(self, publisher: MetricsPublisher, interval: Optional[float]) -> None:
+        """
+        Publish a metrics snapshot every interval seconds, or once if
+        interval is None.
+        """
+        while True:
+            publisher.publish(self.metrics.snapshot())
+            if interval is None:
+                return
+            await asyncio.sleep(interval)
+
+    async def crawl_domain(self, domain: str, shard: Optional[DomainShard] = None) -> Dict:
+        """
+        Crawl one domain inside running(), turning failures into an error result.
+
+        Args:
+            domain (str): Domain to crawl
+            shard (DomainShard): If given, crawl only this shard of the domain
+
+        Returns:
+            Dict: The domain's result with "stats", or "error" if it failed
+        """
+        try:
+            return await self.crawl_single_domain(self._session, domain, shard)
+        except Exception as e:
+            logger.error(f"Error crawling {domain}: {str(e)}")
+            return {
+                "error": str(e),
+                "stats": {
+                    "crawl_time": datetime.now().isoformat(),
+                    "status": "failed"
+                }
+            }
+
     async def crawl_domains(self, domains: List[str]) -> Dict[str, Dict]:
         """
         Crawl multiple domains concurrently and collect product URLs.
+
+        Uses the session from open_session() if one is open, otherwise a
+        session is opened for this call only.
         """
-        results = {}
-        tasks = []
-
-        async with aiohttp.ClientSession() as session:
-            for domain in domains:
-                task = asyncio.create_task(self.crawl_single_domain(session, domain))
-                tasks.append(task)
-            
-            completed_results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            for domain, result in zip(domains, completed_results):
-                if isinstance(result, Exception):
-                    logger.error(f"Error crawling {domain}: {str(result)}")
-                    results[domain] = {
-                        "product_urls": [],
-                        "error": str(result),
-                        "stats": {
-                            "crawl_time": datetime.now().isoformat(),
-                            "status": "failed"
-                        }
-                    }
-                else:
-                    results[domain] = result
+        async with self.running():
+            completed_results = await asyncio.gather(
+                *(self.crawl_domain(domain) for domain in domains)
+            )
+        results = dict(zip(domains, completed_results))
 
         # Save results to file
         self._save_results(results)
         return results
 
+    async def stream(
+        self,
+        domains: List[str],
+        max_pending_events: int = 1000
+    ) -> AsyncIterator[CrawlEvent]:
+        """
+        Crawl multiple domains concurrently, yielding product, page and
+        domain events (see CrawlEvent) as they happen.
+
+        The crawl runs as crawl_domains() does, including the product files
+        and the summary written at the end. While max_pending_events
+        events wait for the consumer, no further pages are fetched.
+        Leaving the loop early stops the crawl.
+
+        Usage:
+            async for event in crawler.stream(domains):
+                if event.kind == "product":
+                    ...
+
+        Args:
+            domains: Domains to crawl
+            max_pending_events (int): Events buffered for a slow consumer
+        """
+        if self._events is not None:
+            raise RuntimeError("stream() is already running")
+        channel = EventChannel(max_pending_events)
+        results: Dict[str, Dict] = {}
+
+        async def crawl(domain: str) -> None:
+            results[domain] = await self.crawl_domain(domain)
+            channel.put(CrawlEvent("domain", domain, result=results[domain]))
+
+        async with self.running():
+            self._events = channel
+            crawls = asyncio.gather(*(crawl(domain) for domain in domains))
+            crawls.add_done_callback(lambda _: channel.close())
+            try:
+                while True:
+                    batch = await channel.get_batch()
+                    if batch is None:
+                        break
+                    for event in batch:
+                        yield event
+                    channel.task_done(len(batch))
+                await crawls
+            finally:
+                self._events = None
+                crawls.cancel()
+                await asyncio.gather(crawls, return_exceptions=True)
+
+        self._save_results({domain: results[domain] for domain in domains if domain in results})
+
     async def crawl_single_domain(
         self,
         session: aiohttp.ClientSession,
-        domain: str
+        domain: str,
+        shard: Optional[DomainShard] = None
     ) -> Dict:
         """
         Crawl a single domain and collect product URLs.
+
+        With a shard, only the URLs the shard owns are fetched and recorded;
+        links owned by other shards are forwarded to them, and the crawl
+        ends when the coordinator reports the whole domain finished.
+        Sharded crawls are not checkpointed.
+
+        The crawl stops early once max_pages_per_domain pages have been
+        processed or max_domain_time seconds have passed; the page budget
+        of a sharded domain is split between its shards.
         """
         start_time = datetime.now()
-        visited_urls: Set[str] = set()
-        product_urls: Set[str] = set()
-        urls_to_visit = {f"https://{domain}"}
-        current_depth = 0
+        # Product URLs themselves go to the result sink; only fingerprints
+        # of them and of their product keys are kept for deduplication
+        product_urls = create_product_index(
+            self.seen_mode, self.seen_capacity, self.bloom_fp_rate, self.product_ids, domain,
+            self.classifier
+        )
+        if self.collect_product_urls:
+            self._collected_products[domain] = []
+        scorer = LinkScorer(self.classifier) if self.frontier_mode == "best-first" else None
+        # Calendars, session IDs and filter combinations are cut off per URL
+        # template, since max_depth cannot stop them within a level
+        templates = (
+            TemplateBudget(self.template_budget, classifier=self.classifier, domain=domain)
+            if self.template_budget else None
+        )
+        frontier = Frontier(
+            self.max_depth,
+            create_seen_set(self.seen_mode, self.seen_capacity, self.bloom_fp_rate),
+            prioritized=scorer is not None,
+            templates=templates
+        )
+        near_duplicates = (
+            NearDuplicateIndex(self.near_duplicate_distance) if self.near_duplicates else None
+        )
+        depth_reached = 0
+        store = self._state_store if shard is None else None
+        counters = {
+            "fetches_saved_by_canonicalization": 0,
+            "cache_hits": 0,
+            "cache_skips": 0,
+            "cache_misses": 0,
+            "products_from_sitemaps": 0,
+            "products_from_links": 0,
+            "near_duplicate_pages": 0,
+            "near_duplicate_links_pruned": 0,
+            "near_duplicate_bytes_saved": 0,
+            "urls_filtered_before_fetch": 0,
+            "responses_aborted": 0,
+            "bytes_avoided": 0,
+        }
+        bytes_fetched = 0
+        pages_fetched = 0
+        pages_visited = 0
+        pages_started = 0
+        page_budget = self.max_pages_per_domain
+        if page_budget and shard is not None:
+            page_budget = math.ceil(page_budget / shard.count)
+        budget_exhausted: Optional[str] = None
+
+        def stop_crawl(reason: str) -> None:
+            nonlocal budget_exhausted
+            if budget_exhausted is None:
+                budget_exhausted = reason
+                dropped = frontier.close()
+                logger.info(f"Crawl budget ({reason}) used up for {domain}, dropping {dropped} queued URLs")
+
+        # Distinct raw link forms, used to count fetches canonicalization saved
+        raw_seen = None
+        start_url = f"https://{domain}"
+        if self.canonicalizer is not None:
+            raw_seen = create_seen_set(self.seen_mode, self.seen_capacity, self.bloom_fp_rate)
+
+        checkpoint = None
+        if store is not None:
+            if self.resume:
+                checkpoint = await store.load_domain(domain)
+            if checkpoint is not None and checkpoint["status"] == "complete":
+                logger.info(f"Skipping {domain}: already completed in a previous run")
+                result = {"stats": checkpoint["stats"]}
+                if self.collect_product_urls:
+                    result["product_urls"] = checkpoint["product_urls"]
+                    del self._collected_products[domain]
+                return result
+            if checkpoint is not None and not (checkpoint["visited"] or checkpoint["pending"]):
+                checkpoint = None
+            if checkpoint is None:
+                await store.reset_domain(domain)
 
-        rate_limiter = RateLimiter(self.crawl_delay)
+        def enqueue(
+            url: str,
+            depth: int,
+            anchor_context: str = "",
+            parent_yield: float = 0.0
+        ) -> bool:
+            if frontier.closed:
+                return False
+            if self.prefetch_filter and is_non_html_url(url):
+                # Images, documents, assets and feeds are never fetched
+                counters["urls_filtered_before_fetch"] += 1
+                return False
+            if product_urls.is_variant(url):
+                # Another URL of this product was already recorded
+                return False
+            if shard is not None and not shard.owns(url):
+                # Forwarded even when too deep to fetch, so the owner can
+                # still record it as a product. Counts as accepted: the
+                # owner fetches it
+                if frontier.seen.add(url):
+                    shard.forward(url, depth)
+                    return True
+                return False
+            priority = 0.0
+            if scorer is not None:
+                priority = scorer.score(url, depth, anchor_context, parent_yield)
+            if not frontier.add(url, depth, priority):
+                return False
+            if store is not None:
+                store.record_enqueued(domain, url, depth)
+            return True
+
+        rate_limiter = self._create_rate_limiter(shard.count if shard is not None else 1)
         self.rate_limiters[domain] = rate_limiter
 
-        while urls_to_visit and current_depth <= self.max_depth:
-            next_urls = set()
-            tasks = []
+        if self.canonicalizer is not None:
+            # The start URL is canonicalized with the host the site is served
+            # from, or the home page would be fetched again under the other
+            # host once the first response reveals it
+            await self._probe_served_host(session, domain, start_url, rate_limiter)
+            start_url = self.canonicalizer.canonicalize(start_url)
 
-            # Process URLs at current depth
-            for url in urls_to_visit:
-                if url in visited_urls:
-                    continue
-                
-                visited_urls.add(url)
-                task = asyncio.create_task(
-                    self._process_url(session, url, domain, rate_limiter)
+        if checkpoint is not None:
+            pages_visited = len(checkpoint["visited"])
+            frontier.restore(checkpoint["visited"], checkpoint["pending"])
+            for url in checkpoint["product_urls"]:
+                product_urls.add(url)
+            if self.collect_product_urls:
+                self._collected_products[domain].extend(checkpoint["product_urls"])
+            logger.info(
+                f"Resuming {domain}: {len(checkpoint['visited'])} pages visited, "
+                f"{len(frontier)} pending, {len(product_urls)} products"
+            )
+        elif shard is None or shard.index == 0:
+            # Only the first shard of a sharded domain starts the crawl
+            sitemap_products = 0
+            if self.sitemap_mode != "off":
+                sitemap_products = await self._discover_from_sitemaps(
+                    session, domain, start_url, rate_limiter,
+                    product_urls, enqueue, counters, shard
                 )
-                tasks.append(task)
+            if self.sitemap_mode == "only" and sitemap_products:
+                logger.info(f"Sitemaps listed {sitemap_products} products for {domain}, skipping link crawl")
+            else:
+                enqueue(start_url, 0)
+
+        async def worker() -> None:
+            nonlocal depth_reached, pages_visited, pages_started, bytes_fetched, pages_fetched
+            while True:
+                if self._events is not None:
+                    # A slow stream() consumer holds back the next fetch
+                    await self._events.wait_writable()
+                url, depth = await frontier.get()
+                try:
+                    if page_budget and pages_started >= page_budget:
+                        stop_crawl("pages")
+                        continue
+                    pages_started += 1
+                    depth_reached = max(depth_reached, depth)
+                    result = await self._process_url(
+                        session, url, domain, rate_limiter,
+                        collect_context=scorer is not None,
+                        fingerprint=near_duplicates is not None
+                    )
+                    if result.cache_status is not None:
+                        counters[CACHE_COUNTERS[result.cache_status]] += 1
+                    if result.aborted:
+                        counters["responses_aborted"] += 1
+                    counters["bytes_avoided"] += result.bytes_avoided
 
-                # Process in batches to control concurrency
-                if len(tasks) >= self.max_concurrent_requests:
-                    results = await asyncio.gather(*tasks, return_exceptions=True)
-                    next_urls.update(self._handle_batch_results(results, product_urls))
-                    tasks = []
+                    # Feed discovered links straight back into the frontier so
+                    # idle workers can pick them up without waiting for a batch
+                    products_before = len(product_urls)
+                    links = self._handle_result(domain, result, product_urls, shard)
+                    new_products = len(product_urls) - products_before
+                    counters["products_from_links"] += new_products
+                    page_yield = 0.0
+                    if scorer is not None:
+                        page_yield = scorer.page_yield(new_products, len(links))
+                        scorer.record_page(url, page_yield)
+                    if result.body_bytes:
+                        bytes_fetched += result.body_bytes
+                        pages_fetched += 1
+                    if depth < self.max_depth and self._is_near_duplicate(
+                        result, new_products, near_duplicates
+                    ):
+                        # Facet and sort variants of a listing render nearly
+                        # the same links; expanding them again only finds
+                        # more variants
+                        pruned = sum(new_url not in frontier.seen for new_url in links)
+                        counters["near_duplicate_pages"] += 1
+                        counters["near_duplicate_links_pruned"] += pruned
+                        counters["near_duplicate_bytes_saved"] += pruned * bytes_fetched // max(pages_fetched, 1)
+                        logger.debug(f"Not expanding near-duplicate page {url} ({pruned} new links)")
+                        if templates is not None:
+                            templates.record_page(url, new_products, ())
+                    elif depth < self.max_depth:
+                        enqueued = []
+                        for new_url in links:
+                            anchor_context = result.anchor_context.get(new_url, "")
+                            if raw_seen is None:
+                                if enqueue(new_url, depth + 1, anchor_context, page_yield):
+                                    enqueued.append(new_url)
+                                continue
 
-            # Process remaining tasks
-            if tasks:
-                results = await asyncio.gather(*tasks, return_exceptions=True)
-                next_urls.update(self._handle_batch_results(results, product_urls))
+                            # Without canonicalization every new raw form
+                            # would have been fetched separately
+                            raw_forms = result.aliases.get(new_url, (new_url,))
+                            new_raw_forms = sum(raw_seen.add(raw) for raw in raw_forms)
+                            if enqueue(new_url, depth + 1, anchor_context, page_yield):
+                                new_raw_forms -= 1
+                                enqueued.append(new_url)
+                            counters["fetches_saved_by_canonicalization"] += max(new_raw_forms, 0)
+                        if templates is not None:
+                            templates.record_page(url, new_products, enqueued)
+                    elif shard is not None:
+                        # Products on the deepest pages still go to their owners
+                        for new_url in result.product_links:
+                            enqueue(new_url, depth + 1)
+                    pages_visited += 1
+                    if store is not None:
+                        store.record_visited(domain, url)
+                    if self._events is not None:
+                        self._events.put(CrawlEvent("page", domain, url, depth, new_products))
+                except Exception as e:
+                    logger.error(f"Worker error for {url}: {str(e)}")
+                finally:
+                    frontier.task_done()
 
-            urls_to_visit = next_urls - visited_urls
-            current_depth += 1
+        # Long-lived workers keep max_concurrent_requests fetches in flight
+        # until the frontier drains
+        workers = [
+            asyncio.create_task(worker())
+            for _ in range(self.max_concurrent_requests)
+        ]
+        loop = asyncio.get_running_loop()
+        time_limits = []
+        if self.max_domain_time:
+            time_limits.append(
+                (self.max_domain_time - (datetime.now() - start_time).total_seconds(), "time")
+            )
+        if self._deadline_at is not None:
+            time_limits.append((self._deadline_at - loop.time(), "deadline"))
+        time_budget = None
+        if time_limits:
+            remaining, reason = min(time_limits)
+            time_budget = loop.call_later(max(remaining, 0), stop_crawl, reason)
+        try:
+            while True:
+                await frontier.join()
+                if shard is None:
+                    break
+                batch = await shard.next_batch()
+                if batch is None:
+                    break
+                urls = [url for url, _ in batch]
+                flags = self.classifier.classify_urls(urls)
+                new_products = [
+                    url for url, is_product in zip(urls, flags)
+                    if is_product and product_urls.add(url)
+                ]
+                if new_products:
+                    counters["products_from_links"] += len(new_products)
+                    self._on_products(domain, new_products)
+                for url, depth in batch:
+                    enqueue(url, depth)
+        finally:
+            if time_budget is not None:
+                time_budget.cancel()
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
 
         end_time = datetime.now()
+        duration = (end_time - start_time).total_seconds()
+        cache_lookups = counters["cache_hits"] + counters["cache_skips"] + counters["cache_misses"]
+        if cache_lookups:
+            counters["cache_hit_rate"] = (
+                counters["cache_hits"] + counters["cache_skips"]
+            ) / cache_lookups
         
-        return {
-            "product_urls": list(product_urls),
+        counters["product_variants_skipped"] = len(product_urls.variants)
+
+        result = {
             "stats": {
                 "total_urls_found": len(product_urls),
-                "total_urls_visited": len(visited_urls),
-                "depth_reached": current_depth - 1,
+                "total_urls_visited": pages_visited,
+                "depth_reached": depth_reached,
+                "pages_per_second": pages_visited / duration if duration else 0.0,
+                "products_per_page": len(product_urls) / pages_visited if pages_visited else 0.0,
+                "frontier_mode": self.frontier_mode,
+                "budget_exhausted": budget_exhausted,
+                "seen_set": frontier.seen.stats(),
+                "products": product_urls.stats(),
+                "url_templates": templates.stats() if templates is not None else None,
+                "rate_limiter": rate_limiter.stats(),
+                "scheduler": self._scheduler.stats(domain) if self._scheduler is not None else None,
+                "connections": self.connection_stats.stats(domain),
+                **counters,
                 "crawl_time": {
                     "start": start_time.isoformat(),
                     "end": end_time.isoformat(),
-                    "duration_seconds": (end_time - start_time).total_seconds()
+                    "duration_seconds": duration
                 }
             }
         }
 
+        if self.collect_product_urls:
+            result["product_urls"] = self._collected_products.pop(domain)
+
+        if store is not None:
+            await store.mark_domain_complete(domain, result["stats"])
+
+        return result
+
+    async def _discover_from_sitemaps(
+        self,
+        session: aiohttp.ClientSession,
+        domain: str,
+        start_url: str,
+        rate_limiter: RateLimiter,
+        product_urls: SeenSet,
+        enqueue: Callable[[str, int], bool],
+        counters: Dict[str, int],
+        shard: Optional[DomainShard] = None
+    ) -> int:
+        """
+        Seed a domain's crawl from its sitemaps.
+
+        Product URLs listed in the sitemaps are recorded straight away. In
+        "seed" mode every entry is also queued at depth 1 so the link crawl
+        can find products the sitemaps leave out. Entries are handled in
+        fixed-size batches so memory use does not grow with the size of the
+        sitemaps.
+
+        Returns:
+            int: Number of new product URLs found in the sitemaps
+        """
+        discovery = SitemapDiscovery(
+            session,
+            lambda: self._request_headers(domain),
+            rate_limiter,
+            self.timeout,
+            trace_request_ctx=ConnectionStats.context(domain)
+        )
+        found = 0
+
+        def handle_batch(batch: List[str]) -> None:
+            nonlocal found
+            if self.canonicalizer is not None and discovery.served_host:
+                self.canonicalizer.prefer_host(discovery.served_host)
+            links, _ = resolve_links(start_url, batch, domain, self.canonicalizer)
+            flags = self.classifier.classify_urls(links)
+            new_products = []
+            for url, is_product in zip(links, flags):
+                if shard is not None and not shard.owns(url):
+                    # The owning shard records it
+                    if self.sitemap_mode == "seed":
+                        enqueue(url, 1)
+                    elif is_product:
+                        # Too deep to fetch; the owner only records it
+                        shard.forward(url, self.max_depth + 1)
+                    continue
+                if is_product and product_urls.add(url):
+                    new_products.append(url)
+                if self.sitemap_mode == "seed":
+                    enqueue(url, 1)
+            if new_products:
+                self._on_products(domain, new_products)
+                found += len(new_products)
+
+        batch = []
+        async for loc in discovery.iter_page_urls(start_url):
+            batch.append(loc)
+            if len(batch) >= SITEMAP_BATCH_SIZE:
+                handle_batch(batch)
+                batch = []
+                if self._events is not None:
+                    await self._events.wait_writable()
+        if batch:
+            handle_batch(batch)
+
+        counters["sitemaps_fetched"] = discovery.sitemaps_fetched
+        counters["sitemap_entries"] = discovery.entries
+        counters["products_from_sitemaps"] = found
+        logger.info(
+            f"Sitemaps for {domain}: {discovery.sitemaps_fetched} files, "
+            f"{discovery.entries} entries, {found} products"
+        )
+        return found
+
+    def _request_headers(self, domain: str) -> Dict[str, str]:
+        """
+        Return the headers sent with every request to a domain.
+
+        The User-Agent is picked once per domain so the site sees one
+        consistent client on its kept-alive connections. The returned dict
+        is shared; copy it before adding headers.
+        """
+        headers = self._domain_headers.get(domain)
+        if headers is None:
+            headers = self._domain_headers[domain] = get_user_agent_pool().random_headers()
+        return headers
+
+    async def _probe_served_host(
+        self,
+        session: aiohttp.ClientSession,
+        domain: str,
+        url: str,
+        rate_limiter: RateLimiter
+    ) -> None:
+        """
+        Send a HEAD request for a domain's start URL, following redirects,
+        and record the host it is served from (see
+        UrlCanonicalizer.prefer_host()). Only done for hosts whose rules
+        strip "www.", where the bare and the "www." host are merged.
+        """
+        if not self.canonicalizer.rules_for(domain.split(':')[0].lower()).strip_www:
+            return
+        try:
+            await rate_limiter.acquire()
+            async with self._request_slot(domain):
+                async with session.head(
+                    url,
+                    headers=self._request_headers(domain),
+                    timeout=self.timeout,
+                    allow_redirects=True,
+                    ssl=False,
+                    trace_request_ctx=ConnectionStats.context(domain)
+                ) as response:
+                    if response.url.host:
+                        self.canonicalizer.prefer_host(response.url.host)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # The first page response records the host instead
+            logger.debug(f"Could not determine the served host of {domain}: {str(e)}")
+
     async def _process_url(
         self,
         session: aiohttp.ClientSession,
         url: str,
         domain: str,
-        rate_limiter: RateLimiter
-    ) -> Set[str]:
+        rate_limiter: RateLimiter,
+        collect_context: bool = False,
+        fingerprint: bool = False
+    ) -> PageResult:
         """
         Process a single URL: fetch it, check if it's a product page,
         and extract new URLs to visit. Includes retry logic for failed requests.
+
+        In incremental mode the request is conditional on the cached
+        validators. A page whose own validators confirmed it unchanged (a
+        304) less than cache_max_age ago is not requested at all; whether
+        the page linking to it changed plays no part, so new pages below an
+        unchanged one are still found.
+        With collect_context, anchor_context is filled in for fetched pages.
+        With fingerprint, so is the SimHash of their link set.
         """
+        cached = None
+        if self._cache is not None and self.incremental:
+            cached = await self._cache.get(url)
+            if (
+                cached is not None
+                and cached.validated_at is not None
+                and time.time() - cached.validated_at < self.cache_max_age
+            ):
+                return PageResult(links=list(cached.links), cache_status="skip")
+
+        host_metrics = self.metrics.hosts[domain]
         retries = 0
+        # Backoff after a 429 or 5xx is waited out here, after the response
+        # and the scheduler slot have been released
+        backoff = 0.0
         while retries <= self.max_retries:
+            if retries:
+                host_metrics.retries += 1
+            if backoff:
+                await asyncio.sleep(backoff)
+                backoff = 0.0
             try:
                 await rate_limiter.acquire()
                 
-                headers = {
-                    "User-Agent": self.user_agent.random,
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                    "Accept-Language": "en-US,en;q=0.5",
-                    "Connection": "keep-alive",
-                    "Cache-Control": "max-age=0"
-                }
+                headers = self._request_headers(domain)
+                if cached is not None:
+                    headers = {**headers, **cached.conditional_headers()}
 
-                async with session.get(
-                    url,
-                    headers=headers,
-                    timeout=self.timeout,
-                    allow_redirects=True,
-                    ssl=False  # Handle sites with SSL issues
-                ) as response:
-                    if response.status == 429:  # Too Many Requests
-                        logger.warning(f"Rate limit hit for {domain}, backing off...")
-                        await asyncio.sleep(self.retry_delay * (2 ** retries))
-                        retries += 1
-                        continue
-                        
-                    if response.status >= 500:  # Server errors
-                        if retries < self.max_retries:
-                            logger.warning(f"Server error {response.status} for {url}, retrying...")
-                            await asyncio.sleep(self.retry_delay * (2 ** retries))
+                # The global slot is taken after the rate limiter so
+                # politeness delays never hold one
+                async with self._request_slot(domain):
+                    request_start = time.monotonic()
+                    async with session.get(
+                        url,
+                        headers=headers,
+                        timeout=self.timeout,
+                        allow_redirects=True,
+                        ssl=False,  # Handle sites with SSL issues
+                        trace_request_ctx=ConnectionStats.context(domain)
+                    ) as response:
+                        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                        rate_limiter.record_response(
+                            response.status, time.monotonic() - request_start, retry_after
+                        )
+
+                        if response.status == 429:  # Too Many Requests
+                            logger.warning(f"Rate limit hit for {domain}, backing off...")
+                            # With Retry-After the limiter holds back every
+                            # request to the host, including this retry
+                            if retry_after is None:
+                                backoff = self.retry_delay * (2 ** retries)
                             retries += 1
                             continue
-                        else:
-                            logger.error(f"Max retries reached for {url}")
-                            return set()
-
-                    if response.status != 200:
-                        logger.warning(f"Failed to fetch {url}: Status {response.status}")
-                        return set()
-
-                    content_type = response.headers.get('content-type', '').lower()
-                    if 'text/html' not in content_type:
-                        logger.debug(f"Skipping non-HTML content at {url}")
-                        return set()
-
-                    content = await response.text()
-                    soup = BeautifulSoup(content, 'html.parser')
-                    
-                    # Extract all links
-                    new_urls = set()
-                    for link in soup.find_all('a', href=True):
-                        href = link['href']
-                        absolute_url = urljoin(url, href)
                         
-                        # Only keep URLs from the same domain
-                        parsed_url = urlparse(absolute_url)
-                        if parsed_url.netloc == domain and parsed_url.scheme in ('http', 'https'):
-                            new_urls.add(absolute_url)
+                        if response.status >= 500:  # Server errors
+                            if retries < self.max_retries:
+                                logger.warning(f"Server error {response.status} for {url}, retrying...")
+                                if retry_after is None:
+                                    backoff = self.retry_delay * (2 ** retries)
+                                retries += 1
+                                continue
+                            else:
+                                logger.error(f"Max retries reached for {url}")
+                                return PageResult()
 
-                    return new_urls
+                        if response.status == 304 and cached is not None:
+                            self._cache.touch(cached, url)
+                            return PageResult(links=list(cached.links), cache_status="hit")
+
+                        if response.status != 200:
+                            logger.warning(f"Failed to fetch {url}: Status {response.status}")
+                            return PageResult()
+
+                        # 0 when the server does not announce the size
+                        content_length = response.content_length or 0
+                        content_type = response.headers.get('content-type', '').lower()
+                        if 'text/html' not in content_type:
+                            logger.debug(f"Skipping non-HTML content at {url}")
+                            # Drop the connection instead of draining the body
+                            response.close()
+                            return PageResult(aborted=True, bytes_avoided=content_length)
+
+                        if self.canonicalizer is not None and response.url.host:
+                            self.canonicalizer.prefer_host(response.url.host)
+
+                        body_start = time.perf_counter()
+                        if self._parse_pool is not None or self._archive is not None:
+                            # The whole body is needed to archive it or hand it
+                            # to a parse worker
+                            body = await read_body(response, self.max_body_size)
+                            self.metrics.observe(domain, "download", time.perf_counter() - body_start)
+                            if self._archive is not None:
+                                self._archive.add(domain, url, body, response.charset)
+                            if self._parse_pool is not None:
+                                result = await self._parse_pool.parse(
+                                    body, response.charset, url, domain, self.parser,
+                                    self.canonicalizer, collect_context, fingerprint
+                                )
+                            else:
+                                result = parse_page(
+                                    body, response.charset, url, domain, self.parser,
+                                    self.canonicalizer, collect_context, fingerprint
+                                )
+                            for phase, seconds in result.timings.items():
+                                self.metrics.observe(domain, phase, seconds)
+                        else:
+                            # Extract all links while the body streams in
+                            extractor = create_link_extractor(self.parser, collect_context)
+                            hrefs = await read_links(response, extractor, self.max_body_size)
+                            parse_start = time.perf_counter()
+                            links, aliases = resolve_links(url, hrefs, domain, self.canonicalizer)
+                            result = PageResult(links=links, aliases=aliases)
+                            if extractor.anchors:
+                                result.anchor_context = resolve_anchor_context(
+                                    url, extractor.anchors, links, aliases
+                                )
+                            parse_end = time.perf_counter()
+                            self.metrics.observe(
+                                domain, "download", parse_start - body_start - extractor.parse_seconds
+                            )
+                            self.metrics.observe(
+                                domain, "parse", extractor.parse_seconds + parse_end - parse_start
+                            )
+                        if fingerprint and result.fingerprint is None:
+                            self._classify_links(domain, result)
+                            result.fingerprint = link_set_fingerprint(result.links, result.product_links)
+                        result.body_bytes = response.content.total_bytes
+                        host_metrics.bytes += result.body_bytes
+                        if not response.content.at_eof():
+                            # Truncated at max_body_size: drop the connection
+                            # rather than let the rest of the body be drained
+                            response.close()
+                            result.bytes_avoided = max(content_length - result.body_bytes, 0)
+
+                        if self._cache is not None:
+                            self._cache.put(
+                                url,
+                                response.headers.get('ETag'),
+                                response.headers.get('Last-Modified'),
+                                result.links
+                            )
+                            if self.incremental:
+                                result.cache_status = "miss"
+                        return result
 
             except asyncio.TimeoutError:
+                rate_limiter.record_error()
                 if retries < self.max_retries:
                     logger.warning(f"Timeout for {url}, retrying...")
                     await asyncio.sleep(self.retry_delay * (2 ** retries))
@@ -212,9 +1008,11 @@ class EcommerceCrawler:
                     continue
                 else:
                     logger.error(f"Max retries reached for {url} after timeout")
-                    return set()
+                    return PageResult()
 
             except Exception as e:
+                if isinstance(e, aiohttp.ClientConnectionError):
+                    rate_limiter.record_error()
                 if retries < self.max_retries:
                     logger.warning(f"Error processing {url}: {str(e)}, retrying...")
                     await asyncio.sleep(self.retry_delay * (2 ** retries))
@@ -222,34 +1020,146 @@ class EcommerceCrawler:
                     continue
                 else:
                     logger.error(f"Max retries reached for {url}: {str(e)}")
-                    return set()
+                    return PageResult()
+
+        return PageResult()  # Return empty result if all retries failed
+
+    @asynccontextmanager
+    async def _request_slot(self, domain: str) -> AsyncIterator[None]:
+        """
+        Hold a slot of the process-wide scheduler, when one is running.
+        """
+        if self._scheduler is None:
+            yield
+            return
+        async with self._scheduler.slot(domain):
+            yield
+
+    def _create_rate_limiter(self, share: int = 1) -> RateLimiter:
+        """
+        Create a domain's rate limiter. Bursts are only allowed in adaptive
+        mode; a fixed limiter sends exactly one request per crawl_delay.
+
+        Args:
+            share (int): Number of processes crawling the domain at once;
+                they split its request budget between them
+        """
+        return RateLimiter(
+            self.crawl_delay * share,
+            adaptive=self.adaptive_rate,
+            max_rate=self.max_rate / share,
+            burst=self.rate_burst if self.adaptive_rate else 1
+        )
 
-        return set()  # Return empty set if all retries failed
+    async def fetch_page(self, domain: str, url: str) -> PageResult:
+        """
+        Fetch and parse a single page inside running().
+
+        Used when the frontier is managed elsewhere (see distributed.py).
+        The domain's rate limiter is kept between calls, and product_links
+        is always filled in.
+        """
+        rate_limiter = self.rate_limiters.get(domain)
+        if rate_limiter is None:
+            rate_limiter = self.rate_limiters[domain] = self._create_rate_limiter()
+
+        result = await self._process_url(self._session, url, domain, rate_limiter)
+        self._classify_links(domain, result)
+        return result
+
+    def current_rates(self) -> Dict[str, float]:
+        """
+        Return the current request rate (requests/second) for each domain.
+        """
+        return {domain: limiter.rate for domain, limiter in self.rate_limiters.items()}
 
-    def _handle_batch_results(
+    def _handle_result(
         self,
-        results: List[Set[str]],
-        product_urls: Set[str]
-    ) -> Set[str]:
-        """
-        Handle results from a batch of URL processing tasks.
-        """
-        next_urls = set()
-        for result in results:
-            if isinstance(result, Exception):
-                logger.error(f"Batch processing error: {str(result)}")
-                continue
-            
-            for url in result:
-                if is_product_url(url):
-                    product_urls.add(url)
-                next_urls.add(url)
+        domain: str,
+        result: PageResult,
+        product_urls: ProductIndex,
+        shard: Optional[DomainShard] = None
+    ) -> List[str]:
+        """
+        Record product URLs from a processed page and return its links.
+
+        With a shard, only products the shard owns are recorded; the others
+        are recorded by their owner when the link is forwarded.
+        """
+        self._classify_links(domain, result)
+        new_products = product_urls.add_batch(
+            url for url in result.product_links if shard is None or shard.owns(url)
+        )
+        if new_products:
+            self._on_products(domain, new_products)
         
-        return next_urls
+        return result.links
+
+    @staticmethod
+    def _is_near_duplicate(
+        result: PageResult,
+        new_products: int,
+        index: Optional[NearDuplicateIndex]
+    ) -> bool:
+        """
+        Check a page against the pages already expanded, adding it to the
+        index if it is new.
+
+        A page that found new products is never a near-duplicate: on sites
+        whose navigation dominates every page's link set, product pages
+        differ only in a few related-product links.
+        """
+        if index is None or result.fingerprint is None:
+            return False
+        if new_products == 0 and index.find(result.fingerprint) is not None:
+            return True
+        index.add(result.fingerprint)
+        return False
+
+    def _classify_links(self, domain: str, result: PageResult) -> None:
+        """
+        Fill in result.product_links unless a parse job already did.
+        """
+        if result.product_links is not None:
+            return
+        started = time.perf_counter()
+        flags = self.classifier.classify_urls(result.links)
+        result.product_links = [
+            url for url, is_product in zip(result.links, flags) if is_product
+        ]
+        self.metrics.observe(domain, "classify", time.perf_counter() - started)
+
+    def shard_key(self, domain: str, url: str) -> str:
+        """
+        Return what decides which shard of a domain owns a URL: its product
+        key, so the shard recording a product also sees all its variants,
+        or else the URL itself.
+        """
+        if self.product_ids is not None:
+            key = self.product_ids.product_key(url, domain)
+            if key:
+                return f"product:{key}"
+        return url
+
+    def _on_products(self, domain: str, urls: List[str]) -> None:
+        """
+        Called with product URLs the first time they are discovered.
+        """
+        if self._sink is not None:
+            for url in urls:
+                self._sink.write({"domain": domain, "url": url})
+        if self._events is not None:
+            for url in urls:
+                self._events.put(CrawlEvent("product", domain, url))
+        if self._state_store is not None:
+            self._state_store.record_products(domain, urls)
+        if self.collect_product_urls:
+            self._collected_products[domain].extend(urls)
 
     def _save_results(self, results: Dict[str, Dict]) -> None:
         """
-        Save crawling results to a JSON file.
+        Save the run summary (per-domain stats and product file names) to a
+        JSON file. Product URLs themselves are in the JSONL product files.
         """
         output_file = os.path.join(
             self.output_dir,
@@ -257,6 +1167,6 @@ class EcommerceCrawler:
         )
         
         with open(output_file, 'w') as f:
-            json.dump(results, f, indent=2)
+            json.dump(build_summary(results, self.product_files), f, indent=2)
         
         logger.info(f"Results saved to {output_file}") 
\ No newline at end of file
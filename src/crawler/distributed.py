@@ -0,0 +1,622 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+from collections import deque
+from contextlib import AsyncExitStack
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+import aiohttp
+from .crawler import EcommerceCrawler
+from .utils.canonicalize import UrlCanonicalizer
+from .utils.url_patterns import ProductIdExtractor, is_non_html_url
+from .utils.result_sink import JsonlResultSink, build_summary
+from .utils.processes import get_process_context
+from .utils.product_index import ProductIndex, create_product_index
+from .utils.seen_set import SeenSet, create_seen_set, url_fingerprint
+from .utils.state_store import CrawlStateStore
+from .utils.user_agents import get_user_agent_pool
+
+logger = logging.getLogger(__name__)
+
+# Messages are single JSON lines; lease results can be large
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+
+async def open_server(address: str, handler) -> asyncio.AbstractServer:
+    """
+    Listen on "host:port" or "unix:/path".
+    """
+    if address.startswith("unix:"):
+        path = address[len("unix:"):]
+        if os.path.exists(path):
+            os.unlink(path)
+        return await asyncio.start_unix_server(handler, path, limit=MAX_MESSAGE_SIZE)
+    host, _, port = address.rpartition(":")
+    return await asyncio.start_server(handler, host or None, int(port), limit=MAX_MESSAGE_SIZE)
+
+async def open_connection(address: str) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    """
+    Connect to "host:port" or "unix:/path".
+    """
+    if address.startswith("unix:"):
+        return await asyncio.open_unix_connection(address[len("unix:"):], limit=MAX_MESSAGE_SIZE)
+    host, _, port = address.rpartition(":")
+    return await asyncio.open_connection(host, int(port), limit=MAX_MESSAGE_SIZE)
+
+async def send_message(writer: asyncio.StreamWriter, message: Dict) -> None:
+    writer.write(json.dumps(message, separators=(',', ':')).encode() + b"\n")
+    await writer.drain()
+
+async def read_message(reader: asyncio.StreamReader) -> Optional[Dict]:
+    """
+    Read the next message, or None once the peer has disconnected.
+    """
+    line = await reader.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+class _HostFrontier:
+    def __init__(self, domain: str, seen: SeenSet, products: ProductIndex):
+        self.domain = domain
+        self.pending: Deque[Tuple[str, int]] = deque()
+        self.seen = seen
+        self.products = products
+        self.lease: Optional[int] = None
+        self.done = False
+        self.pages_visited = 0
+        self.depth_reached = 0
+        self.leases_granted = 0
+        self.leases_reassigned = 0
+        self.urls_filtered_before_fetch = 0
+        self.start_time = datetime.now()
+
+class _Lease:
+    def __init__(self, lease_id: int, host: _HostFrontier, urls: List[Tuple[str, int]], timeout: float):
+        self.lease_id = lease_id
+        self.host = host
+        self.urls = urls
+        self.timeout = timeout
+        self.expires = time.monotonic() + timeout
+
+    def renew(self) -> None:
+        self.expires = time.monotonic() + self.timeout
+
+class CrawlCoordinator:
+    def __init__(
+        self,
+        address: str,
+        max_depth: int = 3,
+        output_dir: str = "output",
+        batch_size: int = 50,
+        lease_timeout: float = 120.0,
+        num_shards: int = 16,
+        seen_mode: str = "exact",
+        seen_capacity: int = 1024,
+        bloom_fp_rate: float = 0.001,
+        canonicalizer: Optional[UrlCanonicalizer] = None,
+        product_ids: Optional[ProductIdExtractor] = None,
+        output_compress: bool = False,
+        output_max_file_size: int = 256 * 1024 * 1024,
+        state_file: Optional[str] = None,
+        resume: bool = False,
+        checkpoint_interval: float = 5.0,
+        prefetch_filter: bool = True,
+        timeout: int = 30
+    ):
+        """
+        Initialize the coordinator of a multi-worker crawl.
+
+        The coordinator owns the frontier of every domain, partitioned into
+        num_shards shards by host hash. Workers connect over TCP or a Unix
+        socket and lease batches of URLs from one host at a time, so a host
+        is only crawled by one worker at once. Leases held by a worker that
+        disconnects, or not renewed within lease_timeout, go back to the
+        frontier for another worker. Product URLs reported by workers are
+        deduplicated and written to JSONL files here.
+
+        Links to non-HTML URLs are dropped before they reach the frontier
+        as in the other modes, but the template budget, near-duplicate
+        detection and page and time budgets of EcommerceCrawler are not
+        applied here.
+
+        Args:
+            address (str): "host:port" or "unix:/path" to listen on
+            max_depth (int): Maximum crawl depth
+            output_dir (str): Directory for product files and the summary
+            batch_size (int): Maximum URLs per lease
+            lease_timeout (float): Seconds a lease stays valid without renewal
+            num_shards (int): Number of frontier shards
+            seen_mode (str): Visited-URL structure, see create_seen_set()
+            seen_capacity (int): Initial capacity of each seen set
+            bloom_fp_rate (float): False-positive rate for seen_mode "bloom"
+            canonicalizer (UrlCanonicalizer): Applied to start URLs, with
+                the host each site is served from
+            product_ids (ProductIdExtractor): Deduplicates product URLs by
+                product key and drops links to known products' variants
+            output_compress (bool): Write gzip-compressed product files
+            output_max_file_size (int): Rotate product files after this many bytes
+            state_file (str): SQLite file for checkpoints, if any
+            resume (bool): Continue from the checkpoints in state_file
+            checkpoint_interval (float): Seconds between checkpoints
+            prefetch_filter (bool): Drop links to images, documents, assets
+                and other non-HTML URLs before they are leased
+            timeout (int): Seconds to wait for a start URL's served host
+        """
+        self.address = address
+        self.max_depth = max_depth
+        self.output_dir = output_dir
+        self.batch_size = batch_size
+        self.lease_timeout = lease_timeout
+        self.num_shards = num_shards
+        self.seen_mode = seen_mode
+        self.seen_capacity = seen_capacity
+        self.bloom_fp_rate = bloom_fp_rate
+        self.canonicalizer = canonicalizer
+        self.product_ids = product_ids
+        self.output_compress = output_compress
+        self.output_max_file_size = output_max_file_size
+        self.state_file = state_file
+        self.resume = resume
+        self.checkpoint_interval = checkpoint_interval
+        self.prefetch_filter = prefetch_filter
+        self.timeout = timeout
+        self.product_files: List[str] = []
+        self._shards: List[Dict[str, _HostFrontier]] = [{} for _ in range(num_shards)]
+        self._leases: Dict[int, _Lease] = {}
+        self._lease_ids = itertools.count(1)
+        self._shard_cursor = 0
+        self._changed: Optional[asyncio.Condition] = None
+        self._finished: Optional[asyncio.Event] = None
+        self._results: Dict[str, Dict] = {}
+        self._sink: Optional[JsonlResultSink] = None
+        self._store: Optional[CrawlStateStore] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.workers_connected = 0
+        self.workers_lost = 0
+
+    def _hosts(self):
+        for shard in self._shards:
+            yield from shard.values()
+
+    async def _add_domain(self, domain: str) -> None:
+        host = _HostFrontier(
+            domain,
+            create_seen_set(self.seen_mode, self.seen_capacity, self.bloom_fp_rate),
+            create_product_index(
+                self.seen_mode, self.seen_capacity, self.bloom_fp_rate, self.product_ids, domain
+            )
+        )
+        self._shards[url_fingerprint(domain) % self.num_shards][domain] = host
+
+        checkpoint = None
+        if self._store is not None:
+            if self.resume:
+                checkpoint = await self._store.load_domain(domain)
+            if checkpoint is not None and checkpoint["status"] == "complete":
+                logger.info(f"Skipping {domain}: already completed in a previous run")
+                host.done = True
+                self._results[domain] = {"stats": checkpoint["stats"]}
+                return
+            if checkpoint is not None and not (checkpoint["visited"] or checkpoint["pending"]):
+                checkpoint = None
+            if checkpoint is None:
+                await self._store.reset_domain(domain)
+
+        if checkpoint is not None:
+            host.pages_visited = len(checkpoint["visited"])
+            for url in checkpoint["visited"]:
+                host.seen.add(url)
+            for url, depth in checkpoint["pending"]:
+                if host.seen.add(url):
+                    host.pending.append((url, depth))
+            for url in checkpoint["product_urls"]:
+                host.products.add(url)
+        else:
+            start_url = f"https://{domain}"
+            if self.canonicalizer is not None:
+                # Workers canonicalize links with the host the site is served
+                # from, so the start URL has to use it too or the home page
+                # is leased again under the other host
+                await self._probe_served_host(domain, start_url)
+                start_url = self.canonicalizer.canonicalize(start_url)
+            self._enqueue(host, start_url, 0)
+
+    async def _probe_served_host(self, domain: str, url: str) -> None:
+        """
+        Send a HEAD request for a domain's start URL, following redirects,
+        and record the host it is served from (see
+        UrlCanonicalizer.prefer_host()). Only done for hosts whose rules
+        strip "www.", as in EcommerceCrawler.
+        """
+        if not self.canonicalizer.rules_for(domain.split(':')[0].lower()).strip_www:
+            return
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        try:
+            async with self._session.head(
+                url,
+                headers=get_user_agent_pool().random_headers(),
+                allow_redirects=True,
+                ssl=False
+            ) as response:
+                if response.url.host:
+                    self.canonicalizer.prefer_host(response.url.host)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Could not determine the served host of {domain}: {str(e)}")
+
+    def _enqueue(self, host: _HostFrontier, url: str, depth: int) -> None:
+        if depth > self.max_depth:
+            return
+        if self.prefetch_filter and is_non_html_url(url):
+            # Images, documents, assets and feeds are never fetched
+            host.urls_filtered_before_fetch += 1
+            return
+        if host.products.is_variant(url):
+            return
+        if host.seen.add(url):
+            host.pending.append((url, depth))
+            if self._store is not None:
+                self._store.record_enqueued(host.domain, url, depth)
+
+    def _grant(self, last_domain: Optional[str]) -> Optional[_Lease]:
+        """
+        Lease a batch from a host that has pending URLs and no active lease,
+        preferring the host the worker crawled last so it can reuse its
+        connections.
+        """
+        candidate = None
+        if last_domain is not None:
+            host = self._shards[url_fingerprint(last_domain) % self.num_shards].get(last_domain)
+            if host is not None and host.pending and host.lease is None:
+                candidate = host
+
+        for offset in range(self.num_shards):
+            if candidate is not None:
+                break
+            shard = self._shards[(self._shard_cursor + offset) % self.num_shards]
+            for host in shard.values():
+                if host.pending and host.lease is None:
+                    candidate = host
+                    self._shard_cursor = (self._shard_cursor + offset + 1) % self.num_shards
+                    break
+        if candidate is None:
+            return None
+
+        urls = [
+            candidate.pending.popleft()
+            for _ in range(min(self.batch_size, len(candidate.pending)))
+        ]
+        lease = _Lease(next(self._lease_ids), candidate, urls, self.lease_timeout)
+        candidate.lease = lease.lease_id
+        candidate.leases_granted += 1
+        self._leases[lease.lease_id] = lease
+        return lease
+
+    def _requeue(self, lease: _Lease) -> None:
+        del self._leases[lease.lease_id]
+        host = lease.host
+        host.lease = None
+        host.leases_reassigned += 1
+        host.pending.extendleft(reversed(lease.urls))
+
+    async def _complete(self, lease: _Lease, pages: List[Dict]) -> None:
+        del self._leases[lease.lease_id]
+        host = lease.host
+        host.lease = None
+        depths = dict(lease.urls)
+
+        for page in pages:
+            url = page["url"]
+            depth = depths.get(url, self.max_depth)
+            host.pages_visited += 1
+            host.depth_reached = max(host.depth_reached, depth)
+
+            new_products = host.products.add_batch(page.get("products", []))
+            if new_products:
+                for product in new_products:
+                    self._sink.write({"domain": host.domain, "url": product})
+                if self._store is not None:
+                    self._store.record_products(host.domain, new_products)
+
+            for link in page.get("links", []):
+                self._enqueue(host, link, depth + 1)
+            if self._store is not None:
+                self._store.record_visited(host.domain, url)
+
+        if not host.pending:
+            await self._finish_domain(host)
+
+    async def _finish_domain(self, host: _HostFrontier) -> None:
+        host.done = True
+        end_time = datetime.now()
+        duration = (end_time - host.start_time).total_seconds()
+        stats = {
+            "total_urls_found": len(host.products),
+            "total_urls_visited": host.pages_visited,
+            "depth_reached": host.depth_reached,
+            "pages_per_second": host.pages_visited / duration if duration else 0.0,
+            "products_per_page": len(host.products) / host.pages_visited if host.pages_visited else 0.0,
+            "leases_granted": host.leases_granted,
+            "leases_reassigned": host.leases_reassigned,
+            "product_variants_skipped": len(host.products.variants),
+            "urls_filtered_before_fetch": host.urls_filtered_before_fetch,
+            "crawl_time": {
+                "start": host.start_time.isoformat(),
+                "end": end_time.isoformat(),
+                "duration_seconds": duration
+            }
+        }
+        self._results[host.domain] = {"stats": stats}
+        logger.info(f"Finished {host.domain}: {stats['total_urls_found']} products, {host.pages_visited} pages")
+        if self._store is not None:
+            await self._store.mark_domain_complete(host.domain, stats)
+
+    def _all_done(self) -> bool:
+        return not self._leases and all(host.done for host in self._hosts())
+
+    async def _notify(self) -> None:
+        async with self._changed:
+            self._changed.notify_all()
+        if self._all_done():
+            self._finished.set()
+
+    async def _expire_leases(self) -> None:
+        while True:
+            await asyncio.sleep(min(self.lease_timeout / 4, 5.0))
+            now = time.monotonic()
+            expired = [lease for lease in self._leases.values() if lease.expires < now]
+            for lease in expired:
+                logger.warning(f"Lease {lease.lease_id} for {lease.host.domain} expired, reassigning")
+                self._requeue(lease)
+            if expired:
+                await self._notify()
+
+    async def _handle_worker(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.workers_connected += 1
+        held: Dict[int, _Lease] = {}
+        last_domain = None
+        try:
+            while True:
+                message = await read_message(reader)
+                if message is None:
+                    break
+                kind = message["type"]
+
+                if kind == "renew":
+                    lease = held.get(message["lease"])
+                    if lease is not None and lease.lease_id in self._leases:
+                        lease.renew()
+
+                elif kind == "result":
+                    lease = held.pop(message["lease"], None)
+                    # Results of a lease that expired and was handed out
+                    # again are dropped; the new holder reports them
+                    if lease is not None and self._leases.get(lease.lease_id) is lease:
+                        await self._complete(lease, message["pages"])
+                        await self._notify()
+
+                elif kind == "lease":
+                    # A worker that died while waiting must not be granted work
+                    while not reader.at_eof():
+                        lease = self._grant(last_domain)
+                        if lease is not None:
+                            held[lease.lease_id] = lease
+                            last_domain = lease.host.domain
+                            await send_message(writer, {
+                                "type": "lease",
+                                "lease": lease.lease_id,
+                                "domain": lease.host.domain,
+                                "max_depth": self.max_depth,
+                                "renew_interval": self.lease_timeout / 3,
+                                "urls": lease.urls
+                            })
+                            break
+                        if self._finished.is_set():
+                            await send_message(writer, {"type": "done"})
+                            break
+                        async with self._changed:
+                            try:
+                                await asyncio.wait_for(self._changed.wait(), timeout=1.0)
+                            except asyncio.TimeoutError:
+                                pass
+        except (ConnectionError, json.JSONDecodeError) as e:
+            logger.warning(f"Worker connection failed: {str(e)}")
+        finally:
+            lost = [lease for lease in held.values() if self._leases.get(lease.lease_id) is lease]
+            if lost:
+                self.workers_lost += 1
+                logger.warning(f"Worker disconnected holding {len(lost)} leases, reassigning")
+                for lease in lost:
+                    self._requeue(lease)
+                await self._notify()
+            writer.close()
+
+    async def run(
+        self,
+        domains: List[str],
+        local_workers: int = 0,
+        worker_config: Optional[Dict] = None,
+        worker_slots: int = 4
+    ) -> Dict[str, Dict]:
+        """
+        Serve leases until every domain is crawled.
+
+        Args:
+            domains: Domains to crawl
+            local_workers (int): Worker processes to start on this machine
+            worker_config (Dict): EcommerceCrawler settings for local workers
+            worker_slots (int): Concurrent leases per local worker
+
+        Returns:
+            Dict mapping domains to their results
+        """
+        self._changed = asyncio.Condition()
+        self._finished = asyncio.Event()
+        processes = []
+
+        async with AsyncExitStack() as stack:
+            self._sink = await stack.enter_async_context(JsonlResultSink(
+                self.output_dir,
+                compress=self.output_compress,
+                max_file_size=self.output_max_file_size
+            ))
+            if self.state_file:
+                self._store = await stack.enter_async_context(
+                    CrawlStateStore(self.state_file, self.checkpoint_interval)
+                )
+
+            stack.push_async_callback(self._close_session)
+            for domain in domains:
+                await self._add_domain(domain)
+            for host in list(self._hosts()):
+                if not host.done and not host.pending:
+                    await self._finish_domain(host)
+            if self._all_done():
+                self._finished.set()
+
+            server = await open_server(self.address, self._handle_worker)
+            stack.callback(server.close)
+            logger.info(f"Coordinator listening on {self.address}")
+            for _ in range(local_workers):
+                process = get_process_context().Process(
+                    target=run_worker_process,
+                    args=(self.address, worker_config or {}, worker_slots)
+                )
+                process.start()
+                processes.append(process)
+
+            expiry = asyncio.create_task(self._expire_leases())
+            stack.callback(expiry.cancel)
+            await self._finished.wait()
+            # Wake workers waiting for a lease so they receive "done"
+            async with self._changed:
+                self._changed.notify_all()
+            await asyncio.sleep(0.5)
+
+            self.product_files = list(self._sink.files)
+        self._sink = None
+        self._store = None
+
+        for process in processes:
+            await asyncio.to_thread(process.join, 30)
+            if process.is_alive():
+                process.terminate()
+
+        results = {domain: self._results[domain] for domain in domains if domain in self._results}
+        self._save_results(results)
+        return results
+
+    async def _close_session(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _save_results(self, results: Dict[str, Dict]) -> None:
+        output_file = os.path.join(
+            self.output_dir,
+            f"distributed_crawl_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        )
+        summary = build_summary(results, self.product_files)
+        summary["workers_connected"] = self.workers_connected
+        summary["workers_lost"] = self.workers_lost
+        with open(output_file, 'w') as f:
+            json.dump(summary, f, indent=2)
+        logger.info(f"Results saved to {output_file}")
+
+class CrawlWorker:
+    def __init__(self, address: str, crawler: EcommerceCrawler, slots: int = 4, connect_timeout: float = 30.0):
+        """
+        Initialize a worker that crawls URLs leased from a CrawlCoordinator.
+
+        Each slot holds its own connection and works on one lease at a time,
+        fetching the leased URLs with the crawler and reporting the links
+        and product URLs it finds.
+
+        Args:
+            address (str): Coordinator address, "host:port" or "unix:/path"
+            crawler (EcommerceCrawler): Crawler used to fetch pages
+            slots (int): Number of leases processed concurrently
+            connect_timeout (float): Seconds to keep retrying the first connection
+        """
+        self.address = address
+        self.crawler = crawler
+        self.slots = slots
+        self.connect_timeout = connect_timeout
+        self.pages_fetched = 0
+
+    async def run(self) -> None:
+        """
+        Process leases until the coordinator reports the crawl is done.
+        """
+        async with self.crawler.running():
+            await asyncio.gather(*(self._run_slot() for _ in range(self.slots)))
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                return await open_connection(self.address)
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.5)
+
+    async def _run_slot(self) -> None:
+        reader, writer = await self._connect()
+        try:
+            while True:
+                await send_message(writer, {"type": "lease"})
+                message = await read_message(reader)
+                if message is None or message["type"] == "done":
+                    return
+                pages = await self._process_lease(writer, message)
+                await send_message(writer, {
+                    "type": "result",
+                    "lease": message["lease"],
+                    "pages": pages
+                })
+        except ConnectionError as e:
+            logger.warning(f"Lost connection to coordinator: {str(e)}")
+        finally:
+            writer.close()
+
+    async def _process_lease(self, writer: asyncio.StreamWriter, lease: Dict) -> List[Dict]:
+        domain = lease["domain"]
+        max_depth = lease["max_depth"]
+        limit = asyncio.Semaphore(self.crawler.max_concurrent_requests)
+
+        async def fetch(url: str, depth: int) -> Dict:
+            async with limit:
+                result = await self.crawler.fetch_page(domain, url)
+            self.pages_fetched += 1
+            return {
+                "url": url,
+                "links": result.links if depth < max_depth else [],
+                "products": result.product_links
+            }
+
+        async def renew() -> None:
+            while True:
+                await asyncio.sleep(lease["renew_interval"])
+                await send_message(writer, {"type": "renew", "lease": lease["lease"]})
+
+        renewer = asyncio.create_task(renew())
+        try:
+            return await asyncio.gather(*(fetch(url, depth) for url, depth in lease["urls"]))
+        finally:
+            renewer.cancel()
+            await asyncio.gather(renewer, return_exceptions=True)
+
+def run_worker_process(address: str, config: Dict, slots: int) -> None:
+    """
+    Entry point of a worker process.
+    """
+    worker = CrawlWorker(address, EcommerceCrawler(**config), slots)
+    try:
+        asyncio.run(worker.run())
+    except KeyboardInterrupt:
+        pass
+    logger.info(f"Worker {os.getpid()} finished after {worker.pages_fetched} pages")
@@ -0,0 +1,105 @@
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+
+# Event kinds yielded by the stream() APIs
+EVENT_KINDS = ("product", "page", "domain")
+
+@dataclass
+class CrawlEvent:
+    """
+    Something that happened during a crawl, as yielded by stream().
+
+    kind is "product" for a newly discovered product URL (url), "page" for
+    a fetched page (url, depth and the new_products it led to) and
+    "domain" once a domain has finished (result, as returned by
+    crawl_domain(), with "stats" or "error"). A domain's "domain" event
+    comes after all of its other events.
+    """
+    kind: str
+    domain: str
+    url: Optional[str] = None
+    depth: int = 0
+    new_products: int = 0
+    result: Optional[Dict] = None
+
+class EventChannel:
+    def __init__(self, max_pending: int = 1000):
+        """
+        Initialize a channel from crawl workers to a single consumer.
+
+        put() never blocks, so events can be emitted from synchronous code.
+        Backpressure is applied at page granularity instead: crawl workers
+        await wait_writable() before fetching their next page, and that
+        waits while max_pending or more events have not been taken. The
+        channel can therefore exceed max_pending by the events of the pages
+        already being processed.
+
+        Args:
+            max_pending (int): Untaken events at which producers are held back
+        """
+        self.max_pending = max(max_pending, 1)
+        self._events: Deque[CrawlEvent] = deque()
+        self._put = 0
+        self._done = 0
+        self._closed = False
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._writable.set()
+        self._progress = asyncio.Event()
+
+    def put(self, event: CrawlEvent) -> None:
+        self._events.append(event)
+        self._put += 1
+        self._readable.set()
+        if len(self._events) >= self.max_pending:
+            self._writable.clear()
+
+    async def wait_writable(self) -> None:
+        """
+        Wait until the consumer has caught up below max_pending.
+        """
+        await self._writable.wait()
+
+    async def get_batch(self, max_events: int = 100) -> Optional[List[CrawlEvent]]:
+        """
+        Wait for events and take up to max_events of them. Pair every batch
+        with task_done().
+
+        Returns:
+            List[CrawlEvent]: The events, or None once the channel is closed
+                and empty
+        """
+        while not self._events:
+            if self._closed:
+                return None
+            self._readable.clear()
+            await self._readable.wait()
+        batch = [self._events.popleft() for _ in range(min(max_events, len(self._events)))]
+        if len(self._events) < self.max_pending:
+            self._writable.set()
+        return batch
+
+    def task_done(self, count: int) -> None:
+        """
+        Mark count taken events as fully handled.
+        """
+        self._done += count
+        self._progress.set()
+
+    async def drained(self) -> None:
+        """
+        Wait until every event put so far has been handled.
+        """
+        target = self._put
+        while self._done < target:
+            self._progress.clear()
+            await self._progress.wait()
+
+    def close(self) -> None:
+        """
+        Let get_batch() return None once the remaining events are taken.
+        """
+        self._closed = True
+        self._readable.set()
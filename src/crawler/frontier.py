@@ -0,0 +1,278 @@
+import asyncio
+import itertools
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+from .utils.seen_set import ExactSeenSet, SeenSet
+from .utils.url_patterns import ProductUrlClassifier, is_pagination_url, url_template
+
+logger = logging.getLogger(__name__)
+
+# Throttled templates listed in the crawl stats, most dropped URLs first
+MAX_REPORTED_TEMPLATES = 20
+
+class _TemplateCounts:
+    __slots__ = ("admitted", "dropped", "fetched", "productive", "window_productive", "throttled")
+
+    def __init__(self):
+        self.admitted = 0
+        self.dropped = 0
+        self.fetched = 0
+        self.productive = 0
+        self.window_productive = 0
+        self.throttled: Optional[str] = None
+
+class TemplateBudget:
+    def __init__(
+        self,
+        max_urls: int = 1000,
+        probe_pages: int = 50,
+        min_yield: float = 0.02,
+        max_templates: int = 100000,
+        classifier: Optional[ProductUrlClassifier] = None,
+        domain: str = ""
+    ):
+        """
+        Initialize per-template URL budgets for one domain.
+
+        URLs are grouped by url_template(). A template is throttled once
+        max_urls of its URLs have been admitted ("budget"), or once fewer
+        than min_yield of probe_pages consecutively fetched pages led
+        anywhere new ("unbounded"): calendars, session-ID copies and filter
+        combinations keep producing URLs of their own template and nothing
+        else. Yield is judged per window of probe_pages so a template that
+        stops paying off is caught even after a productive start. Product
+        URLs are always admitted, and pagination URLs (see
+        is_pagination_url()) are exempt from the budget, so a large
+        category is paged through for as long as its pages find products.
+        Every throttled template is logged.
+
+        Args:
+            max_urls (int): URLs admitted per template (0 for no limit)
+            probe_pages (int): Fetched pages of a template before its yield is judged
+            min_yield (float): Share of productive pages below which a template is unbounded
+            max_templates (int): Templates tracked; URLs of further templates are admitted
+            classifier (ProductUrlClassifier): Recognizes the exempt product URLs
+            domain (str): Domain named in log messages
+        """
+        self.max_urls = max_urls
+        self.probe_pages = probe_pages
+        self.min_yield = min_yield
+        self.max_templates = max_templates
+        self.classifier = classifier
+        self.domain = domain
+        self._templates: Dict[str, _TemplateCounts] = {}
+
+    def admit(self, url: str) -> bool:
+        """
+        Count a newly discovered URL against its template.
+
+        Returns:
+            bool: False if the template is throttled
+        """
+        if self.classifier is not None and self.classifier.is_product_url(url):
+            return True
+        template = url_template(url)
+        counts = self._counts(template)
+        if counts is None:
+            return True
+        pagination = is_pagination_url(url)
+        if (
+            counts.throttled is None
+            and self.max_urls
+            and counts.admitted >= self.max_urls
+            and not pagination
+        ):
+            self._throttle(template, counts, "budget")
+        if counts.throttled == "unbounded" or (counts.throttled == "budget" and not pagination):
+            counts.dropped += 1
+            return False
+        counts.admitted += 1
+        return True
+
+    def record_page(self, url: str, new_products: int, enqueued: Iterable[str]) -> None:
+        """
+        Record the outcome of expanding a fetched page.
+
+        The page was productive if it found new products or enqueued a URL
+        of another template.
+        """
+        template = url_template(url)
+        counts = self._templates.get(template)
+        if counts is None:
+            return
+        counts.fetched += 1
+        if new_products or any(url_template(new_url) != template for new_url in enqueued):
+            counts.productive += 1
+            counts.window_productive += 1
+        if counts.fetched % self.probe_pages == 0:
+            if counts.throttled != "unbounded" and counts.window_productive < self.min_yield * self.probe_pages:
+                self._throttle(template, counts, "unbounded")
+            counts.window_productive = 0
+
+    def _throttle(self, template: str, counts: _TemplateCounts, reason: str) -> None:
+        counts.throttled = reason
+        if reason == "budget":
+            logger.info(
+                f"URL template {template} of {self.domain} reached its budget of "
+                f"{self.max_urls} URLs; dropping further non-pagination URLs of it"
+            )
+        else:
+            logger.info(
+                f"URL template {template} of {self.domain} throttled as unbounded: "
+                f"{counts.window_productive} of the last {self.probe_pages} pages led anywhere new"
+            )
+
+    def _counts(self, template: str) -> Optional[_TemplateCounts]:
+        counts = self._templates.get(template)
+        if counts is None and len(self._templates) < self.max_templates:
+            counts = self._templates[template] = _TemplateCounts()
+        return counts
+
+    def stats(self) -> Dict:
+        """
+        Return a summary suitable for the crawl stats.
+        """
+        throttled = sorted(
+            (item for item in self._templates.items() if item[1].throttled is not None),
+            key=lambda item: item[1].dropped,
+            reverse=True
+        )
+        reported: List[Dict] = [
+            {
+                "template": template,
+                "reason": counts.throttled,
+                "urls_admitted": counts.admitted,
+                "urls_dropped": counts.dropped,
+                "pages_fetched": counts.fetched,
+                "productive_pages": counts.productive,
+            }
+            for template, counts in throttled[:MAX_REPORTED_TEMPLATES]
+        ]
+        return {
+            "templates": len(self._templates),
+            "throttled_count": len(throttled),
+            "urls_dropped": sum(counts.dropped for _, counts in throttled),
+            "throttled": reported,
+        }
+
+class Frontier:
+    def __init__(
+        self,
+        max_depth: int,
+        seen: Optional[SeenSet] = None,
+        prioritized: bool = False,
+        templates: Optional[TemplateBudget] = None
+    ):
+        """
+        Initialize a per-domain crawl frontier.
+
+        URLs are queued together with the depth at which they were discovered,
+        so workers can keep pulling from a single queue while the crawl still
+        respects max_depth.
+
+        Args:
+            max_depth (int): Deepest level that may be enqueued
+            seen (SeenSet): Structure used to remember accepted URLs.
+                Defaults to an ExactSeenSet.
+            prioritized (bool): Hand out the highest-priority URL first
+                (best-first) instead of in discovery order (breadth-first).
+                URLs of equal priority keep discovery order.
+            templates (TemplateBudget): Refuse new URLs of throttled templates
+        """
+        self.max_depth = max_depth
+        self.seen = seen if seen is not None else ExactSeenSet()
+        self.prioritized = prioritized
+        self.templates = templates
+        self.closed = False
+        self._queue: asyncio.Queue = asyncio.PriorityQueue() if prioritized else asyncio.Queue()
+        self._order = itertools.count()
+
+    def add(
+        self,
+        url: str,
+        depth: int,
+        priority: float = 0.0
+    ) -> bool:
+        """
+        Enqueue a URL unless it is too deep, has already been seen or
+        belongs to a throttled template.
+
+        Args:
+            url (str): URL to enqueue
+            depth (int): Depth at which the URL was discovered
+            priority (float): Higher is handed out first when prioritized
+
+        Returns:
+            bool: True if the URL was enqueued
+        """
+        if self.closed or depth > self.max_depth or not self.seen.add(url):
+            return False
+        # Throttled URLs stay seen: a template's budget only ever shrinks
+        if self.templates is not None and not self.templates.admit(url):
+            return False
+
+        self._put(url, depth, priority)
+        return True
+
+    def _put(self, url: str, depth: int, priority: float) -> None:
+        if self.prioritized:
+            self._queue.put_nowait((-priority, next(self._order), url, depth))
+        else:
+            self._queue.put_nowait((url, depth))
+
+    def restore(
+        self,
+        visited: Iterable[str],
+        pending: Iterable[Tuple[str, int]]
+    ) -> None:
+        """
+        Reload frontier state saved by a previous run.
+
+        Args:
+            visited: URLs that were already processed
+            pending: (url, depth) entries that were still waiting
+        """
+        for url in visited:
+            self.seen.add(url)
+        for url, depth in pending:
+            if self.seen.add(url):
+                # Scores are not checkpointed; shallower URLs go first
+                self._put(url, depth, -depth)
+
+    async def get(self) -> Tuple[str, int]:
+        """
+        Wait for the next (url, depth) entry.
+        """
+        entry = await self._queue.get()
+        return entry[-2:] if self.prioritized else entry
+
+    def close(self) -> int:
+        """
+        Drop every queued URL and refuse new ones, e.g. when a crawl budget
+        is used up. Entries already handed out still need task_done().
+
+        Returns:
+            int: Number of URLs dropped
+        """
+        self.closed = True
+        dropped = 0
+        while not self._queue.empty():
+            self._queue.get_nowait()
+            self._queue.task_done()
+            dropped += 1
+        return dropped
+
+    def task_done(self) -> None:
+        """
+        Mark an entry returned by get() as fully processed.
+        """
+        self._queue.task_done()
+
+    async def join(self) -> None:
+        """
+        Wait until every enqueued URL has been processed.
+        """
+        await self._queue.join()
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
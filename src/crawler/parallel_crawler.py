@@ -1,98 +1,503 @@
 import multiprocessing
 import asyncio
-from typing import List, Dict
+import concurrent.futures
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Callable, Iterator, List, Dict, Optional, Tuple
 import os
 import json
 from datetime import datetime
 import logging
 from .crawler import EcommerceCrawler
+from .events import CrawlEvent, EventChannel
+from .sharding import DomainShard, ShardTracker, merge_shard_results
+from .utils.metrics import MetricsPublisher, merge_snapshots
+from .utils.processes import get_process_context, process_usage
+from .utils.result_sink import build_summary
 
 logger = logging.getLogger(__name__)
 
-def crawl_domain_wrapper(args):
+# Events a worker sends per "events" message when streaming
+STREAM_BATCH_SIZE = 100
+
+def _failed_result(error: str) -> Dict:
+    return {
+        "error": error,
+        "stats": {
+            "crawl_time": datetime.now().isoformat(),
+            "status": "failed"
+        }
+    }
+
+def crawl_worker_main(
+    worker_id: int,
+    config: Dict,
+    tasks: multiprocessing.Queue,
+    inbox: multiprocessing.Queue,
+    results: multiprocessing.Queue,
+    domains_per_worker: int,
+    stream_events: int = 0
+) -> None:
     """
-    Wrapper function to run crawler in a separate process.
+    Entry point of a crawler worker process.
+
+    Runs one event loop for the life of the process. Up to
+    domains_per_worker domains taken from the shared task queue are crawled
+    at once, together with any domain shards assigned through inbox.
+
+    With stream_events, product and page events are sent in batches, all
+    of a domain's before its result. At most stream_events events are
+    buffered or sent without a ("credit",) from the parent for every
+    batch it has taken; beyond that the crawl waits.
+
+    Messages sent on results:
+        ("started", worker_id, domain)
+        ("result", worker_id, domain, result)
+        ("shard_result", worker_id, domain, index, result)
+        ("events", worker_id, [CrawlEvent, ...]) when streaming
+        ("links", domain, target_index, batch) and ("idle", ...) from shards
+        ("metrics", worker_id, snapshot) every metrics_interval seconds
+        ("done", worker_id, product_files, usage), usage as of process_usage()
     """
-    domain, config = args
-    
-    # Set up asyncio event loop for this process
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    
-    # Initialize crawler with config
+    try:
+        asyncio.run(_run_worker(
+            worker_id, config, tasks, inbox, results, domains_per_worker, stream_events
+        ))
+    except KeyboardInterrupt:
+        pass
+
+async def _run_worker(
+    worker_id: int,
+    config: Dict,
+    tasks: multiprocessing.Queue,
+    inbox: multiprocessing.Queue,
+    results: multiprocessing.Queue,
+    domains_per_worker: int,
+    stream_events: int = 0
+) -> None:
+    loop = asyncio.get_running_loop()
+    # Dedicated threads for the blocking queue reads, so they never hold up
+    # the default executor used by the state store and HTTP cache
+    queue_readers = ThreadPoolExecutor(max_workers=2)
     crawler = EcommerceCrawler(**config)
-    
+    shards: Dict[Tuple[str, int], DomainShard] = {}
+    running: set = set()
+    events: Optional[EventChannel] = None
+    credits = asyncio.Semaphore(max(stream_events // STREAM_BATCH_SIZE, 1))
+    if stream_events:
+        events = crawler._events = EventChannel(stream_events)
+
+    async def forward_events() -> None:
+        while True:
+            batch = await events.get_batch(STREAM_BATCH_SIZE)
+            if batch is None:
+                return
+            await credits.acquire()
+            results.put(("events", worker_id, batch))
+            events.task_done(len(batch))
+
+    async def crawl_domain(domain: str) -> None:
+        results.put(("started", worker_id, domain))
+        result = await crawler.crawl_domain(domain)
+        if events is not None:
+            await events.drained()
+        results.put(("result", worker_id, domain, result))
+
+    async def crawl_shard(shard: DomainShard) -> None:
+        result = await crawler.crawl_domain(shard.domain, shard)
+        result["stats"]["links_forwarded"] = shard.links_forwarded
+        if events is not None:
+            await events.drained()
+        results.put(("shard_result", worker_id, shard.domain, shard.index, result))
+
+    def start(coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        running.add(task)
+        task.add_done_callback(running.discard)
+        return task
+
+    async def pull_domains() -> None:
+        # Only take a domain from the shared queue when a slot is free, so
+        # idle processes pick up the remaining work
+        slots = asyncio.Semaphore(domains_per_worker)
+        while True:
+            await slots.acquire()
+            domain = await loop.run_in_executor(queue_readers, tasks.get)
+            if domain is None:
+                return
+            start(crawl_domain(domain)).add_done_callback(lambda _: slots.release())
+
+    async def read_inbox() -> None:
+        while True:
+            message = await loop.run_in_executor(queue_readers, inbox.get)
+            kind = message[0]
+            if kind == "stop":
+                return
+            if kind == "credit":
+                credits.release()
+            elif kind == "shard":
+                _, domain, index, count = message
+                shard = DomainShard(
+                    domain, index, count, results.put, partial(crawler.shard_key, domain)
+                )
+                shards[(domain, index)] = shard
+                start(crawl_shard(shard))
+            elif kind == "links":
+                _, domain, index, batch = message
+                shard = shards.get((domain, index))
+                if shard is not None:
+                    shard.deliver(batch)
+            elif kind == "finish":
+                _, domain, index = message
+                shard = shards.pop((domain, index), None)
+                if shard is not None:
+                    shard.finish()
+
+    async def report_metrics() -> None:
+        while True:
+            await asyncio.sleep(crawler.metrics_interval)
+            results.put(("metrics", worker_id, crawler.metrics.snapshot()))
+
+    reporter = asyncio.create_task(report_metrics())
+    forwarder = asyncio.create_task(forward_events()) if events is not None else None
     try:
-        # Run crawler for single domain
-        result = loop.run_until_complete(crawler.crawl_domains([domain]))
-        return domain, result[domain]
-    except Exception as e:
-        logger.error(f"Error crawling {domain}: {str(e)}")
-        return domain, {
-            "product_urls": [],
-            "error": str(e),
-            "stats": {
-                "crawl_time": datetime.now().isoformat(),
-                "status": "failed"
-            }
-        }
+        async with crawler.running():
+            await asyncio.gather(pull_domains(), read_inbox())
+            while running:
+                await asyncio.gather(*list(running))
+        if forwarder is not None:
+            events.close()
+            await forwarder
+        reporter.cancel()
+        results.put(("metrics", worker_id, crawler.metrics.snapshot()))
+        results.put(("done", worker_id, crawler.product_files, process_usage()))
     finally:
-        loop.close()
+        reporter.cancel()
+        if forwarder is not None:
+            forwarder.cancel()
+        queue_readers.shutdown(wait=False)
 
 class ParallelCrawler:
     def __init__(
         self,
         max_processes: int = None,
+        domains_per_worker: int = 4,
+        shard_domains: Optional[List[str]] = None,
+        shards_per_domain: Optional[int] = None,
         **crawler_config
     ):
         """
         Initialize parallel crawler.
-        
+
         Args:
             max_processes: Maximum number of processes to use. Defaults to CPU count.
+            domains_per_worker: Domains each process crawls concurrently.
+            shard_domains: Domains split across processes by URL hash.
+            shards_per_domain: Number of shards for each of shard_domains.
+                Defaults to max_processes.
             **crawler_config: Configuration to pass to each EcommerceCrawler instance.
         """
         self.max_processes = max_processes or multiprocessing.cpu_count()
+        self.domains_per_worker = max(domains_per_worker, 1)
+        self.shard_domains = list(shard_domains or [])
+        self.shards_per_domain = min(shards_per_domain or self.max_processes, self.max_processes)
         self.crawler_config = crawler_config
+        self.product_files: List[str] = []
+        # CPU time and peak RSS reported by each worker when it finishes
+        self.worker_usage: Dict[int, Dict[str, float]] = {}
+
+        # Workers send their metrics here; the merged view is published
+        # by this process only
+        self.metrics_file = self.crawler_config.pop('metrics_file', None)
+        self.metrics_port = self.crawler_config.pop('metrics_port', None)
+        self.metrics_snapshots: Dict[int, Dict] = {}
+
+        # Worker processes are daemonic and cannot start their own parse pools
+        if self.crawler_config.get('parse_workers'):
+            logger.warning("parse_workers is ignored in parallel mode")
+            self.crawler_config['parse_workers'] = 0
 
     def crawl(self, domains: List[str]) -> Dict[str, Dict]:
         """
         Crawl multiple domains in parallel using multiple processes.
-        
+
         Args:
             domains: List of domains to crawl
-            
+
         Returns:
             Dict mapping domains to their crawl results
         """
+        results = {}
+        for domain, result in self.iter_results(domains):
+            stats = result.get('stats', {})
+            logger.info(
+                f"Finished {domain}: {stats.get('total_urls_found', 0)} products, "
+                f"{stats.get('total_urls_visited', 0)} pages"
+            )
+            results[domain] = result
+
+        self._save_results(results)
+        return results
+
+    async def stream(
+        self,
+        domains: List[str],
+        max_pending_events: int = 1000
+    ) -> AsyncIterator[CrawlEvent]:
+        """
+        Crawl domains in worker processes, yielding CrawlEvents as they
+        happen: product URLs as they are discovered, fetched pages and each
+        domain's result once it finishes.
+
+        The worker messages are read in a thread and handed over one batch
+        at a time, so a slow consumer holds the workers back once
+        max_pending_events are buffered per worker. Leaving the loop early
+        stops the crawl and its workers. Product files and the run summary
+        are written as with crawl().
+
+        Args:
+            domains: List of domains to crawl
+            max_pending_events: Events each worker may buffer ahead of the
+                consumer
+
+        Yields:
+            CrawlEvent: Events of all domains, interleaved
+        """
+        loop = asyncio.get_running_loop()
+        handoff: asyncio.Queue = asyncio.Queue(maxsize=1)
+        cancelled = threading.Event()
+        results: Dict[str, Dict] = {}
+
+        def hand_over(batch: Optional[List[CrawlEvent]]) -> None:
+            future = asyncio.run_coroutine_threadsafe(handoff.put(batch), loop)
+            while not cancelled.is_set():
+                try:
+                    future.result(timeout=1.0)
+                    return
+                except concurrent.futures.TimeoutError:
+                    continue
+            future.cancel()
+
+        def read_messages() -> None:
+            try:
+                for domain, result in self.iter_results(
+                    domains, hand_over, max_pending_events, cancelled
+                ):
+                    results[domain] = result
+                    hand_over([CrawlEvent("domain", domain, result=result)])
+            finally:
+                hand_over(None)
+
+        reader = loop.run_in_executor(None, read_messages)
+        try:
+            while True:
+                batch = await handoff.get()
+                if batch is None:
+                    break
+                for event in batch:
+                    yield event
+            await reader
+        finally:
+            cancelled.set()
+            await asyncio.gather(reader, return_exceptions=True)
+
+        self._save_results(results)
+
+    def iter_results(
+        self,
+        domains: List[str],
+        on_events: Optional[Callable[[List[CrawlEvent]], None]] = None,
+        max_pending_events: int = 1000,
+        cancelled: Optional[threading.Event] = None
+    ) -> Iterator[Tuple[str, Dict]]:
+        """
+        Crawl domains in worker processes, yielding (domain, result) pairs
+        as soon as each domain finishes.
+
+        Domains are handed out from a shared queue, so a process that
+        finishes early takes the next waiting domain. Domains listed in
+        shard_domains are instead split by URL hash across several
+        processes and their shard results merged.
+
+        Args:
+            domains: List of domains to crawl
+            on_events: Called with every batch of CrawlEvents from the
+                workers, before the result of their domain. Workers are
+                held back while it blocks.
+            max_pending_events: Events each worker may have buffered or in
+                flight to on_events
+            cancelled: Stops the crawl and its workers when set
+        """
         logger.info(f"Starting parallel crawler with {self.max_processes} processes")
-        
-        # Create process pool
-        with multiprocessing.Pool(processes=self.max_processes) as pool:
-            # Prepare arguments for each process
-            args = [(domain, self.crawler_config) for domain in domains]
-            
-            # Map domains to processes and get results
-            results = dict(pool.map(crawl_domain_wrapper, args))
-            
-            # Save results
-            self._save_results(results)
-            
-            return results
+        self.product_files = []
+        self.worker_usage = {}
+        self.metrics_snapshots = {}
+        publisher = None
+        if self.metrics_file or self.metrics_port:
+            publisher = MetricsPublisher(self.metrics_file, self.metrics_port).start()
+        sharded = [domain for domain in domains if domain in self.shard_domains]
+        plain = [domain for domain in domains if domain not in sharded]
+        if sharded and self.crawler_config.get('state_file'):
+            logger.warning("Sharded domains are not checkpointed")
+
+        context = get_process_context()
+        tasks = context.Queue()
+        messages = context.Queue()
+        inboxes = [context.Queue() for _ in range(self.max_processes)]
+        processes = [
+            context.Process(
+                target=crawl_worker_main,
+                args=(worker_id, self.crawler_config, tasks, inboxes[worker_id],
+                      messages, self.domains_per_worker,
+                      max_pending_events if on_events is not None else 0),
+                daemon=True
+            )
+            for worker_id in range(self.max_processes)
+        ]
+        for process in processes:
+            process.start()
+
+        for domain in plain:
+            tasks.put(domain)
+        for _ in processes:
+            tasks.put(None)
+
+        # Shard i of every sharded domain runs on process i
+        trackers = {domain: ShardTracker(self.shards_per_domain) for domain in sharded}
+        for domain in sharded:
+            for index in range(self.shards_per_domain):
+                inboxes[index].put(("shard", domain, index, self.shards_per_domain))
+
+        pending = set(domains)
+        in_progress: Dict[int, set] = {worker_id: set() for worker_id in range(self.max_processes)}
+        done_workers: set = set()
+        stopped = False
+        try:
+            while pending or len(done_workers) < len(processes):
+                if cancelled is not None and cancelled.is_set():
+                    logger.info("Parallel crawl cancelled")
+                    return
+                if not pending and not stopped:
+                    # Every domain has finished; let the workers shut down
+                    for inbox in inboxes:
+                        inbox.put(("stop",))
+                    stopped = True
+                try:
+                    message = messages.get(timeout=1.0)
+                except queue.Empty:
+                    yield from self._check_workers(
+                        processes, done_workers, in_progress, trackers, pending, inboxes
+                    )
+                    continue
+
+                kind = message[0]
+                if kind == "started":
+                    _, worker_id, domain = message
+                    in_progress[worker_id].add(domain)
+                elif kind == "result":
+                    _, worker_id, domain, result = message
+                    in_progress[worker_id].discard(domain)
+                    if domain in pending:
+                        pending.discard(domain)
+                        yield domain, result
+                elif kind == "events":
+                    _, worker_id, batch = message
+                    on_events(batch)
+                    inboxes[worker_id].put(("credit",))
+                elif kind == "links":
+                    _, domain, target, batch = message
+                    tracker = trackers[domain]
+                    if not tracker.finished:
+                        tracker.on_forward(target)
+                        inboxes[target].put(message)
+                elif kind == "idle":
+                    _, domain, index, received = message
+                    tracker = trackers[domain]
+                    if not tracker.finished and tracker.on_idle(index, received):
+                        for shard_index in range(tracker.count):
+                            inboxes[shard_index].put(("finish", domain, shard_index))
+                elif kind == "shard_result":
+                    _, worker_id, domain, index, result = message
+                    tracker = trackers[domain]
+                    tracker.results[index] = result
+                    if len(tracker.results) == tracker.count and domain in pending:
+                        pending.discard(domain)
+                        yield domain, merge_shard_results(
+                            [tracker.results[i] for i in range(tracker.count)]
+                        )
+                elif kind == "metrics":
+                    _, worker_id, snapshot = message
+                    self.metrics_snapshots[worker_id] = snapshot
+                    if publisher is not None:
+                        publisher.publish(merge_snapshots(self.metrics_snapshots.values()))
+                elif kind == "done":
+                    _, worker_id, files, usage = message
+                    done_workers.add(worker_id)
+                    self.product_files.extend(files)
+                    self.worker_usage[worker_id] = usage
+        finally:
+            if publisher is not None:
+                publisher.close()
+            for process in processes:
+                if cancelled is None or not cancelled.is_set():
+                    process.join(timeout=10)
+                if process.is_alive():
+                    process.terminate()
+
+    def _check_workers(
+        self,
+        processes: List[multiprocessing.Process],
+        done_workers: set,
+        in_progress: Dict[int, set],
+        trackers: Dict[str, ShardTracker],
+        pending: set,
+        inboxes: List[multiprocessing.Queue]
+    ) -> Iterator[Tuple[str, Dict]]:
+        """
+        Fail the domains of worker processes that died. Once every worker
+        is done or dead, the domains still waiting in the task queue are
+        failed too, as nothing is left to crawl them.
+        """
+        for worker_id, process in enumerate(processes):
+            if worker_id in done_workers or process.is_alive():
+                continue
+            logger.error(f"Worker {worker_id} exited with code {process.exitcode}")
+            done_workers.add(worker_id)
+            for domain in in_progress.pop(worker_id, set()):
+                if domain in pending:
+                    pending.discard(domain)
+                    yield domain, _failed_result(f"worker {worker_id} exited")
+            # A sharded domain cannot finish without all of its shards
+            for domain, tracker in trackers.items():
+                if domain in pending and worker_id < tracker.count:
+                    tracker.finished = True
+                    for shard_index in range(tracker.count):
+                        inboxes[shard_index].put(("finish", domain, shard_index))
+                    pending.discard(domain)
+                    yield domain, _failed_result(f"worker {worker_id} exited")
+
+        if len(done_workers) == len(processes) and pending:
+            logger.error(f"All worker processes exited; failing {len(pending)} remaining domains")
+            for domain in sorted(pending):
+                yield domain, _failed_result("all worker processes exited")
+            pending.clear()
 
     def _save_results(self, results: Dict[str, Dict]) -> None:
         """
-        Save crawling results to a JSON file.
+        Save the run summary (per-domain stats and the product files written
+        by every worker) to a JSON file.
         """
         output_dir = self.crawler_config.get('output_dir', 'output')
         os.makedirs(output_dir, exist_ok=True)
-        
+
         output_file = os.path.join(
             output_dir,
             f"parallel_crawl_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         )
-        
+
         with open(output_file, 'w') as f:
-            json.dump(results, f, indent=2)
-        
-        logger.info(f"Results saved to {output_file}") 
\ No newline at end of file
+            json.dump(build_summary(results, sorted(set(self.product_files))), f, indent=2)
+
+        logger.info(f"Results saved to {output_file}")
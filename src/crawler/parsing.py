@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+from .utils.canonicalize import UrlCanonicalizer
+from .utils.link_extractor import extract_links
+from .utils.processes import get_process_context
+from .utils.simhash import link_set_fingerprint
+from .utils.url_patterns import get_default_classifier
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class PageResult:
+    """
+    Outcome of processing a single page.
+
+    product_links is None when the links have not been classified yet;
+    parse jobs running in a worker process classify them before returning.
+    aliases maps a canonical link to the distinct raw URLs on the page that
+    canonicalized to it, for links where some raw form differed.
+    cache_status is set in incremental mode: "hit" (304, cached links
+    reused), "skip" (not requested as a recent 304 confirmed it unchanged,
+    cached links reused) or "miss".
+    anchor_context maps links to the text and attributes of the tags that
+    linked to them, when collected for link scoring. timings holds the
+    seconds spent in the "parse" and "classify" phases by parse_page().
+    fingerprint is the SimHash of the page's links (see
+    link_set_fingerprint), when requested for near-duplicate detection,
+    and body_bytes the bytes downloaded for the page. aborted is set when
+    the response was dropped after its headers because it was not HTML;
+    bytes_avoided counts announced body bytes that were never downloaded,
+    for aborted and for truncated responses.
+    """
+    links: List[str] = field(default_factory=list)
+    product_links: Optional[List[str]] = None
+    aliases: Dict[str, List[str]] = field(default_factory=dict)
+    cache_status: Optional[str] = None
+    anchor_context: Dict[str, str] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)
+    fingerprint: Optional[int] = None
+    body_bytes: int = 0
+    aborted: bool = False
+    bytes_avoided: int = 0
+
+def resolve_links(
+    base_url: str,
+    hrefs: Iterable[str],
+    domain: str,
+    canonicalizer: Optional[UrlCanonicalizer] = None
+) -> Tuple[List[str], Dict[str, List[str]]]:
+    """
+    Turn raw hrefs into absolute URLs, keeping only http(s) links on domain.
+
+    Args:
+        base_url (str): URL of the page the hrefs were found on
+        hrefs: Raw href values
+        domain (str): Domain being crawled
+        canonicalizer (UrlCanonicalizer): If given, links are canonicalized
+            and compared against the canonical host of domain
+
+    Returns:
+        Tuple[List[str], Dict[str, List[str]]]: Unique absolute URLs in
+        discovery order, and the aliases described on PageResult
+    """
+    host = canonicalizer.canonical_host(domain) if canonicalizer else domain
+    raw_forms: Dict[str, Dict[str, None]] = {}
+    for href in hrefs:
+        raw_url = urljoin(base_url, href)
+        absolute_url = canonicalizer.canonicalize(raw_url) if canonicalizer else raw_url
+        
+        # Only keep URLs from the same domain
+        parsed_url = urlparse(absolute_url)
+        if parsed_url.netloc == host and parsed_url.scheme in ('http', 'https'):
+            raw_forms.setdefault(absolute_url, {})[raw_url] = None
+
+    aliases = {
+        url: list(raw_urls)
+        for url, raw_urls in raw_forms.items()
+        if len(raw_urls) > 1 or url not in raw_urls
+    }
+    return list(raw_forms), aliases
+
+def resolve_anchor_context(
+    base_url: str,
+    anchors: Dict[str, str],
+    links: List[str],
+    aliases: Dict[str, List[str]]
+) -> Dict[str, str]:
+    """
+    Key the anchor context collected per raw href by resolved link.
+
+    Args:
+        base_url (str): URL of the page the hrefs were found on
+        anchors: Raw href to anchor context, from a LinkExtractor
+        links: Links returned by resolve_links()
+        aliases: Aliases returned by resolve_links()
+
+    Returns:
+        Dict[str, str]: Link to the context of every raw form of it
+    """
+    by_raw_url: Dict[str, str] = {}
+    for href, context in anchors.items():
+        if context:
+            raw_url = urljoin(base_url, href)
+            by_raw_url[raw_url] = f"{by_raw_url[raw_url]} {context}" if raw_url in by_raw_url else context
+
+    contexts = {}
+    for url in links:
+        context = " ".join(
+            by_raw_url[raw_url] for raw_url in aliases.get(url, (url,)) if raw_url in by_raw_url
+        )
+        if context:
+            contexts[url] = context
+    return contexts
+
+def parse_page(
+    body: bytes,
+    charset: str,
+    base_url: str,
+    domain: str,
+    parser: str,
+    canonicalizer: Optional[UrlCanonicalizer] = None,
+    collect_context: bool = False,
+    fingerprint: bool = False
+) -> PageResult:
+    """
+    Extract and classify the links of a downloaded page.
+
+    This is a plain function of picklable arguments so it can run in a
+    process pool as well as inline.
+    """
+    started = time.perf_counter()
+    anchors: Optional[Dict[str, str]] = {} if collect_context else None
+    links, aliases = resolve_links(
+        base_url, extract_links(body, charset, parser, anchors), domain, canonicalizer
+    )
+    anchor_context = resolve_anchor_context(base_url, anchors, links, aliases) if anchors else {}
+    parsed = time.perf_counter()
+    flags = get_default_classifier().classify_urls(links)
+    product_links = [url for url, is_product in zip(links, flags) if is_product]
+    return PageResult(
+        links=links,
+        product_links=product_links,
+        aliases=aliases,
+        anchor_context=anchor_context,
+        timings={"parse": parsed - started, "classify": time.perf_counter() - parsed},
+        fingerprint=link_set_fingerprint(links, product_links) if fingerprint else None
+    )
+
+class ParsePool:
+    def __init__(self, workers: int, max_in_flight: Optional[int] = None):
+        """
+        Initialize a process pool for parsing fetched pages off the event loop.
+
+        Args:
+            workers (int): Number of parser processes
+            max_in_flight (int): Maximum number of parse jobs submitted at
+                once; fetchers wait for a free slot, which gives backpressure
+                when parsing cannot keep up. Defaults to 2 * workers.
+        """
+        self.workers = workers
+        self.max_in_flight = max_in_flight or 2 * workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> "ParsePool":
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=get_process_context()
+        )
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        logger.info(f"Started parse pool with {self.workers} processes")
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        executor, self._executor = self._executor, None
+        # Waiting for the worker processes to exit blocks, so it is done
+        # off the event loop
+        await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+    async def parse(
+        self,
+        body: bytes,
+        charset: str,
+        base_url: str,
+        domain: str,
+        parser: str,
+        canonicalizer: Optional[UrlCanonicalizer] = None,
+        collect_context: bool = False,
+        fingerprint: bool = False
+    ) -> PageResult:
+        """
+        Run parse_page in the pool, waiting for a free slot first.
+        """
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, parse_page,
+                body, charset, base_url, domain, parser, canonicalizer, collect_context, fingerprint
+            )
@@ -0,0 +1,10 @@
+"""
+Imported once by the fork server (see set_start_method()), so worker
+processes start with the crawler modules imported and the User-Agent pool
+loaded instead of paying for both in every process.
+"""
+
+from .crawler import EcommerceCrawler  # noqa: F401
+from .utils.user_agents import get_user_agent_pool
+
+get_user_agent_pool()
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+from .parsing import resolve_links
+from .utils.canonicalize import UrlCanonicalizer
+from .utils.link_extractor import extract_links
+from .utils.page_archive import ArchiveReader
+from .utils.processes import get_process_context
+from .utils.result_sink import JsonlResultSink, build_summary
+from .utils.product_index import ProductIndex, create_product_index
+from .utils.url_patterns import ProductIdExtractor, get_default_classifier
+
+logger = logging.getLogger(__name__)
+
+def reprocess_segment(
+    directory: str,
+    segment: str,
+    parser: str,
+    canonicalizer: Optional[UrlCanonicalizer] = None,
+    domains: Optional[List[str]] = None
+) -> Dict[str, Dict]:
+    """
+    Re-extract and classify the links of every page in one archive segment.
+
+    A plain function of picklable arguments so it can run in a process pool.
+    Links of a body shared by several pages are extracted once and resolved
+    against each page's URL.
+
+    Returns:
+        Dict mapping domains to {"pages": int, "product_urls": [...]}
+    """
+    classifier = get_default_classifier()
+    reader = ArchiveReader(directory)
+    results: Dict[str, Dict] = {}
+    try:
+        for body, pages in reader.iter_segment(segment, domains):
+            hrefs = extract_links(body, pages[0][2], parser)
+            for domain, url, _ in pages:
+                links, _ = resolve_links(url, hrefs, domain, canonicalizer)
+                flags = classifier.classify_urls(links)
+                result = results.setdefault(domain, {"pages": 0, "product_urls": []})
+                result["pages"] += 1
+                result["product_urls"].extend(
+                    link for link, is_product in zip(links, flags) if is_product
+                )
+    finally:
+        reader.close()
+    return results
+
+async def reprocess_archive(
+    directory: str,
+    output_dir: str = "output",
+    processes: Optional[int] = None,
+    parser: str = "stream",
+    canonicalizer: Optional[UrlCanonicalizer] = None,
+    domains: Optional[List[str]] = None,
+    seen_mode: str = "exact",
+    seen_capacity: int = 1024,
+    bloom_fp_rate: float = 0.001,
+    output_compress: bool = False,
+    output_max_file_size: int = 256 * 1024 * 1024,
+    product_ids: Optional[ProductIdExtractor] = None
+) -> Dict[str, Dict]:
+    """
+    Rerun link extraction and product classification over a page archive.
+
+    Nothing is fetched: the archived bodies are re-parsed with the current
+    parser and product patterns, one segment per task across processes.
+    Product URLs are deduplicated per domain, by product key if product_ids
+    is given, and written to JSONL files in output_dir like a crawl's,
+    followed by a summary JSON file.
+
+    Args:
+        directory (str): PageArchive directory
+        output_dir (str): Directory for product files and the summary
+        processes (int): Worker processes. Defaults to CPU count.
+        parser (str): Link extraction backend name
+        canonicalizer (UrlCanonicalizer): Canonicalizes the resolved links
+        domains: Only reprocess pages of these domains
+        product_ids (ProductIdExtractor): Keeps one URL per product
+
+    Returns:
+        Dict mapping domains to results with "stats", as from a crawl
+    """
+    start_time = datetime.now()
+    reader = ArchiveReader(directory)
+    try:
+        segments = reader.segments()
+        logger.info(f"Reprocessing {reader.page_count()} archived pages in {len(segments)} segments")
+    finally:
+        reader.close()
+
+    loop = asyncio.get_running_loop()
+    product_urls: Dict[str, ProductIndex] = {}
+    pages: Dict[str, int] = {}
+    async with JsonlResultSink(
+        output_dir, compress=output_compress, max_file_size=output_max_file_size
+    ) as sink:
+        with ProcessPoolExecutor(
+            max_workers=processes or os.cpu_count(), mp_context=get_process_context()
+        ) as executor:
+            jobs = [
+                loop.run_in_executor(
+                    executor, reprocess_segment, directory, segment, parser, canonicalizer, domains
+                )
+                for segment in segments
+            ]
+            for done, job in enumerate(asyncio.as_completed(jobs), 1):
+                for domain, result in (await job).items():
+                    seen = product_urls.get(domain)
+                    if seen is None:
+                        seen = product_urls[domain] = create_product_index(
+                            seen_mode, seen_capacity, bloom_fp_rate, product_ids, domain
+                        )
+                    pages[domain] = pages.get(domain, 0) + result["pages"]
+                    for url in seen.add_batch(result["product_urls"]):
+                        sink.write({"domain": domain, "url": url})
+                # Write each segment's products before waiting for the next
+                await sink.flush()
+                logger.info(f"Reprocessed {done}/{len(segments)} segments")
+    product_files = list(sink.files)
+
+    end_time = datetime.now()
+    duration = (end_time - start_time).total_seconds()
+    results = {
+        domain: {
+            "stats": {
+                "total_urls_found": len(product_urls[domain]),
+                "total_urls_visited": pages[domain],
+                "products_per_page": len(product_urls[domain]) / pages[domain] if pages[domain] else 0.0,
+                "pages_per_second": pages[domain] / duration if duration else 0.0,
+                "product_variants_skipped": len(product_urls[domain].variants),
+                "crawl_time": {
+                    "start": start_time.isoformat(),
+                    "end": end_time.isoformat(),
+                    "duration_seconds": duration
+                }
+            }
+        }
+        for domain in sorted(pages)
+    }
+
+    output_file = os.path.join(
+        output_dir,
+        f"reprocess_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    with open(output_file, 'w') as f:
+        json.dump(build_summary(results, product_files), f, indent=2)
+    logger.info(f"Results saved to {output_file}")
+    return results
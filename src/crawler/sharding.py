@@ -0,0 +1,176 @@
+import asyncio
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+from .utils.seen_set import url_fingerprint
+
+# Links for another shard are sent once this many are buffered
+FORWARD_BATCH_SIZE = 500
+
+def shard_for_url(url: str, count: int) -> int:
+    """
+    Return the shard (0 <= shard < count) that owns a URL.
+    """
+    return url_fingerprint(url) % count
+
+class DomainShard:
+    def __init__(
+        self,
+        domain: str,
+        index: int,
+        count: int,
+        send: Callable[[Tuple], None],
+        key: Optional[Callable[[str], str]] = None
+    ):
+        """
+        Initialize one shard of a domain crawled by several processes.
+
+        Each URL of the domain is owned by exactly one shard, by hash of
+        the URL or of key(url) if given.
+        A shard fetches only the URLs it owns and forwards the others to
+        their owner through send(). Messages for this shard are passed in
+        with deliver() and finish().
+
+        Messages sent:
+            ("links", domain, target_index, [(url, depth), ...])
+            ("idle", domain, index, batches_received)
+
+        Args:
+            domain (str): Domain being crawled
+            index (int): This shard's index
+            count (int): Total number of shards for the domain
+            send: Callable that hands a message to the coordinator
+            key: Maps a URL to the string hashed for ownership, e.g. so
+                every variant URL of a product has the same owner
+        """
+        self.domain = domain
+        self.index = index
+        self.count = count
+        self._send = send
+        self._key = key
+        self._outbox: Dict[int, List[Tuple[str, int]]] = defaultdict(list)
+        self._inbox: asyncio.Queue = asyncio.Queue()
+        self.batches_received = 0
+        self.links_forwarded = 0
+
+    def owns(self, url: str) -> bool:
+        return self._owner(url) == self.index
+
+    def _owner(self, url: str) -> int:
+        return shard_for_url(self._key(url) if self._key is not None else url, self.count)
+
+    def forward(self, url: str, depth: int) -> None:
+        """
+        Queue a link owned by another shard.
+        """
+        target = self._owner(url)
+        batch = self._outbox[target]
+        batch.append((url, depth))
+        self.links_forwarded += 1
+        if len(batch) >= FORWARD_BATCH_SIZE:
+            self._send(("links", self.domain, target, batch))
+            del self._outbox[target]
+
+    def flush(self) -> None:
+        """
+        Send all buffered links.
+        """
+        for target, batch in self._outbox.items():
+            self._send(("links", self.domain, target, batch))
+        self._outbox.clear()
+
+    def deliver(self, batch: List[Tuple[str, int]]) -> None:
+        """
+        Hand over links forwarded by another shard.
+        """
+        self._inbox.put_nowait(batch)
+
+    def finish(self) -> None:
+        """
+        Signal that every shard of the domain is done.
+        """
+        self._inbox.put_nowait(None)
+
+    async def next_batch(self) -> Optional[List[Tuple[str, int]]]:
+        """
+        Wait for more links once the local frontier has drained.
+
+        Returns:
+            The next forwarded batch, or None when the domain is finished
+        """
+        self.flush()
+        if self._inbox.empty():
+            # The coordinator finishes the domain once every shard is idle
+            # and has received every batch forwarded to it
+            self._send(("idle", self.domain, self.index, self.batches_received))
+        batch = await self._inbox.get()
+        if batch is not None:
+            self.batches_received += 1
+        return batch
+
+class ShardTracker:
+    def __init__(self, count: int):
+        """
+        Track the coordinator's view of one sharded domain.
+
+        Args:
+            count (int): Number of shards
+        """
+        self.count = count
+        self.forwarded = [0] * count
+        self.idle_at: List[Optional[int]] = [None] * count
+        self.results: Dict[int, Dict] = {}
+        self.finished = False
+
+    def on_forward(self, target: int) -> None:
+        self.forwarded[target] += 1
+
+    def on_idle(self, index: int, batches_received: int) -> bool:
+        """
+        Record an idle report.
+
+        Returns:
+            bool: True if the whole domain is now done
+        """
+        self.idle_at[index] = batches_received
+        self.finished = all(
+            received is not None and received == forwarded
+            for received, forwarded in zip(self.idle_at, self.forwarded)
+        )
+        return self.finished
+
+def merge_shard_results(results: List[Dict]) -> Dict:
+    """
+    Combine the results of a domain's shards into one domain result.
+    """
+    shard_stats = [result.get("stats", {}) for result in results]
+    merged: Dict = {}
+    for stats in shard_stats:
+        for key, value in stats.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            if key == "depth_reached":
+                merged[key] = max(merged.get(key, 0), value)
+            elif not key.endswith(("_rate", "_per_second", "_per_page")):
+                merged[key] = merged.get(key, 0) + value
+
+    times = [stats["crawl_time"] for stats in shard_stats if isinstance(stats.get("crawl_time"), dict)]
+    if times:
+        duration = max(t["duration_seconds"] for t in times)
+        merged["crawl_time"] = {
+            "start": min(t["start"] for t in times),
+            "end": max(t["end"] for t in times),
+            "duration_seconds": duration
+        }
+        merged["pages_per_second"] = merged.get("total_urls_visited", 0) / duration if duration else 0.0
+    pages = merged.get("total_urls_visited", 0)
+    merged["products_per_page"] = merged.get("total_urls_found", 0) / pages if pages else 0.0
+    reasons = [stats["budget_exhausted"] for stats in shard_stats if stats.get("budget_exhausted")]
+    if reasons:
+        merged["budget_exhausted"] = reasons[0]
+    merged["shards"] = shard_stats
+
+    result = {"stats": merged}
+    errors = [shard_result["error"] for shard_result in results if "error" in shard_result]
+    if errors:
+        result["error"] = "; ".join(errors)
+    return result
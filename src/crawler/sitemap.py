@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import zlib
+from collections import deque
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+from xml.etree.ElementTree import ParseError, XMLPullParser
+import aiohttp
+from .utils.rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+class SitemapParser:
+    """
+    Incremental parser for sitemap and sitemap index documents.
+
+    Bytes are fed as they arrive; every completed <url> or <sitemap> entry
+    is returned as ("url" | "sitemap", loc) and then dropped from the tree,
+    so memory stays flat regardless of the number of entries.
+    """
+
+    def __init__(self):
+        self._parser = XMLPullParser(events=("start", "end"))
+        self._root = None
+
+    def feed(self, data: bytes) -> List[Tuple[str, str]]:
+        self._parser.feed(data)
+        return self._read_entries()
+
+    def close(self) -> List[Tuple[str, str]]:
+        self._parser.close()
+        return self._read_entries()
+
+    def _read_entries(self) -> List[Tuple[str, str]]:
+        entries = []
+        for event, elem in self._parser.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = elem
+                continue
+
+            tag = elem.tag.rsplit('}', 1)[-1]
+            if tag not in ("url", "sitemap"):
+                continue
+
+            for child in elem:
+                if child.tag.rsplit('}', 1)[-1] == "loc" and child.text:
+                    entries.append((tag, child.text.strip()))
+                    break
+            # Completed entries are no longer needed
+            self._root.clear()
+        return entries
+
+def parse_robots_sitemaps(robots_txt: str, base_url: str) -> List[str]:
+    """
+    Return the Sitemap: URLs listed in a robots.txt document.
+    """
+    sitemaps = []
+    for line in robots_txt.splitlines():
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'sitemap' and value.strip():
+            sitemaps.append(urljoin(base_url, value.strip()))
+    return sitemaps
+
+class SitemapDiscovery:
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        request_headers: Callable[[], Dict[str, str]],
+        rate_limiter: RateLimiter,
+        timeout: int = 30,
+        max_sitemaps: int = 1000,
+        max_sitemap_size: int = 100 * 1024 * 1024,
+        trace_request_ctx: Optional[object] = None
+    ):
+        """
+        Initialize sitemap discovery for one domain.
+
+        Reads robots.txt for Sitemap: entries (falling back to /sitemap.xml),
+        then follows sitemap indexes breadth-first and streams every page URL
+        they list. Plain and gzip-compressed (.xml.gz) sitemaps are parsed
+        incrementally while they download.
+
+        Args:
+            session: aiohttp session used for the requests
+            request_headers: Callable returning the headers for a request
+            rate_limiter (RateLimiter): The domain's rate limiter
+            timeout (int): Request timeout in seconds
+            max_sitemaps (int): Maximum number of sitemap files to fetch
+            max_sitemap_size (int): Maximum decompressed bytes read per sitemap
+            trace_request_ctx: Passed to aiohttp request tracing
+        """
+        self.session = session
+        self.request_headers = request_headers
+        self.rate_limiter = rate_limiter
+        self.timeout = timeout
+        self.max_sitemaps = max_sitemaps
+        self.max_sitemap_size = max_sitemap_size
+        self.trace_request_ctx = trace_request_ctx
+        self.sitemaps_fetched = 0
+        self.entries = 0
+        # Host of the first successful response, after redirects
+        self.served_host: Optional[str] = None
+
+    async def find_sitemaps(self, base_url: str) -> List[str]:
+        """
+        Return the sitemap URLs advertised in robots.txt, or the default
+        /sitemap.xml location if there are none.
+        """
+        robots_url = urljoin(base_url, "/robots.txt")
+        try:
+            await self.rate_limiter.acquire()
+            async with self.session.get(
+                robots_url,
+                headers=self.request_headers(),
+                timeout=self.timeout,
+                ssl=False,
+                trace_request_ctx=self.trace_request_ctx
+            ) as response:
+                if response.status == 200:
+                    self.served_host = self.served_host or response.url.host
+                    sitemaps = parse_robots_sitemaps(await response.text(errors='replace'), base_url)
+                    if sitemaps:
+                        return sitemaps
+        except (aiohttp.ClientError, UnicodeDecodeError, asyncio.TimeoutError) as e:
+            logger.debug(f"Could not read {robots_url}: {str(e)}")
+
+        return [urljoin(base_url, "/sitemap.xml")]
+
+    async def iter_page_urls(self, base_url: str) -> AsyncIterator[str]:
+        """
+        Yield every page URL listed in the domain's sitemaps.
+        """
+        pending = deque(await self.find_sitemaps(base_url))
+        queued = set(pending)
+
+        while pending and self.sitemaps_fetched < self.max_sitemaps:
+            sitemap_url = pending.popleft()
+            async for kind, loc in self._iter_entries(sitemap_url):
+                if kind == "sitemap":
+                    if loc not in queued:
+                        queued.add(loc)
+                        pending.append(loc)
+                else:
+                    self.entries += 1
+                    yield loc
+
+    async def _iter_entries(self, sitemap_url: str) -> AsyncIterator[Tuple[str, str]]:
+        parser = SitemapParser()
+        decompressor: Optional[zlib.Decompress] = None
+        first_chunk = True
+        size = 0
+
+        try:
+            await self.rate_limiter.acquire()
+            async with self.session.get(
+                sitemap_url,
+                headers=self.request_headers(),
+                timeout=self.timeout,
+                ssl=False,
+                trace_request_ctx=self.trace_request_ctx
+            ) as response:
+                if response.status != 200:
+                    logger.debug(f"Sitemap {sitemap_url} returned status {response.status}")
+                    return
+                self.sitemaps_fetched += 1
+                self.served_host = self.served_host or response.url.host
+
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    if first_chunk:
+                        first_chunk = False
+                        # .xml.gz files are usually served without
+                        # Content-Encoding, so aiohttp leaves them compressed
+                        if chunk[:2] == _GZIP_MAGIC:
+                            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                    if decompressor is not None:
+                        chunk = decompressor.decompress(chunk)
+
+                    size += len(chunk)
+                    if size > self.max_sitemap_size:
+                        logger.warning(f"Sitemap {sitemap_url} exceeds {self.max_sitemap_size} bytes, truncating")
+                        break
+
+                    for entry in parser.feed(chunk):
+                        yield entry
+                else:
+                    for entry in parser.close():
+                        yield entry
+
+        except ParseError as e:
+            logger.warning(f"Invalid sitemap {sitemap_url}: {str(e)}")
+        except (aiohttp.ClientError, zlib.error, asyncio.TimeoutError) as e:
+            logger.warning(f"Failed to fetch sitemap {sitemap_url}: {str(e)}")
@@ -0,0 +1,215 @@
+import json
+import re
+from fnmatch import translate
+from typing import Dict, Iterable, Optional, Pattern
+from urllib.parse import unquote, urlsplit, urlunsplit
+
+# Query parameters that only carry tracking or session data
+DEFAULT_DROP_PARAMS = (
+    'utm_*',
+    'gclid',
+    'gclsrc',
+    'dclid',
+    'fbclid',
+    'msclkid',
+    'yclid',
+    'igshid',
+    'mc_cid',
+    'mc_eid',
+    '_ga',
+    '_gl',
+    'ref',
+    'ref_',
+    'referrer',
+    'sessionid',
+    'jsessionid',
+    'sid',
+)
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+def _compile_names(patterns: Iterable[str]) -> Optional[Pattern]:
+    patterns = list(patterns)
+    if not patterns:
+        return None
+    return re.compile("|".join(translate(pattern.lower()) for pattern in patterns))
+
+class CanonicalizationRules:
+    def __init__(
+        self,
+        drop_params: Iterable[str] = DEFAULT_DROP_PARAMS,
+        keep_params: Optional[Iterable[str]] = None,
+        strip_www: bool = True,
+        force_https: bool = True,
+        strip_trailing_slash: bool = True,
+        sort_query: bool = True,
+        drop_fragment: bool = True
+    ):
+        """
+        Initialize a set of canonicalization rules.
+
+        Args:
+            drop_params: Query parameter names (glob patterns) to remove
+            keep_params: If given, only these parameter names (glob patterns)
+                are kept and every other parameter is removed
+            strip_www (bool): Treat www.<domain> and <domain> as one host
+            force_https (bool): Rewrite http:// URLs to https://
+            strip_trailing_slash (bool): Remove a trailing slash from paths
+            sort_query (bool): Sort query parameters
+            drop_fragment (bool): Remove #fragments
+        """
+        self.drop_params = list(drop_params)
+        self.keep_params = list(keep_params) if keep_params is not None else None
+        self.strip_www = strip_www
+        self.force_https = force_https
+        self.strip_trailing_slash = strip_trailing_slash
+        self.sort_query = sort_query
+        self.drop_fragment = drop_fragment
+        self._drop_re = _compile_names(self.drop_params)
+        self._keep_re = _compile_names(self.keep_params) if self.keep_params is not None else None
+
+    def merged(self, overrides: Dict) -> "CanonicalizationRules":
+        """
+        Return a copy of these rules with the given settings replaced.
+
+        "drop_params" in overrides is added to the existing list rather than
+        replacing it.
+        """
+        settings = {
+            "drop_params": self.drop_params + list(overrides.get("drop_params", [])),
+            "keep_params": overrides.get("keep_params", self.keep_params),
+        }
+        for name in ("strip_www", "force_https", "strip_trailing_slash", "sort_query", "drop_fragment"):
+            settings[name] = overrides.get(name, getattr(self, name))
+        return CanonicalizationRules(**settings)
+
+    def keeps_param(self, name: str) -> bool:
+        name = unquote(name).lower()
+        if self._keep_re is not None and not self._keep_re.match(name):
+            return False
+        return self._drop_re is None or not self._drop_re.match(name)
+
+class UrlCanonicalizer:
+    def __init__(
+        self,
+        rules: Optional[CanonicalizationRules] = None,
+        domain_rules: Optional[Dict[str, CanonicalizationRules]] = None
+    ):
+        """
+        Initialize a URL canonicalizer.
+
+        Args:
+            rules (CanonicalizationRules): Rules applied to every host
+            domain_rules: Per-domain rules, keyed by domain without "www."
+        """
+        self.rules = rules or CanonicalizationRules()
+        self.domain_rules = {
+            self._bare_host(domain.lower()): domain_rules_
+            for domain, domain_rules_ in (domain_rules or {}).items()
+        }
+        # Host actually served for a bare domain, e.g. example.com -> www.example.com
+        self._preferred_hosts: Dict[str, str] = {}
+
+    @classmethod
+    def from_file(cls, path: str) -> "UrlCanonicalizer":
+        """
+        Load rules from a JSON file of the form:
+
+            {
+                "default": {"drop_params": ["sort"]},
+                "domains": {
+                    "example.com": {"keep_params": ["id", "page"]}
+                }
+            }
+
+        Both sections are optional and accept the keyword arguments of
+        CanonicalizationRules.
+        """
+        with open(path, 'r') as f:
+            config = json.load(f)
+
+        default = CanonicalizationRules().merged(config.get("default", {}))
+        domain_rules = {
+            domain: default.merged(overrides)
+            for domain, overrides in config.get("domains", {}).items()
+        }
+        return cls(default, domain_rules)
+
+    @staticmethod
+    def _bare_host(host: str) -> str:
+        return host[4:] if host.startswith('www.') else host
+
+    def rules_for(self, host: str) -> CanonicalizationRules:
+        """
+        Return the rules that apply to a host.
+        """
+        return self.domain_rules.get(self._bare_host(host), self.rules)
+
+    def prefer_host(self, host: str) -> None:
+        """
+        Record the host a site is actually served from.
+
+        Called with the host of the first successful response for a domain so
+        canonical URLs use the form that does not redirect.
+        """
+        host = host.lower()
+        if self.rules_for(host).strip_www:
+            self._preferred_hosts.setdefault(self._bare_host(host), host)
+
+    def canonical_host(self, netloc: str) -> str:
+        """
+        Return the canonical form of a host[:port], e.g. a crawl domain.
+        """
+        return urlsplit(self.canonicalize(f"https://{netloc}/")).netloc
+
+    def canonicalize(self, url: str) -> str:
+        """
+        Return the canonical form of an absolute URL.
+
+        Args:
+            url (str): Absolute URL
+
+        Returns:
+            str: Canonical URL, or url unchanged if it cannot be parsed
+        """
+        try:
+            parts = urlsplit(url)
+            port = parts.port
+        except ValueError:
+            return url
+
+        scheme = parts.scheme.lower()
+        host = parts.hostname or ''
+        rules = self.rules_for(host)
+
+        # The default port of the original scheme goes before the scheme is
+        # rewritten, or http://host:80/ would become https://host:80/
+        if port == _DEFAULT_PORTS.get(scheme):
+            port = None
+        if rules.force_https and scheme == 'http':
+            scheme = 'https'
+
+        if rules.strip_www:
+            bare = self._bare_host(host)
+            host = self._preferred_hosts.get(bare, bare)
+
+        netloc = f"[{host}]" if ':' in host else host
+        if port is not None and port != _DEFAULT_PORTS.get(scheme):
+            netloc = f"{netloc}:{port}"
+
+        path = parts.path or '/'
+        if rules.strip_trailing_slash and len(path) > 1 and path.endswith('/'):
+            path = path.rstrip('/') or '/'
+
+        query = parts.query
+        if query:
+            params = [
+                param for param in query.split('&')
+                if param and rules.keeps_param(param.split('=', 1)[0])
+            ]
+            if rules.sort_query:
+                params.sort()
+            query = '&'.join(params)
+
+        fragment = '' if rules.drop_fragment else parts.fragment
+        return urlunsplit((scheme, netloc, path, query, fragment))
@@ -0,0 +1,182 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    links TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    validated_at REAL
+) WITHOUT ROWID;
+"""
+
+@dataclass
+class CacheEntry:
+    """
+    Validators and extracted outlinks of a previously fetched page.
+    validated_at is when the page's own validators last confirmed it
+    unchanged (a 304), None if it has not been revalidated since it was
+    fetched.
+    """
+    etag: Optional[str]
+    last_modified: Optional[str]
+    links: List[str]
+    fetched_at: float
+    validated_at: Optional[float] = None
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """
+        Return the headers for a conditional GET of this page.
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+class ValidatorCache:
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = 5.0,
+        batch_size: int = 1000
+    ):
+        """
+        Initialize an on-disk HTTP validator cache keyed by canonical URL.
+
+        Stores each page's ETag, Last-Modified and extracted outlinks so an
+        incremental run can revalidate pages with conditional requests and
+        reuse the links on 304 Not Modified. Writes are buffered and applied
+        in batches.
+
+        Args:
+            path (str): SQLite database file
+            flush_interval (float): Seconds between periodic flushes
+            batch_size (int): Pending writes that trigger an early flush
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending: Dict[str, CacheEntry] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_needed = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "ValidatorCache":
+        self._conn = await asyncio.to_thread(self._connect)
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._flush_task.cancel()
+        await asyncio.gather(self._flush_task, return_exceptions=True)
+        try:
+            await self.flush()
+        finally:
+            self._conn.close()
+            self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(pages)")}
+        if "validated_at" not in columns:
+            # Caches written before validated_at was recorded
+            conn.execute("ALTER TABLE pages ADD COLUMN validated_at REAL")
+        conn.commit()
+        return conn
+
+    async def get(self, url: str) -> Optional[CacheEntry]:
+        """
+        Look up a page by canonical URL.
+        """
+        entry = self._pending.get(url)
+        if entry is not None:
+            return entry
+        row = await asyncio.to_thread(self._select, url)
+        if row is None:
+            return None
+        etag, last_modified, links, fetched_at, validated_at = row
+        return CacheEntry(etag, last_modified, json.loads(links), fetched_at, validated_at)
+
+    def _select(self, url: str) -> Optional[Tuple]:
+        return self._conn.execute(
+            "SELECT etag, last_modified, links, fetched_at, validated_at FROM pages WHERE url = ?",
+            (url,)
+        ).fetchone()
+
+    def put(
+        self,
+        url: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        links: List[str]
+    ) -> None:
+        """
+        Buffer the validators and outlinks of a freshly fetched page.
+        """
+        self._pending[url] = CacheEntry(etag, last_modified, links, time.time())
+        if len(self._pending) >= self.batch_size:
+            self._flush_needed.set()
+
+    def touch(self, entry: CacheEntry, url: str) -> None:
+        """
+        Mark a cached page as confirmed unchanged by its validators just now.
+        """
+        now = time.time()
+        self._pending[url] = CacheEntry(entry.etag, entry.last_modified, entry.links, now, now)
+        if len(self._pending) >= self.batch_size:
+            self._flush_needed.set()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_needed.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except sqlite3.Error as e:
+                logger.error(f"Failed to write HTTP cache {self.path}: {str(e)}")
+
+    async def flush(self) -> None:
+        """
+        Write all buffered entries in a single transaction.
+        """
+        async with self._flush_lock:
+            self._flush_needed.clear()
+            if not self._pending:
+                return
+            # Entries stay visible to get() until they are on disk
+            pending = dict(self._pending)
+            await asyncio.to_thread(self._write, pending)
+            for url, entry in pending.items():
+                if self._pending.get(url) is entry:
+                    del self._pending[url]
+
+    def _write(self, pending: Dict[str, CacheEntry]) -> None:
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages "
+                "(url, etag, last_modified, links, fetched_at, validated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (url, entry.etag, entry.last_modified,
+                     json.dumps(entry.links, separators=(',', ':')), entry.fetched_at,
+                     entry.validated_at)
+                    for url, entry in pending.items()
+                ]
+            )
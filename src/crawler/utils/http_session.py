@@ -0,0 +1,118 @@
+import logging
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Dict, Optional
+import aiohttp
+from .metrics import CrawlMetrics
+
+logger = logging.getLogger(__name__)
+
+_COUNTERS = ("requests", "new_connections", "reused_connections", "dns_cache_hits", "dns_cache_misses")
+
+class ConnectionStats:
+    def __init__(self):
+        """
+        Initialize connection counters fed by aiohttp request tracing.
+
+        Counts are kept for the whole session and per crawl domain. Requests
+        are attributed to a domain when they are sent with
+        trace_request_ctx=ConnectionStats.context(domain).
+        """
+        self.totals: Dict[str, int] = dict.fromkeys(_COUNTERS, 0)
+        self.domains: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(_COUNTERS, 0))
+
+    @staticmethod
+    def context(domain: str) -> SimpleNamespace:
+        """
+        Return the trace_request_ctx that attributes a request to domain.
+        """
+        return SimpleNamespace(domain=domain)
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """
+        Return a TraceConfig that updates these counters.
+        """
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_connection_create_end.append(self._on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(self._on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(self._on_dns_cache_miss)
+        return trace_config
+
+    def _count(self, trace_config_ctx: SimpleNamespace, name: str) -> None:
+        self.totals[name] += 1
+        domain = getattr(trace_config_ctx.trace_request_ctx, "domain", None)
+        if domain is not None:
+            self.domains[domain][name] += 1
+
+    async def _on_request_start(self, session, trace_config_ctx, params) -> None:
+        self._count(trace_config_ctx, "requests")
+
+    async def _on_connection_create_end(self, session, trace_config_ctx, params) -> None:
+        self._count(trace_config_ctx, "new_connections")
+
+    async def _on_connection_reuseconn(self, session, trace_config_ctx, params) -> None:
+        self._count(trace_config_ctx, "reused_connections")
+
+    async def _on_dns_cache_hit(self, session, trace_config_ctx, params) -> None:
+        self._count(trace_config_ctx, "dns_cache_hits")
+
+    async def _on_dns_cache_miss(self, session, trace_config_ctx, params) -> None:
+        self._count(trace_config_ctx, "dns_cache_misses")
+
+    @staticmethod
+    def _with_reuse_rate(counters: Dict[str, int]) -> Dict:
+        stats = dict(counters)
+        connections = counters["new_connections"] + counters["reused_connections"]
+        stats["connection_reuse_rate"] = (
+            counters["reused_connections"] / connections if connections else 0.0
+        )
+        return stats
+
+    def stats(self, domain: Optional[str] = None) -> Dict:
+        """
+        Return the counters for one domain, or the session totals.
+        """
+        if domain is None:
+            return self._with_reuse_rate(self.totals)
+        return self._with_reuse_rate(self.domains[domain])
+
+def create_session(
+    stats: ConnectionStats,
+    limit: int = 100,
+    limit_per_host: int = 10,
+    dns_ttl: int = 300,
+    keepalive_timeout: float = 30.0,
+    metrics: Optional[CrawlMetrics] = None
+) -> aiohttp.ClientSession:
+    """
+    Create the HTTP session shared by every domain crawled in a process.
+
+    Args:
+        stats (ConnectionStats): Counters updated through request tracing
+        limit (int): Maximum number of open connections (0 for no limit)
+        limit_per_host (int): Maximum open connections per host (0 for no limit)
+        dns_ttl (int): Seconds resolved addresses are cached
+        keepalive_timeout (float): Seconds an idle connection is kept open
+        metrics (CrawlMetrics): Phase timings also updated through request tracing
+
+    Returns:
+        aiohttp.ClientSession: Session that owns its connector
+    """
+    connector = aiohttp.TCPConnector(
+        limit=limit,
+        limit_per_host=limit_per_host,
+        use_dns_cache=True,
+        ttl_dns_cache=dns_ttl,
+        keepalive_timeout=keepalive_timeout
+    )
+    trace_configs = [stats.trace_config()]
+    if metrics is not None:
+        trace_configs.append(metrics.trace_config())
+    return aiohttp.ClientSession(
+        connector=connector,
+        # aiohttp adds a matching Accept-Encoding and decodes the body
+        auto_decompress=True,
+        trace_configs=trace_configs
+    )
@@ -0,0 +1,344 @@
+import codecs
+import html
+import logging
+import re
+import time
+from typing import Dict, List, Optional, Type
+
+logger = logging.getLogger(__name__)
+
+# <a ...> and <link ...> start tags, and the starts of comments and of
+# <script> and <style> elements, whose content is not markup; quoted
+# attribute values may contain '>'
+_TAG_RE = re.compile(
+    r"""<!--|<(script|style)(?:\s(?:"[^"]*"|'[^']*'|[^'">])*)?>"""
+    r"""|<(a|link)\s((?:"[^"]*"|'[^']*'|[^'">])*)>""",
+    re.IGNORECASE
+)
+_COMMENT_END_RE = re.compile(r"-->")
+_RAW_TEXT_END_RES = {
+    name: re.compile(rf"</{name}\s*>", re.IGNORECASE) for name in ("script", "style")
+}
+_HREF_RE = re.compile(
+    r"""(?:^|\s)href\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+))""",
+    re.IGNORECASE
+)
+_REL_RE = re.compile(
+    r"""(?:^|\s)rel\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+))""",
+    re.IGNORECASE
+)
+
+_ANCHOR_END_RE = re.compile(r"</a\s*>", re.IGNORECASE)
+_MARKUP_RE = re.compile(r"<[^>]*>|\s+")
+
+# An unterminated tag longer than this is dropped instead of carried over
+MAX_TAG_CARRY = 64 * 1024
+
+# Characters carried over while looking for the end of a comment, <script>
+# or <style>, enough for a split "</script>"
+RAW_TEXT_CARRY = 32
+
+# Characters after an <a> tag searched for its text when collecting context
+ANCHOR_TEXT_WINDOW = 300
+
+# Longest anchor context kept per href
+MAX_ANCHOR_CONTEXT = 200
+
+def _add_anchor_context(anchors: Dict[str, str], href: str, context: str) -> None:
+    context = context.strip()
+    previous = anchors.get(href)
+    if previous is None:
+        anchors[href] = context[:MAX_ANCHOR_CONTEXT]
+    elif context and len(previous) < MAX_ANCHOR_CONTEXT:
+        anchors[href] = f"{previous} {context}"[:MAX_ANCHOR_CONTEXT]
+
+class LinkExtractor:
+    """
+    Base class for link-extraction backends.
+
+    Decoded HTML is passed to feed() in arbitrary chunks; close() returns
+    the raw href values of <a> tags and <link rel="next"> tags in document
+    order.
+
+    With collect_context, anchors maps each href to the text and remaining
+    attributes (class, title, rel, ...) of the tags that linked to it, for
+    link scoring. parse_seconds accumulates the time read_links() spent in
+    feed() and close().
+    """
+
+    name = ""
+
+    def __init__(self, collect_context: bool = False):
+        self.collect_context = collect_context
+        self.anchors: Dict[str, str] = {}
+        self.parse_seconds = 0.0
+
+    def feed(self, data: str) -> None:
+        raise NotImplementedError
+
+    def close(self) -> List[str]:
+        raise NotImplementedError
+
+class StreamingLinkExtractor(LinkExtractor):
+    """
+    Regex-based extractor that scans chunks as they arrive.
+
+    Only <a> and <link> start tags are looked at, so no tree or per-tag
+    objects are built for the rest of the document. Comments and the
+    content of <script> and <style> elements are skipped, as by the
+    "soup" backend.
+    """
+
+    name = "stream"
+
+    def __init__(self, collect_context: bool = False):
+        super().__init__(collect_context)
+        self._links: List[str] = []
+        self._carry = ""
+        # End of the comment or element being skipped, if any
+        self._skip_end: Optional[re.Pattern] = None
+
+    def feed(self, data: str) -> None:
+        buffer = self._carry + data if self._carry else data
+        last_end = self._scan(buffer)
+
+        if self._skip_end is not None:
+            # Hold back what may be the start of the end marker
+            self._carry = buffer[max(last_end, len(buffer) - RAW_TEXT_CARRY):]
+            return
+        # Hold back a trailing tag that may continue in the next chunk
+        cut = buffer.rfind("<", last_end)
+        self._carry = buffer[cut:] if cut != -1 else ""
+        if len(self._carry) > MAX_TAG_CARRY:
+            self._carry = ""
+
+    def close(self) -> List[str]:
+        if self._carry and self._skip_end is None:
+            self._scan(self._carry)
+        self._carry = ""
+        self._skip_end = None
+        return self._links
+
+    def _scan(self, buffer: str) -> int:
+        """
+        Collect the links in buffer and return where scanning stopped.
+        """
+        last_end = 0
+        while True:
+            if self._skip_end is not None:
+                end_match = self._skip_end.search(buffer, last_end)
+                if end_match is None:
+                    return last_end
+                self._skip_end = None
+                last_end = end_match.end()
+
+            match = _TAG_RE.search(buffer, last_end)
+            if match is None:
+                return last_end
+            last_end = match.end()
+            if match.group(2) is None:
+                raw_text = match.group(1)
+                self._skip_end = (
+                    _RAW_TEXT_END_RES[raw_text.lower()] if raw_text else _COMMENT_END_RE
+                )
+                continue
+
+            attrs = match.group(3)
+            href_match = _HREF_RE.search(attrs)
+            if href_match is None:
+                continue
+
+            if match.group(2).lower() == "link":
+                rel_match = _REL_RE.search(attrs)
+                if rel_match is None:
+                    continue
+                rel = next(group for group in rel_match.groups() if group is not None)
+                if "next" not in rel.lower().split():
+                    continue
+
+            href = next(group for group in href_match.groups() if group is not None)
+            if "&" in href:
+                href = html.unescape(href)
+            href = href.strip()
+            self._links.append(href)
+
+            if self.collect_context:
+                # Text up to </a> (or the end of the window) plus the other
+                # attributes of the tag
+                text = buffer[last_end:last_end + ANCHOR_TEXT_WINDOW]
+                end_match = _ANCHOR_END_RE.search(text)
+                if end_match is not None:
+                    text = text[:end_match.start()]
+                attributes = attrs[:href_match.start()] + attrs[href_match.end():]
+                _add_anchor_context(
+                    self.anchors, href, html.unescape(_MARKUP_RE.sub(" ", f"{text} {attributes}"))
+                )
+
+class SoupLinkExtractor(LinkExtractor):
+    """
+    BeautifulSoup-based extractor. Buffers the whole document and parses
+    it on close(); slower, but tolerant of badly broken markup.
+    """
+
+    name = "soup"
+
+    def __init__(self, collect_context: bool = False):
+        super().__init__(collect_context)
+        self._chunks: List[str] = []
+
+    def feed(self, data: str) -> None:
+        self._chunks.append(data)
+
+    def close(self) -> List[str]:
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup("".join(self._chunks), 'html.parser')
+        self._chunks = []
+
+        links = []
+        for link in soup.find_all('a', href=True):
+            links.append(link['href'])
+            if self.collect_context:
+                attributes = " ".join(
+                    " ".join(value) if isinstance(value, list) else value
+                    for name, value in link.attrs.items()
+                    if name != 'href'
+                )
+                _add_anchor_context(
+                    self.anchors, link['href'], f"{link.get_text(' ', strip=True)} {attributes}"
+                )
+        for link in soup.find_all('link', href=True):
+            if "next" in [rel.lower() for rel in link.get('rel') or []]:
+                links.append(link['href'])
+        return links
+
+LINK_EXTRACTORS: Dict[str, Type[LinkExtractor]] = {
+    StreamingLinkExtractor.name: StreamingLinkExtractor,
+    SoupLinkExtractor.name: SoupLinkExtractor,
+}
+
+def create_link_extractor(name: str, collect_context: bool = False) -> LinkExtractor:
+    """
+    Create a link extractor by backend name.
+
+    Args:
+        name (str): One of LINK_EXTRACTORS ("stream" or "soup")
+        collect_context (bool): Also collect anchor context (see LinkExtractor)
+
+    Returns:
+        LinkExtractor: A fresh extractor instance
+    """
+    try:
+        extractor_class = LINK_EXTRACTORS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown parser '{name}', expected one of: {', '.join(LINK_EXTRACTORS)}"
+        )
+    return extractor_class(collect_context)
+
+def get_text_decoder(charset: str):
+    """
+    Return an incremental decoder for charset, falling back to UTF-8.
+    """
+    try:
+        return codecs.getincrementaldecoder(charset or 'utf-8')(errors='replace')
+    except LookupError:
+        return codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+async def read_links(
+    response,
+    extractor: LinkExtractor,
+    max_body_size: int,
+    chunk_size: int = 64 * 1024
+) -> List[str]:
+    """
+    Stream an aiohttp response body through a link extractor.
+
+    Reading stops once max_body_size bytes have been consumed; links found
+    up to that point are still returned.
+
+    Args:
+        response: aiohttp ClientResponse whose body has not been read yet
+        extractor (LinkExtractor): Extractor to feed
+        max_body_size (int): Maximum number of body bytes to read
+        chunk_size (int): Size of each read from the socket
+
+    Returns:
+        List[str]: Raw href values
+    """
+    decoder = get_text_decoder(response.charset)
+    remaining = max_body_size
+
+    def feed(chunk: bytes, final: bool = False) -> None:
+        started = time.perf_counter()
+        extractor.feed(decoder.decode(chunk, final))
+        extractor.parse_seconds += time.perf_counter() - started
+
+    async for chunk in response.content.iter_chunked(chunk_size):
+        if len(chunk) > remaining:
+            feed(chunk[:remaining])
+            logger.debug(f"Body of {response.url} exceeds {max_body_size} bytes, truncating")
+            break
+        remaining -= len(chunk)
+        feed(chunk)
+    else:
+        feed(b"", final=True)
+
+    started = time.perf_counter()
+    links = extractor.close()
+    extractor.parse_seconds += time.perf_counter() - started
+    return links
+
+async def read_body(
+    response,
+    max_body_size: int,
+    chunk_size: int = 64 * 1024
+) -> bytes:
+    """
+    Read an aiohttp response body, stopping after max_body_size bytes.
+
+    Args:
+        response: aiohttp ClientResponse whose body has not been read yet
+        max_body_size (int): Maximum number of body bytes to read
+        chunk_size (int): Size of each read from the socket
+
+    Returns:
+        bytes: The (possibly truncated) body
+    """
+    chunks = []
+    remaining = max_body_size
+
+    async for chunk in response.content.iter_chunked(chunk_size):
+        if len(chunk) > remaining:
+            chunks.append(chunk[:remaining])
+            logger.debug(f"Body of {response.url} exceeds {max_body_size} bytes, truncating")
+            break
+        remaining -= len(chunk)
+        chunks.append(chunk)
+
+    return b"".join(chunks)
+
+def extract_links(
+    body: bytes,
+    charset: str,
+    parser: str,
+    anchors: Optional[Dict[str, str]] = None
+) -> List[str]:
+    """
+    Extract raw href values from an already downloaded body.
+
+    Args:
+        body (bytes): Raw HTML
+        charset (str): Charset from the response headers, if any
+        parser (str): Link extraction backend name
+        anchors (dict): If given, filled with the anchor context of each href
+
+    Returns:
+        List[str]: Raw href values
+    """
+    extractor = create_link_extractor(parser, collect_context=anchors is not None)
+    extractor.feed(get_text_decoder(charset).decode(body, final=True))
+    links = extractor.close()
+    if anchors is not None:
+        anchors.update(extractor.anchors)
+    return links
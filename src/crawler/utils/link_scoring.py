@@ -0,0 +1,165 @@
+import re
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import urlparse
+from .url_patterns import (
+    LISTING_URL_PATTERNS,
+    NON_PRODUCT_PREFIXES,
+    PAGINATION_PATTERNS,
+    ProductUrlClassifier,
+    get_default_classifier,
+)
+
+# Anchor text, titles and classes of links that tend to lead to products
+POSITIVE_ANCHOR_WORDS: Tuple[str, ...] = (
+    "next", "more", "view all", "see all", "shop", "categor", "collection",
+    "products", "catalog", "department", "sale", "new arrivals", "pagination",
+    "page", "»", "›",
+)
+
+# ... and of links that do not (site chrome, legal and social links)
+NEGATIVE_ANCHOR_WORDS: Tuple[str, ...] = (
+    "privacy", "terms", "cookie", "login", "log in", "sign in", "register",
+    "cart", "checkout", "account", "help", "faq", "contact", "about", "blog",
+    "career", "press", "footer", "social", "facebook", "twitter", "instagram",
+    "newsletter", "gift card",
+)
+
+def _word_pattern(words: Iterable[str]) -> re.Pattern:
+    return re.compile("|".join(re.escape(word) for word in words), re.IGNORECASE)
+
+class LinkScorer:
+    def __init__(
+        self,
+        classifier: Optional[ProductUrlClassifier] = None,
+        listing_weight: float = 1.5,
+        pagination_weight: float = 2.0,
+        product_weight: float = -1.0,
+        excluded_weight: float = -2.0,
+        anchor_weight: float = 1.0,
+        yield_weight: float = 3.0,
+        section_weight: float = 2.0,
+        depth_weight: float = 0.25,
+        section_smoothing: float = 0.3
+    ):
+        """
+        Initialize a scorer that estimates how likely a link is to lead to
+        new product URLs. Higher scores are fetched first.
+
+        A score adds up:
+            - URL signals: listing and pagination patterns raise it, product
+              pages (leaves whose URL is already recorded) and
+              NON_PRODUCT_PREFIXES lower it
+            - anchor context: text, title and class of the linking <a> tag
+            - parent yield: share of the linking page's links that were new
+              products
+            - section yield: running average of the parent yield of pages
+              fetched under the same first path segment, learned during the
+              crawl through record_page()
+            - a small penalty per level of depth
+
+        One scorer is used per domain crawl.
+
+        Args:
+            classifier (ProductUrlClassifier): Product URL classifier.
+                Defaults to the process-wide classifier.
+            listing_weight (float): Added for listing URLs
+            pagination_weight (float): Added for pagination URLs
+            product_weight (float): Added for product URLs
+            excluded_weight (float): Added for URLs under NON_PRODUCT_PREFIXES
+                that are not listings
+            anchor_weight (float): Added for a positive anchor context,
+                subtracted for a negative one
+            yield_weight (float): Multiplies the parent page's yield
+            section_weight (float): Multiplies the section's running yield
+            depth_weight (float): Subtracted per level of depth
+            section_smoothing (float): Weight of the newest page in the
+                running section yield
+        """
+        self.classifier = classifier or get_default_classifier()
+        self.listing_weight = listing_weight
+        self.pagination_weight = pagination_weight
+        self.product_weight = product_weight
+        self.excluded_weight = excluded_weight
+        self.anchor_weight = anchor_weight
+        self.yield_weight = yield_weight
+        self.section_weight = section_weight
+        self.depth_weight = depth_weight
+        self.section_smoothing = section_smoothing
+
+        self._listing = re.compile("|".join(LISTING_URL_PATTERNS), re.IGNORECASE)
+        self._pagination = re.compile("|".join(PAGINATION_PATTERNS), re.IGNORECASE)
+        self._excluded = tuple(prefix.lower() for prefix in NON_PRODUCT_PREFIXES)
+        self._positive = _word_pattern(POSITIVE_ANCHOR_WORDS)
+        self._negative = _word_pattern(NEGATIVE_ANCHOR_WORDS)
+        self._section_yield: Dict[str, float] = {}
+
+    @staticmethod
+    def _section(path: str) -> str:
+        return path.lstrip("/").split("/", 1)[0].lower()
+
+    @staticmethod
+    def page_yield(new_products: int, links: int) -> float:
+        """
+        Return the share of a page's links that were new product URLs.
+        """
+        return new_products / links if links else 0.0
+
+    def record_page(self, url: str, page_yield: float) -> None:
+        """
+        Update the running yield of the section url belongs to.
+
+        Args:
+            url (str): URL of a fetched page
+            page_yield (float): Result of page_yield() for the page
+        """
+        section = self._section(urlparse(url).path)
+        previous = self._section_yield.get(section)
+        if previous is None:
+            self._section_yield[section] = page_yield
+        else:
+            self._section_yield[section] = previous + (page_yield - previous) * self.section_smoothing
+
+    def score(
+        self,
+        url: str,
+        depth: int,
+        anchor_context: str = "",
+        parent_yield: float = 0.0
+    ) -> float:
+        """
+        Score a link found on a fetched page.
+
+        Args:
+            url (str): Absolute link URL
+            depth (int): Depth the link would be fetched at
+            anchor_context (str): Text and attributes of the linking tag(s)
+            parent_yield (float): page_yield() of the linking page
+
+        Returns:
+            float: Priority; higher is fetched first
+        """
+        parsed = urlparse(url)
+        path = parsed.path
+        target = f"{path}?{parsed.query}" if parsed.query else path
+
+        score = self.yield_weight * parent_yield - self.depth_weight * depth
+        listing = self._listing.search(target) is not None
+        if listing:
+            score += self.listing_weight
+        if self._pagination.search(target):
+            score += self.pagination_weight
+        if self.classifier.is_product_path(path):
+            score += self.product_weight
+        elif not listing and path.lower().startswith(self._excluded):
+            score += self.excluded_weight
+
+        if anchor_context:
+            if self._negative.search(anchor_context):
+                score -= self.anchor_weight
+            elif self._positive.search(anchor_context):
+                score += self.anchor_weight
+
+        section_yield = self._section_yield.get(self._section(path))
+        if section_yield is not None:
+            score += self.section_weight * section_yield
+        return score
@@ -0,0 +1,336 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional, Tuple
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# queue: waiting for a free connection slot; dns: host resolution;
+# connect: TCP connect and TLS handshake; ttfb: request sent to response
+# headers; download: reading the body; parse: link extraction and
+# resolution; classify: product URL classification
+PHASES: Tuple[str, ...] = ("queue", "dns", "connect", "ttfb", "download", "parse", "classify")
+
+# Upper bounds (seconds) of the histogram buckets; the last bucket is +Inf
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+class Histogram:
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Initialize a fixed-bucket histogram of durations.
+
+        Args:
+            bounds: Sorted upper bounds of the buckets, in seconds
+        """
+        self.bounds = bounds
+        self.counts: List[int] = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_dict(self) -> Dict:
+        return {"counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+class HostMetrics:
+    def __init__(self):
+        """
+        Initialize the timings and counters of one host.
+        """
+        self.phases: Dict[str, Histogram] = {phase: Histogram() for phase in PHASES}
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.bytes = 0
+        self.status: Dict[int, int] = defaultdict(int)
+
+    def to_dict(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "status": {str(status): count for status, count in sorted(self.status.items())},
+            "phases": {phase: histogram.to_dict() for phase, histogram in self.phases.items()},
+        }
+
+class CrawlMetrics:
+    def __init__(self):
+        """
+        Initialize per-host request phase timings and counters.
+
+        Network phases (queue, dns, connect, ttfb) are measured by aiohttp
+        request tracing; download, parse and classify are timed by the
+        crawler and passed to observe(). Like ConnectionStats, requests are
+        attributed to a host when sent with
+        trace_request_ctx=ConnectionStats.context(host).
+        """
+        self.hosts: Dict[str, HostMetrics] = defaultdict(HostMetrics)
+
+    def observe(self, host: str, phase: str, seconds: float) -> None:
+        """
+        Record the duration of one phase of a request to host.
+        """
+        self.hosts[host].phases[phase].observe(seconds)
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """
+        Return a TraceConfig that records the network phases of requests.
+        """
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_connection_queued_start.append(self._on_queued_start)
+        trace_config.on_connection_queued_end.append(self._on_queued_end)
+        trace_config.on_dns_resolvehost_start.append(self._on_dns_start)
+        trace_config.on_dns_resolvehost_end.append(self._on_dns_end)
+        trace_config.on_connection_create_start.append(self._on_connection_start)
+        trace_config.on_connection_create_end.append(self._on_connection_end)
+        trace_config.on_request_headers_sent.append(self._on_headers_sent)
+        trace_config.on_request_redirect.append(self._on_response)
+        trace_config.on_request_end.append(self._on_response)
+        trace_config.on_request_exception.append(self._on_exception)
+        return trace_config
+
+    @staticmethod
+    def _host_of(trace_config_ctx: SimpleNamespace) -> Optional[str]:
+        return getattr(trace_config_ctx.trace_request_ctx, "domain", None)
+
+    def _elapsed(self, trace_config_ctx: SimpleNamespace, name: str, phase: str) -> float:
+        # Duration since the matching *_start hook; recorded if attributed
+        elapsed = time.perf_counter() - getattr(trace_config_ctx, name)
+        host = self._host_of(trace_config_ctx)
+        if host is not None:
+            self.observe(host, phase, elapsed)
+        return elapsed
+
+    async def _on_request_start(self, session, trace_config_ctx, params) -> None:
+        trace_config_ctx.request_start = time.perf_counter()
+        trace_config_ctx.dns_seconds = 0.0
+        host = self._host_of(trace_config_ctx)
+        if host is not None:
+            self.hosts[host].requests += 1
+
+    async def _on_queued_start(self, session, trace_config_ctx, params) -> None:
+        trace_config_ctx.queued_start = time.perf_counter()
+
+    async def _on_queued_end(self, session, trace_config_ctx, params) -> None:
+        self._elapsed(trace_config_ctx, "queued_start", "queue")
+
+    async def _on_dns_start(self, session, trace_config_ctx, params) -> None:
+        trace_config_ctx.dns_start = time.perf_counter()
+
+    async def _on_dns_end(self, session, trace_config_ctx, params) -> None:
+        trace_config_ctx.dns_seconds += self._elapsed(trace_config_ctx, "dns_start", "dns")
+
+    async def _on_connection_start(self, session, trace_config_ctx, params) -> None:
+        trace_config_ctx.connection_start = time.perf_counter()
+        trace_config_ctx.dns_seconds = 0.0
+
+    async def _on_connection_end(self, session, trace_config_ctx, params) -> None:
+        # Host resolution happens inside connection creation
+        elapsed = time.perf_counter() - trace_config_ctx.connection_start
+        host = self._host_of(trace_config_ctx)
+        if host is not None:
+            self.observe(host, "connect", max(elapsed - trace_config_ctx.dns_seconds, 0.0))
+
+    async def _on_headers_sent(self, session, trace_config_ctx, params) -> None:
+        trace_config_ctx.headers_sent = time.perf_counter()
+
+    async def _on_response(self, session, trace_config_ctx, params) -> None:
+        host = self._host_of(trace_config_ctx)
+        if host is None:
+            return
+        sent = getattr(trace_config_ctx, "headers_sent", trace_config_ctx.request_start)
+        self.observe(host, "ttfb", time.perf_counter() - sent)
+        self.hosts[host].status[params.response.status] += 1
+
+    async def _on_exception(self, session, trace_config_ctx, params) -> None:
+        host = self._host_of(trace_config_ctx)
+        if host is not None:
+            self.hosts[host].errors += 1
+
+    def snapshot(self) -> Dict:
+        """
+        Return all metrics as a JSON-serializable dict (see merge_snapshots).
+        """
+        return {
+            "time": datetime.now().isoformat(),
+            "buckets": list(DEFAULT_BUCKETS),
+            "hosts": {host: metrics.to_dict() for host, metrics in list(self.hosts.items())},
+        }
+
+def merge_snapshots(snapshots: Iterable[Dict]) -> Dict:
+    """
+    Combine snapshots from several processes into one, summing the
+    counters and histograms of hosts that appear in more than one.
+    """
+    hosts: Dict[str, Dict] = {}
+    for snapshot in snapshots:
+        for host, metrics in snapshot["hosts"].items():
+            merged = hosts.get(host)
+            if merged is None:
+                hosts[host] = json.loads(json.dumps(metrics))
+                continue
+            for key in ("requests", "retries", "errors", "bytes"):
+                merged[key] += metrics[key]
+            for status, count in metrics["status"].items():
+                merged["status"][status] = merged["status"].get(status, 0) + count
+            for phase, histogram in metrics["phases"].items():
+                target = merged["phases"][phase]
+                target["counts"] = [a + b for a, b in zip(target["counts"], histogram["counts"])]
+                target["sum"] += histogram["sum"]
+                target["count"] += histogram["count"]
+    return {"time": datetime.now().isoformat(), "buckets": list(DEFAULT_BUCKETS), "hosts": hosts}
+
+def histogram_quantile(histogram: Dict, bounds: Iterable[float], quantile: float) -> Optional[float]:
+    """
+    Estimate a quantile from a snapshot histogram, interpolating linearly
+    within the bucket it falls in (as Prometheus does).
+
+    Args:
+        histogram: A histogram from snapshot() ({"counts", "sum", "count"})
+        bounds: The snapshot's bucket upper bounds
+        quantile (float): Quantile between 0 and 1
+
+    Returns:
+        Optional[float]: Estimated value in seconds, or None if empty
+    """
+    total = histogram["count"]
+    if not total:
+        return None
+    bounds = list(bounds)
+    rank = quantile * total
+    cumulative = 0
+    for index, count in enumerate(histogram["counts"]):
+        if count and cumulative + count >= rank:
+            if index == len(bounds):
+                # +Inf bucket: the best estimate is the largest finite bound
+                return bounds[-1]
+            lower = bounds[index - 1] if index else 0.0
+            return lower + (bounds[index] - lower) * (rank - cumulative) / count
+        cumulative += count
+    return bounds[-1]
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def render_prometheus(snapshot: Dict) -> str:
+    """
+    Render a snapshot in the Prometheus text exposition format.
+    """
+    bounds = [str(bound) for bound in snapshot["buckets"]] + ["+Inf"]
+    lines = [
+        "# HELP crawler_phase_seconds Time spent in each phase of a request.",
+        "# TYPE crawler_phase_seconds histogram",
+    ]
+    for host, metrics in sorted(snapshot["hosts"].items()):
+        for phase, histogram in metrics["phases"].items():
+            labels = f'host="{_label(host)}",phase="{phase}"'
+            cumulative = 0
+            for bound, count in zip(bounds, histogram["counts"]):
+                cumulative += count
+                lines.append(f'crawler_phase_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"crawler_phase_seconds_sum{{{labels}}} {histogram['sum']}")
+            lines.append(f"crawler_phase_seconds_count{{{labels}}} {histogram['count']}")
+
+    counters = (
+        ("crawler_requests_total", "requests", "HTTP requests sent."),
+        ("crawler_retries_total", "retries", "Requests retried after an error, 429 or 5xx."),
+        ("crawler_request_errors_total", "errors", "Requests that failed without a response."),
+        ("crawler_response_bytes_total", "bytes", "Response body bytes read."),
+    )
+    for name, key, description in counters:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} counter")
+        for host, metrics in sorted(snapshot["hosts"].items()):
+            lines.append(f'{name}{{host="{_label(host)}"}} {metrics[key]}')
+
+    lines.append("# HELP crawler_responses_total Responses received, by status code.")
+    lines.append("# TYPE crawler_responses_total counter")
+    for host, metrics in sorted(snapshot["hosts"].items()):
+        for status, count in metrics["status"].items():
+            lines.append(f'crawler_responses_total{{host="{_label(host)}",status="{status}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+class MetricsPublisher:
+    def __init__(self, output_file: Optional[str] = None, port: Optional[int] = None, host: str = "127.0.0.1"):
+        """
+        Initialize the exporter of metric snapshots.
+
+        Each snapshot passed to publish() is written to output_file (replacing
+        the previous one) and served in the Prometheus text format at
+        http://host:port/metrics. The HTTP server runs in a daemon thread and
+        only serves the last published snapshot, so it never touches live
+        crawler state.
+
+        Args:
+            output_file (str): Path of the JSON snapshot file, if any
+            port (int): Port of the Prometheus endpoint, if any
+            host (str): Address the endpoint listens on
+        """
+        self.output_file = output_file
+        self.port = port
+        self.host = host
+        self.latest: Dict = merge_snapshots([])
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def start(self) -> "MetricsPublisher":
+        """
+        Start the HTTP endpoint, if a port was given.
+        """
+        if self.port and self._server is None:
+            publisher = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                        self.send_error(404)
+                        return
+                    body = render_prometheus(publisher.latest).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+            logger.info(f"Serving metrics at http://{self.host}:{self.port}/metrics")
+        return self
+
+    def publish(self, snapshot: Dict) -> None:
+        """
+        Make snapshot the current one and write it to output_file.
+        """
+        self.latest = snapshot
+        if self.output_file:
+            temp_file = f"{self.output_file}.tmp"
+            with open(temp_file, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(temp_file, self.output_file)
+
+    def close(self) -> None:
+        """
+        Stop the HTTP endpoint.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,292 @@
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import sqlite3
+import time
+import zlib
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash BLOB PRIMARY KEY,
+    segment TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    size INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS pages (
+    domain TEXT NOT NULL,
+    url TEXT NOT NULL,
+    hash BLOB NOT NULL,
+    charset TEXT,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (domain, url)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS blobs_by_segment ON blobs (segment, offset);
+"""
+
+def content_hash(body: bytes) -> bytes:
+    return hashlib.blake2b(body, digest_size=16).digest()
+
+class PageArchive:
+    def __init__(
+        self,
+        directory: str,
+        segment_size: int = 256 * 1024 * 1024,
+        compression_level: int = 6,
+        flush_interval: float = 5.0,
+        batch_bytes: int = 16 * 1024 * 1024
+    ):
+        """
+        Initialize an archive of fetched page bodies.
+
+        Bodies are zlib-compressed and appended to segment files; identical
+        bodies (by content hash) are stored once. A SQLite index maps each
+        (domain, url) to its latest body and each body to its segment,
+        offset and length. Pages are buffered and written in batches, off
+        the event loop.
+
+        Several processes may write to the same directory at once: each
+        writes its own segment files and they share the index.
+
+        Args:
+            directory (str): Archive directory
+            segment_size (int): Start a new segment file after this many bytes
+            compression_level (int): zlib compression level
+            flush_interval (float): Seconds between periodic flushes
+            batch_bytes (int): Buffered body bytes that trigger an early flush
+        """
+        self.directory = directory
+        self.segment_size = segment_size
+        self.compression_level = compression_level
+        self.flush_interval = flush_interval
+        self.batch_bytes = batch_bytes
+        self.pages_written = 0
+        self.blobs_written = 0
+        self.bytes_written = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending: List[Tuple[str, str, bytes, Optional[str], float]] = []
+        self._pending_bytes = 0
+        self._segment = None
+        self._segment_name: Optional[str] = None
+        self._segment_count = 0
+        self._run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+        self._flush_lock = asyncio.Lock()
+        self._flush_needed = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "PageArchive":
+        os.makedirs(self.directory, exist_ok=True)
+        self._conn = await asyncio.to_thread(self._connect)
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._flush_task.cancel()
+        await asyncio.gather(self._flush_task, return_exceptions=True)
+        try:
+            await self.flush()
+        finally:
+            self._close_segment()
+            self._conn.close()
+            self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            os.path.join(self.directory, INDEX_FILE), timeout=60, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        conn.commit()
+        return conn
+
+    def add(self, domain: str, url: str, body: bytes, charset: Optional[str]) -> None:
+        """
+        Buffer the body of a fetched page.
+        """
+        self._pending.append((domain, url, body, charset, time.time()))
+        self._pending_bytes += len(body)
+        if self._pending_bytes >= self.batch_bytes:
+            self._flush_needed.set()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_needed.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except (OSError, sqlite3.Error) as e:
+                logger.error(f"Failed to write page archive {self.directory}: {str(e)}")
+
+    async def flush(self) -> None:
+        """
+        Compress and write all buffered pages.
+
+        Pages stay buffered until they are indexed, so they are retried by
+        the next flush if writing fails.
+        """
+        async with self._flush_lock:
+            self._flush_needed.clear()
+            if not self._pending:
+                return
+            pending = list(self._pending)
+            await asyncio.to_thread(self._write, pending)
+            # Pages added meanwhile were appended after these
+            del self._pending[:len(pending)]
+            self._pending_bytes -= sum(len(body) for _, _, body, _, _ in pending)
+
+    def _write(self, pending: List[Tuple[str, str, bytes, Optional[str], float]]) -> None:
+        hashes = [content_hash(body) for _, _, body, _, _ in pending]
+        unique = list(dict.fromkeys(hashes))
+        known = set()
+        # Stay under SQLite's limit on query parameters
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            known.update(row[0] for row in self._conn.execute(
+                f"SELECT hash FROM blobs WHERE hash IN ({','.join('?' * len(chunk))})", chunk
+            ))
+
+        blobs = []
+        try:
+            for digest, (_, _, body, _, _) in zip(hashes, pending):
+                if digest in known:
+                    continue
+                known.add(digest)
+                data = zlib.compress(body, self.compression_level)
+                if self._segment is None or self._segment.tell() >= self.segment_size:
+                    self._rotate()
+                offset = self._segment.tell()
+                self._segment.write(data)
+                blobs.append((digest, self._segment_name, offset, len(data), len(body)))
+            # Bodies must be on disk before the index points at them
+            if self._segment is not None:
+                self._segment.flush()
+        except OSError:
+            # The retry goes to a new segment; bodies already written to
+            # this one are never indexed
+            self._close_segment()
+            raise
+
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO blobs (hash, segment, offset, length, size) VALUES (?, ?, ?, ?, ?)",
+                blobs
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages (domain, url, hash, charset, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (domain, url, digest, charset, fetched_at)
+                    for digest, (domain, url, _, charset, fetched_at) in zip(hashes, pending)
+                ]
+            )
+        self.pages_written += len(pending)
+        self.blobs_written += len(blobs)
+        self.bytes_written += sum(blob[3] for blob in blobs)
+
+    def _close_segment(self) -> None:
+        if self._segment is None:
+            return
+        try:
+            self._segment.close()
+        except OSError as e:
+            logger.warning(f"Failed to close segment {self._segment_name}: {str(e)}")
+        self._segment = None
+
+    def _rotate(self) -> None:
+        self._close_segment()
+        self._segment_name = f"pages_{self._run_id}_{self._segment_count:04d}.seg"
+        self._segment_count += 1
+        self._segment = open(os.path.join(self.directory, self._segment_name), "ab")
+        logger.info(f"Archiving pages to {os.path.join(self.directory, self._segment_name)}")
+
+class ArchiveReader:
+    def __init__(self, directory: str):
+        """
+        Initialize read access to a PageArchive directory.
+
+        Args:
+            directory (str): Archive directory
+        """
+        self.directory = directory
+        index = os.path.join(directory, INDEX_FILE)
+        if not os.path.exists(index):
+            raise FileNotFoundError(f"No page archive index at {index}")
+        self._conn = sqlite3.connect(f"file:{index}?mode=ro", uri=True, timeout=60)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def segments(self) -> List[str]:
+        """
+        Return the names of the segment files referenced by the index.
+        """
+        return [row[0] for row in self._conn.execute("SELECT DISTINCT segment FROM blobs ORDER BY segment")]
+
+    def page_count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def iter_segment(
+        self,
+        segment: str,
+        domains: Optional[List[str]] = None
+    ) -> Iterator[Tuple[bytes, List[Tuple[str, str, Optional[str]]]]]:
+        """
+        Yield the bodies stored in one segment, in file order.
+
+        The segment is memory-mapped, so only the bodies being decompressed
+        are held in memory.
+
+        Args:
+            segment (str): Segment file name from segments()
+            domains: If given, only bodies of pages on these domains
+
+        Yields:
+            (body, pages): Decompressed body and the (domain, url, charset)
+            of every page that currently has this body
+        """
+        rows = self._conn.execute(
+            "SELECT blobs.hash, blobs.offset, blobs.length, pages.domain, pages.url, pages.charset "
+            "FROM blobs JOIN pages ON pages.hash = blobs.hash "
+            "WHERE blobs.segment = ? ORDER BY blobs.offset",
+            (segment,)
+        )
+        wanted = set(domains) if domains else None
+        path = os.path.join(self.directory, segment)
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                current = None
+                pages: List[Tuple[str, str, Optional[str]]] = []
+                for digest, offset, length, domain, url, charset in rows:
+                    if wanted is not None and domain not in wanted:
+                        continue
+                    if current is not None and digest != current[0]:
+                        body = self._read(data, current[1], current[2], path)
+                        if body is not None:
+                            yield body, pages
+                        pages = []
+                    current = (digest, offset, length)
+                    pages.append((domain, url, charset))
+                if current is not None:
+                    body = self._read(data, current[1], current[2], path)
+                    if body is not None:
+                        yield body, pages
+
+    @staticmethod
+    def _read(data: mmap.mmap, offset: int, length: int, path: str) -> Optional[bytes]:
+        try:
+            return zlib.decompress(data[offset:offset + length])
+        except zlib.error as e:
+            logger.warning(f"Corrupt archive entry at {path}:{offset}: {str(e)}")
+            return None
@@ -0,0 +1,95 @@
+import multiprocessing
+import multiprocessing.forkserver
+import os
+import sys
+from multiprocessing.context import BaseContext
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Start methods accepted by set_start_method()
+START_METHODS = ("default", "forkserver")
+
+# Imported by the fork server before it forks any worker
+PRELOAD_MODULES: List[str] = [f"{__name__.split('.')[0]}.preload"]
+
+# Directory containing the crawler package
+_PACKAGE_PARENT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_start_method = "default"
+_context: Optional[BaseContext] = None
+
+def set_start_method(method: str) -> None:
+    """
+    Choose how worker processes are started. Call before the first worker
+    is started.
+
+    "default" uses the platform default. "forkserver" forks workers from a
+    server that has imported PRELOAD_MODULES, so each worker starts in
+    milliseconds without inheriting the threads and state of the crawl's
+    main process; starting the server itself takes about as long as one
+    spawned worker, so it only pays off when many workers are started.
+    It falls back to the default where fork servers are unavailable.
+
+    Args:
+        method (str): One of START_METHODS
+    """
+    global _start_method, _context
+    if method not in START_METHODS:
+        raise ValueError(f"Unknown start method: {method}")
+    _start_method = method
+    _context = None
+
+def get_process_context() -> BaseContext:
+    """
+    Return the multiprocessing context used for every worker process, as
+    chosen with set_start_method(). The fork server is started on first use.
+    """
+    global _context
+    if _context is None:
+        if _start_method == "forkserver" and "forkserver" in multiprocessing.get_all_start_methods():
+            _context = _start_fork_server()
+        else:
+            _context = multiprocessing.get_context()
+    return _context
+
+def _start_fork_server() -> BaseContext:
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(PRELOAD_MODULES)
+    # The fork server is a fresh interpreter that is not given this
+    # process's sys.path, so the package has to be importable through its
+    # PYTHONPATH for the preload to work. The server is started right away
+    # so the variable can be restored for the rest of this process
+    python_path = os.environ.get("PYTHONPATH")
+    os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [_PACKAGE_PARENT, python_path]))
+    try:
+        multiprocessing.forkserver.ensure_running()
+    finally:
+        if python_path is None:
+            del os.environ["PYTHONPATH"]
+        else:
+            os.environ["PYTHONPATH"] = python_path
+    return context
+
+def process_usage() -> Dict[str, float]:
+    """
+    Return the CPU seconds and peak RSS in MB of the calling process, for
+    workers to report to their parent: workers started by a fork server are
+    not the parent's children, so RUSAGE_CHILDREN does not include them.
+
+    Returns:
+        Dict[str, float]: "cpu_seconds" and "peak_rss_mb", empty where the
+            resource module is unavailable
+    """
+    if resource is None:
+        return {}
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "cpu_seconds": usage.ru_utime + usage.ru_stime,
+        "peak_rss_mb": usage.ru_maxrss / scale,
+    }
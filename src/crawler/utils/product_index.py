@@ -0,0 +1,139 @@
+from typing import Dict, Iterable, List, Optional
+from .seen_set import SeenSet, create_seen_set
+from .url_patterns import (
+    ProductIdExtractor,
+    ProductUrlClassifier,
+    get_default_classifier,
+    is_pagination_url,
+)
+
+class ProductIndex(SeenSet):
+    def __init__(
+        self,
+        urls: SeenSet,
+        keys: SeenSet,
+        variants: SeenSet,
+        extractor: Optional[ProductIdExtractor] = None,
+        domain: str = "",
+        classifier: Optional[ProductUrlClassifier] = None
+    ):
+        """
+        Initialize the set of product URLs recorded for one domain.
+
+        With an extractor, a product URL is only recorded if its product key
+        (see ProductIdExtractor) is new: colour and size variants, tracking
+        paths and category-prefixed paths of a product already recorded are
+        refused, so the output holds one URL per product, the first one
+        found. URLs without a key are deduplicated as plain URLs. Keys and
+        refused variants are kept as fingerprints like the URLs.
+
+        Args:
+            urls (SeenSet): Recorded product URLs
+            keys (SeenSet): Product keys of the recorded URLs
+            variants (SeenSet): URLs refused as variants, to count them once
+            extractor (ProductIdExtractor): Derives product keys. Without
+                one, only identical URLs are deduplicated.
+            domain (str): Domain whose product ID patterns apply
+            classifier (ProductUrlClassifier): Decides which links are
+                product URLs and can therefore be variants. Defaults to
+                the default classifier.
+        """
+        self.urls = urls
+        self.keys = keys
+        self.variants = variants
+        self.extractor = extractor
+        self.domain = domain
+        self.classifier = classifier or get_default_classifier()
+        self.mode = urls.mode
+
+    def add(self, url: str, key: Optional[str] = None) -> bool:
+        """
+        Record a product URL.
+
+        Args:
+            url (str): Product URL
+            key (str): Its product key, if already extracted
+
+        Returns:
+            bool: True if neither the URL nor its product were seen before
+        """
+        if url in self.urls:
+            return False
+        if self.extractor is not None:
+            if key is None:
+                key = self.extractor.product_key(url, self.domain)
+            if key and not self.keys.add(key):
+                self.variants.add(url)
+                return False
+        return self.urls.add(url)
+
+    def add_batch(self, urls: Iterable[str]) -> List[str]:
+        """
+        Record a batch of product URLs.
+
+        Returns:
+            List[str]: The URLs that were new products, in input order
+        """
+        urls = list(urls)
+        if self.extractor is None:
+            return [url for url in urls if self.urls.add(url)]
+        keys = self.extractor.product_keys(urls, self.domain)
+        return [url for url, key in zip(urls, keys) if self.add(url, key)]
+
+    def is_variant(self, url: str) -> bool:
+        """
+        Check if a URL leads to a product already recorded under another
+        URL, so it need not be fetched.
+
+        Only product URLs are checked: a listing or pagination page such as
+        "/products/shoes?page=2" may share a key with a product but still
+        has to be crawled.
+        """
+        if self.extractor is None or url in self.urls:
+            return False
+        if not self.classifier.is_product_url(url) or is_pagination_url(url):
+            return False
+        if url in self.variants:
+            return True
+        key = self.extractor.product_key(url, self.domain)
+        if key and key in self.keys:
+            self.variants.add(url)
+            return True
+        return False
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.urls
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def memory_bytes(self) -> int:
+        return self.urls.memory_bytes() + self.keys.memory_bytes() + self.variants.memory_bytes()
+
+    def stats(self) -> Dict:
+        return {
+            **super().stats(),
+            "product_keys": len(self.keys),
+            "variants_skipped": len(self.variants),
+        }
+
+def create_product_index(
+    mode: str = "exact",
+    capacity: int = 1024,
+    fp_rate: float = 0.001,
+    extractor: Optional[ProductIdExtractor] = None,
+    domain: str = "",
+    classifier: Optional[ProductUrlClassifier] = None
+) -> ProductIndex:
+    """
+    Create an empty product index whose sets use the given seen-set mode,
+    see create_seen_set().
+    """
+    return ProductIndex(
+        create_seen_set(mode, capacity, fp_rate),
+        create_seen_set(mode, capacity, fp_rate),
+        create_seen_set(mode, capacity, fp_rate),
+        extractor,
+        domain,
+        classifier
+    )
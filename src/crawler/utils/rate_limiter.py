@@ -1,30 +1,199 @@
 import asyncio
-from datetime import datetime, timedelta
-from typing import Optional
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+def parse_retry_after(value: Optional[str], max_delay: float = 300.0) -> Optional[float]:
+    """
+    Parse a Retry-After header value.
+
+    Args:
+        value (str): Header value, either delta-seconds or an HTTP date
+        max_delay (float): Upper bound for the returned delay
+
+    Returns:
+        Optional[float]: Seconds to wait, or None if the value is missing or invalid
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        delay = (retry_at - datetime.now(timezone.utc)).total_seconds()
+    return min(max(delay, 0.0), max_delay)
 
 class RateLimiter:
-    def __init__(self, delay: float):
+    def __init__(
+        self,
+        delay: float,
+        adaptive: bool = False,
+        max_rate: float = 20.0,
+        min_rate: float = 0.2,
+        burst: int = 1,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        slow_factor: float = 3.0,
+        slow_threshold: float = 0.5
+    ):
         """
-        Initialize rate limiter with specified delay between requests.
-        
+        Initialize a token-bucket rate limiter for one host.
+
+        Tokens are added at the current rate up to burst and each request
+        takes one. Without adaptive the rate is fixed at one request per
+        delay. With adaptive the rate starts there and is tuned from the
+        responses reported through record_response(): it grows additively
+        (by about increase requests/second for every second of healthy
+        traffic) and is cut multiplicatively on 429s, 5xx responses, errors
+        and response times well above the fastest observed. Retry-After
+        pauses the host for the requested time.
+
         Args:
-            delay (float): Minimum time (in seconds) between requests
+            delay (float): Initial time (in seconds) between requests; 0 starts
+                an adaptive limiter at max_rate and disables a fixed one
+            adaptive (bool): Adjust the rate from observed responses (AIMD)
+            max_rate (float): Highest rate in requests/second when adaptive
+            min_rate (float): Lowest rate in requests/second when adaptive
+            burst (int): Number of requests that may be sent back to back
+            increase (float): Additive increase in requests/second per second
+            decrease (float): Factor applied to the rate on congestion
+            slow_factor (float): Response time, relative to the fastest seen,
+                treated as congestion
+            slow_threshold (float): Minimum extra seconds of response time
+                treated as congestion
         """
         self.delay = delay
-        self.last_request_time: Optional[datetime] = None
-        self._lock = asyncio.Lock()
+        self.adaptive = adaptive
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.burst = max(burst, 1)
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_factor = slow_factor
+        self.slow_threshold = slow_threshold
+
+        if delay > 0:
+            self.rate = 1.0 / delay
+            if adaptive:
+                self.rate = min(max(self.rate, min_rate), max_rate)
+        else:
+            self.rate = max_rate if adaptive else 0.0
+
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._latency: Optional[float] = None
+        self._base_latency: Optional[float] = None
+        self.requests = 0
+        self.throttled = 0
+        self.slowdowns = 0
 
     async def acquire(self) -> None:
         """
         Acquire permission to make a request, waiting if necessary to respect the rate limit.
+
+        A token is reserved before sleeping, so concurrent callers are spaced
+        out without holding a lock while they wait.
+        """
+        self.requests += 1
+        if self.rate > 0:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens < 0:
+                await asyncio.sleep(-self._tokens / self.rate)
+
+        # Requests reserved before a Retry-After arrived also wait it out
+        while True:
+            wait_time = self._paused_until - time.monotonic()
+            if wait_time <= 0:
+                break
+            await asyncio.sleep(wait_time)
+
+    def record_response(
+        self,
+        status: int,
+        latency: float,
+        retry_after: Optional[float] = None
+    ) -> None:
+        """
+        Report the outcome of a request.
+
+        Args:
+            status (int): HTTP status code
+            latency (float): Seconds until the response headers arrived
+            retry_after (float): Parsed Retry-After delay, if any
+        """
+        if retry_after:
+            self.pause(retry_after)
+
+        if status == 429 or status >= 500:
+            self.throttled += 1
+            self._slow_down()
+            return
+
+        if self._latency is None:
+            self._latency = self._base_latency = latency
+        else:
+            self._latency += (latency - self._latency) * 0.2
+            # Let the baseline drift up slowly so a permanently slower
+            # site is not treated as congested forever
+            self._base_latency = min(
+                latency, self._base_latency + (self._latency - self._base_latency) * 0.01
+            )
+
+        congested = (
+            self._latency > self._base_latency * self.slow_factor
+            and self._latency - self._base_latency > self.slow_threshold
+        )
+        if congested:
+            self.slowdowns += 1
+            self._slow_down()
+        elif self.adaptive and self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def record_error(self) -> None:
+        """
+        Report a request that failed without a response (timeout, connection error).
+        """
+        self.throttled += 1
+        self._slow_down()
+
+    def pause(self, seconds: float) -> None:
+        """
+        Send no further requests to this host for the given time.
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _slow_down(self) -> None:
+        if not self.adaptive:
+            return
+        # Responses to requests sent at the old rate keep arriving for a
+        # while; cut the rate at most once per second
+        now = time.monotonic()
+        if now - self._last_decrease < 1.0:
+            return
+        self._last_decrease = now
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+
+    def stats(self) -> Dict:
+        """
+        Return the current rate and counters.
         """
-        async with self._lock:
-            if self.last_request_time is not None:
-                # Calculate time to wait
-                time_since_last = datetime.now() - self.last_request_time
-                wait_time = self.delay - time_since_last.total_seconds()
-                
-                if wait_time > 0:
-                    await asyncio.sleep(wait_time)
-            
-            self.last_request_time = datetime.now() 
\ No newline at end of file
+        return {
+            "rate": round(self.rate, 3),
+            "adaptive": self.adaptive,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "slowdowns": self.slowdowns,
+            "latency": round(self._latency, 4) if self._latency is not None else None,
+        }
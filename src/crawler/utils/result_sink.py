@@ -0,0 +1,161 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+import aiofiles
+
+logger = logging.getLogger(__name__)
+
+class JsonlResultSink:
+    def __init__(
+        self,
+        output_dir: str,
+        prefix: str = "products",
+        compress: bool = False,
+        max_file_size: int = 256 * 1024 * 1024,
+        flush_interval: float = 1.0,
+        buffer_size: int = 1000
+    ):
+        """
+        Initialize an incremental JSON Lines writer for discovered products.
+
+        Records are buffered and appended with non-blocking writes every
+        flush_interval seconds or once buffer_size records are pending. A new
+        file is started when the current one reaches max_file_size bytes.
+
+        Args:
+            output_dir (str): Directory for the output files
+            prefix (str): File name prefix
+            compress (bool): Write gzip-compressed files (.jsonl.gz)
+            max_file_size (int): Rotate after this many bytes on disk (0 disables rotation)
+            flush_interval (float): Seconds between periodic flushes
+            buffer_size (int): Pending records that trigger an early flush
+        """
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.compress = compress
+        self.max_file_size = max_file_size
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+        self.files: List[str] = []
+        self.records_written = 0
+        self._buffer: List[str] = []
+        self._file = None
+        self._file_size = 0
+        self._run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+        self._flush_lock = asyncio.Lock()
+        self._flush_needed = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "JsonlResultSink":
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._flush_task.cancel()
+        await asyncio.gather(self._flush_task, return_exceptions=True)
+        try:
+            await self.flush()
+        finally:
+            await self._close_file()
+
+    def write(self, record: Dict) -> None:
+        """
+        Queue a record for writing. Never blocks.
+        """
+        self._buffer.append(json.dumps(record, separators=(',', ':')))
+        if len(self._buffer) >= self.buffer_size:
+            self._flush_needed.set()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_needed.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except OSError as e:
+                logger.error(f"Failed to write results: {str(e)}")
+
+    async def flush(self) -> None:
+        """
+        Append all buffered records to the current output file.
+
+        Records stay buffered until they are written, so they are retried by
+        the next flush if writing fails.
+        """
+        async with self._flush_lock:
+            self._flush_needed.clear()
+            if not self._buffer:
+                return
+            lines = list(self._buffer)
+
+            data = ("\n".join(lines) + "\n").encode()
+            if self.compress:
+                # Each flush is a separate gzip member; concatenated members
+                # are a valid gzip stream
+                data = gzip.compress(data)
+
+            try:
+                if self._file is None or (
+                    self.max_file_size and self._file_size >= self.max_file_size
+                ):
+                    await self._rotate()
+
+                await self._file.write(data)
+                await self._file.flush()
+            except OSError:
+                # The retry goes to a new file instead of following a
+                # partial write
+                await self._close_file()
+                raise
+            # Records written meanwhile were appended after these
+            del self._buffer[:len(lines)]
+            self._file_size += len(data)
+            self.records_written += len(lines)
+
+    async def _close_file(self) -> None:
+        if self._file is None:
+            return
+        try:
+            await self._file.close()
+        except OSError as e:
+            logger.warning(f"Failed to close {self.files[-1]}: {str(e)}")
+        self._file = None
+
+    async def _rotate(self) -> None:
+        await self._close_file()
+
+        extension = ".jsonl.gz" if self.compress else ".jsonl"
+        path = os.path.join(
+            self.output_dir,
+            f"{self.prefix}_{self._run_id}_{len(self.files):04d}{extension}"
+        )
+        self._file = await aiofiles.open(path, 'ab')
+        self._file_size = 0
+        self.files.append(path)
+        logger.info(f"Writing product URLs to {path}")
+
+def build_summary(results: Dict[str, Dict], product_files: List[str]) -> Dict:
+    """
+    Build the end-of-run summary from per-domain stats.
+
+    Product URL lists are left out; they live in the JSONL product files.
+    """
+    domains = {
+        domain: {key: value for key, value in result.items() if key != "product_urls"}
+        for domain, result in results.items()
+    }
+    return {
+        "crawl_time": datetime.now().isoformat(),
+        "total_products": sum(
+            result.get("stats", {}).get("total_urls_found", 0) for result in results.values()
+        ),
+        "product_files": product_files,
+        "domains": domains,
+    }
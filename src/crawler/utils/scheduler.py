@@ -0,0 +1,113 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+class FairScheduler:
+    def __init__(self, max_in_flight: int, weights: Optional[Dict[str, float]] = None):
+        """
+        Initialize a process-wide limit on in-flight requests shared fairly
+        between domains.
+
+        Requests beyond max_in_flight wait, and a freed slot goes to the
+        waiting domain that has received the least service relative to its
+        weight (start-time fair queuing). With equal weights that is plain
+        round-robin, so a large domain with many queued pages cannot crowd
+        out small ones. A domain that was idle does not bank credit for
+        the time it did not use.
+
+        Per-domain politeness stays with each domain's RateLimiter; callers
+        take a slot only once the rate limiter lets the request go, so
+        waiting out a crawl delay never holds a slot.
+
+        Args:
+            max_in_flight (int): Maximum requests in flight across all domains
+            weights: Relative share of each domain; unlisted domains get 1.0
+        """
+        self.max_in_flight = max(max_in_flight, 1)
+        self.weights = dict(weights or {})
+        self.in_flight = 0
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {}
+        self._ready: List[Tuple[float, int, str]] = []
+        self._tags: Dict[str, float] = {}
+        self._clock = 0.0
+        self._order = itertools.count()
+        self._grants: Dict[str, int] = {}
+        self._wait_seconds: Dict[str, float] = {}
+
+    @asynccontextmanager
+    async def slot(self, domain: str) -> AsyncIterator[None]:
+        """
+        Hold one in-flight slot for a request to domain.
+        """
+        await self.acquire(domain)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, domain: str) -> None:
+        """
+        Wait for an in-flight slot. Pair every call with release().
+        """
+        if self.in_flight < self.max_in_flight and not self._ready:
+            self._grant(domain, max(self._tags.get(domain, 0.0), self._clock))
+            return
+
+        started = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        queue = self._waiters.get(domain)
+        if queue is None:
+            queue = self._waiters[domain] = deque()
+            self._tags[domain] = max(self._tags.get(domain, 0.0), self._clock)
+            heapq.heappush(self._ready, (self._tags[domain], next(self._order), domain))
+        queue.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # Cancelled futures are skipped by _wake(); a slot granted just
+            # before the cancellation has to be handed back
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        self._wait_seconds[domain] = self._wait_seconds.get(domain, 0.0) + time.monotonic() - started
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _grant(self, domain: str, tag: float) -> None:
+        self.in_flight += 1
+        self._clock = tag
+        self._tags[domain] = tag + 1.0 / self.weights.get(domain, 1.0)
+        self._grants[domain] = self._grants.get(domain, 0) + 1
+
+    def _wake(self) -> None:
+        while self.in_flight < self.max_in_flight and self._ready:
+            tag, _, domain = heapq.heappop(self._ready)
+            queue = self._waiters[domain]
+            while queue and queue[0].done():
+                queue.popleft()
+            if not queue:
+                del self._waiters[domain]
+                continue
+            self._grant(domain, tag)
+            queue.popleft().set_result(None)
+            if queue:
+                heapq.heappush(self._ready, (self._tags[domain], next(self._order), domain))
+            else:
+                del self._waiters[domain]
+
+    def stats(self, domain: str) -> Dict:
+        """
+        Return the slots granted to a domain and the time it spent waiting.
+        """
+        return {
+            "max_in_flight": self.max_in_flight,
+            "weight": self.weights.get(domain, 1.0),
+            "requests": self._grants.get(domain, 0),
+            "wait_seconds": round(self._wait_seconds.get(domain, 0.0), 3),
+        }
@@ -0,0 +1,251 @@
+import math
+from array import array
+from hashlib import blake2b
+from typing import Dict, Type
+
+def url_fingerprint(url: str) -> int:
+    """
+    Return a 64-bit fingerprint of a URL.
+
+    Args:
+        url (str): URL to fingerprint
+
+    Returns:
+        int: Non-zero unsigned 64-bit integer
+    """
+    value = int.from_bytes(blake2b(url.encode(), digest_size=8).digest(), 'little')
+    # 0 marks an empty slot in ExactSeenSet
+    return value or 1
+
+class SeenSet:
+    """
+    Base class for the set of URLs a frontier has already accepted.
+
+    Implementations store fingerprints rather than URL strings; the only
+    string copy of a URL lives in the frontier queue until it is fetched.
+    """
+
+    mode = ""
+
+    def add(self, url: str) -> bool:
+        """
+        Add a URL.
+
+        Returns:
+            bool: True if the URL was not seen before
+        """
+        raise NotImplementedError
+
+    def __contains__(self, url: str) -> bool:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def memory_bytes(self) -> int:
+        """
+        Return the approximate memory used by the structure.
+        """
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        """
+        Return a summary suitable for the crawl stats.
+        """
+        return {
+            "mode": self.mode,
+            "entries": len(self),
+            "memory_bytes": self.memory_bytes(),
+        }
+
+class ExactSeenSet(SeenSet):
+    """
+    Open-addressing hash table of 64-bit URL fingerprints in a flat array.
+
+    Uses 8 bytes per slot at a load factor of at most 1/2, so roughly
+    16-32 bytes per URL. Two distinct URLs collide with probability ~n^2/2^65,
+    which is negligible for single-domain crawls.
+    """
+
+    mode = "exact"
+
+    def __init__(self, capacity: int = 1024):
+        """
+        Args:
+            capacity (int): Expected number of URLs; the table grows as needed
+        """
+        size = 16
+        while size < capacity * 2:
+            size *= 2
+        self._slots = array('Q', bytes(8 * size))
+        self._mask = size - 1
+        self._count = 0
+
+    def add(self, url: str) -> bool:
+        return self._insert(url_fingerprint(url))
+
+    def _insert(self, fingerprint: int) -> bool:
+        slots = self._slots
+        mask = self._mask
+        index = fingerprint & mask
+        while True:
+            current = slots[index]
+            if current == 0:
+                break
+            if current == fingerprint:
+                return False
+            index = (index + 1) & mask
+
+        slots[index] = fingerprint
+        self._count += 1
+        if self._count * 2 > len(slots):
+            self._grow()
+        return True
+
+    def _grow(self) -> None:
+        old_slots = self._slots
+        self._slots = array('Q', bytes(16 * len(old_slots)))
+        self._mask = len(self._slots) - 1
+        self._count = 0
+        for fingerprint in old_slots:
+            if fingerprint:
+                self._insert(fingerprint)
+
+    def __contains__(self, url: str) -> bool:
+        fingerprint = url_fingerprint(url)
+        slots = self._slots
+        index = fingerprint & self._mask
+        while True:
+            current = slots[index]
+            if current == 0:
+                return False
+            if current == fingerprint:
+                return True
+            index = (index + 1) & self._mask
+
+    def __len__(self) -> int:
+        return self._count
+
+    def memory_bytes(self) -> int:
+        return self._slots.itemsize * len(self._slots)
+
+class _BloomFilter:
+    def __init__(self, capacity: int, fp_rate: float):
+        bits = max(64, int(math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2))))
+        self.bits = bits
+        self.hashes = max(1, int(round(bits / capacity * math.log(2))))
+        self.capacity = capacity
+        self.count = 0
+        self.array = bytearray((bits + 7) // 8)
+
+    def contains(self, h1: int, h2: int) -> bool:
+        # Enhanced double hashing (Dillinger and Manolios); the probes of
+        # plain h1 + i * h2 overlap often enough on small filters to push
+        # the false-positive rate above its target. Stops at the first
+        # clear bit
+        array_ = self.array
+        bits = self.bits
+        p = h1 % bits
+        step = h2 % bits
+        for i in range(1, self.hashes + 1):
+            if not array_[p >> 3] & (1 << (p & 7)):
+                return False
+            p = (p + step) % bits
+            step = (step + i) % bits
+        return True
+
+    def insert(self, h1: int, h2: int) -> None:
+        array_ = self.array
+        bits = self.bits
+        p = h1 % bits
+        step = h2 % bits
+        for i in range(1, self.hashes + 1):
+            array_[p >> 3] |= 1 << (p & 7)
+            p = (p + step) % bits
+            step = (step + i) % bits
+        self.count += 1
+
+class BloomSeenSet(SeenSet):
+    """
+    Scalable Bloom filter over URLs.
+
+    May report an unseen URL as seen (so that page is skipped) with
+    probability at most fp_rate, but never the reverse. When a filter fills
+    up, a larger one with a tighter error rate is chained on so the overall
+    false-positive rate stays below fp_rate.
+    """
+
+    mode = "bloom"
+
+    def __init__(self, capacity: int = 1024, fp_rate: float = 0.001):
+        """
+        Args:
+            capacity (int): Expected number of URLs for the first filter
+            fp_rate (float): Target false-positive rate, 0 < fp_rate < 1
+        """
+        if not 0 < fp_rate < 1:
+            raise ValueError("fp_rate must be between 0 and 1")
+        self.fp_rate = fp_rate
+        # Error rates of chained filters halve: fp/2 + fp/4 + ... < fp
+        self._filters = [_BloomFilter(capacity, fp_rate / 2)]
+        self._count = 0
+
+    @staticmethod
+    def _hashes(url: str):
+        digest = blake2b(url.encode(), digest_size=16).digest()
+        return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+    def add(self, url: str) -> bool:
+        h1, h2 = self._hashes(url)
+        for bloom in self._filters:
+            if bloom.contains(h1, h2):
+                return False
+
+        current = self._filters[-1]
+        if current.count >= current.capacity:
+            current = _BloomFilter(
+                current.capacity * 2, self.fp_rate / (2 ** (len(self._filters) + 1))
+            )
+            self._filters.append(current)
+        current.insert(h1, h2)
+        self._count += 1
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        h1, h2 = self._hashes(url)
+        return any(bloom.contains(h1, h2) for bloom in self._filters)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def memory_bytes(self) -> int:
+        return sum(len(bloom.array) for bloom in self._filters)
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        stats["fp_rate"] = self.fp_rate
+        stats["filters"] = len(self._filters)
+        return stats
+
+SEEN_SET_MODES: Dict[str, Type[SeenSet]] = {
+    ExactSeenSet.mode: ExactSeenSet,
+    BloomSeenSet.mode: BloomSeenSet,
+}
+
+def create_seen_set(mode: str = "exact", capacity: int = 1024, fp_rate: float = 0.001) -> SeenSet:
+    """
+    Create a seen-URL structure.
+
+    Args:
+        mode (str): "exact" (64-bit fingerprints) or "bloom" (probabilistic)
+        capacity (int): Expected number of URLs per domain
+        fp_rate (float): False-positive rate for bloom mode
+
+    Returns:
+        SeenSet: An empty seen set
+    """
+    if mode == ExactSeenSet.mode:
+        return ExactSeenSet(capacity)
+    if mode == BloomSeenSet.mode:
+        return BloomSeenSet(capacity, fp_rate)
+    raise ValueError(f"Unknown seen-set mode '{mode}', expected one of: {', '.join(SEEN_SET_MODES)}")
@@ -0,0 +1,87 @@
+import hashlib
+from typing import Dict, Iterable, List, Optional
+
+FINGERPRINT_BITS = 64
+
+def simhash(features: Iterable[str]) -> Optional[int]:
+    """
+    Compute the 64-bit SimHash of a set of features.
+
+    Pages with similar feature sets get fingerprints that differ in few
+    bits. Each bit of the result is set when most feature hashes have it.
+
+    Returns:
+        int: Fingerprint, or None when there are no features
+    """
+    # One '0'/'1' string per feature hash; zip(*...) then yields the bit
+    # columns, which are counted in C instead of bit by bit
+    bits = [
+        format(int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big"), "064b")
+        for feature in set(features)
+    ]
+    if not bits:
+        return None
+    half = len(bits) / 2
+    return int("".join("1" if column.count("1") > half else "0" for column in zip(*bits)), 2)
+
+def link_set_fingerprint(links: Iterable[str], product_links: Iterable[str]) -> Optional[int]:
+    """
+    Compute the SimHash of a page's outlinks for near-duplicate detection.
+
+    Product links are kept whole; other links lose their query string, so
+    filter and sort variants of a listing, whose facet links all carry the
+    current facet selection, still share their features.
+    """
+    products = set(product_links)
+    return simhash(
+        list(products) + [url.split("?", 1)[0] for url in links if url not in products]
+    )
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+class NearDuplicateIndex:
+    def __init__(self, max_distance: int = 3):
+        """
+        Initialize an index of SimHash fingerprints for near-duplicate lookup.
+
+        Fingerprints are split into max_distance + 1 bands, each stored in
+        its own table. Two fingerprints within max_distance bits of each
+        other agree on at least one whole band, so a lookup only compares
+        against fingerprints sharing a band instead of the whole index.
+
+        Args:
+            max_distance (int): Largest Hamming distance counted as a near-duplicate
+        """
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        width = FINGERPRINT_BITS // bands
+        # The last band absorbs the remainder bits
+        self._bands = [
+            (i * width, width if i < bands - 1 else FINGERPRINT_BITS - i * width)
+            for i in range(bands)
+        ]
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in self._bands]
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _keys(self, fingerprint: int) -> Iterable[int]:
+        for shift, width in self._bands:
+            yield (fingerprint >> shift) & ((1 << width) - 1)
+
+    def find(self, fingerprint: int) -> Optional[int]:
+        """
+        Return an indexed fingerprint within max_distance bits, if any.
+        """
+        for table, key in zip(self._tables, self._keys(fingerprint)):
+            for candidate in table.get(key, ()):
+                if hamming_distance(candidate, fingerprint) <= self.max_distance:
+                    return candidate
+        return None
+
+    def add(self, fingerprint: int) -> None:
+        for table, key in zip(self._tables, self._keys(fingerprint)):
+            table.setdefault(key, []).append(fingerprint)
+        self._count += 1
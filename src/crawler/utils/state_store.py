@@ -0,0 +1,219 @@
+import asyncio
+import json
+import logging
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    domain TEXT NOT NULL,
+    url TEXT NOT NULL,
+    depth INTEGER NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (domain, url)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS products (
+    domain TEXT NOT NULL,
+    url TEXT NOT NULL,
+    PRIMARY KEY (domain, url)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS domains (
+    domain TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    stats TEXT
+);
+"""
+
+class CrawlStateStore:
+    def __init__(
+        self,
+        path: str,
+        checkpoint_interval: float = 5.0,
+        batch_size: int = 5000
+    ):
+        """
+        Initialize a persistent crawl-state store backed by SQLite.
+
+        Frontier, visited and product updates are buffered in memory and
+        written in one transaction per checkpoint, either every
+        checkpoint_interval seconds or once batch_size updates are pending.
+
+        Args:
+            path (str): SQLite database file
+            checkpoint_interval (float): Seconds between periodic checkpoints
+            batch_size (int): Pending updates that trigger an early checkpoint
+        """
+        self.path = path
+        self.checkpoint_interval = checkpoint_interval
+        self.batch_size = batch_size
+        self._conn: Optional[sqlite3.Connection] = None
+        self._enqueued: List[Tuple[str, str, int]] = []
+        self._visited: List[Tuple[str, str]] = []
+        self._products: List[Tuple[str, str]] = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_needed = asyncio.Event()
+        self._checkpoint_task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "CrawlStateStore":
+        self._conn = await asyncio.to_thread(self._connect)
+        self._checkpoint_task = asyncio.create_task(self._checkpoint_loop())
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._checkpoint_task.cancel()
+        await asyncio.gather(self._checkpoint_task, return_exceptions=True)
+        try:
+            await self.flush()
+        finally:
+            self._conn.close()
+            self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Parallel mode has several processes writing to the same file
+        conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        conn.commit()
+        return conn
+
+    def record_enqueued(self, domain: str, url: str, depth: int) -> None:
+        """
+        Buffer a URL added to the frontier.
+        """
+        self._enqueued.append((domain, url, depth))
+        self._maybe_request_flush()
+
+    def record_visited(self, domain: str, url: str) -> None:
+        """
+        Buffer a URL whose processing has finished.
+        """
+        self._visited.append((domain, url))
+        self._maybe_request_flush()
+
+    def record_products(self, domain: str, urls: Iterable[str]) -> None:
+        """
+        Buffer newly discovered product URLs.
+        """
+        self._products.extend((domain, url) for url in urls)
+        self._maybe_request_flush()
+
+    def _maybe_request_flush(self) -> None:
+        pending = len(self._enqueued) + len(self._visited) + len(self._products)
+        if pending >= self.batch_size:
+            self._flush_needed.set()
+
+    async def _checkpoint_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._flush_needed.wait(), timeout=self.checkpoint_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except sqlite3.Error as e:
+                logger.error(f"Checkpoint to {self.path} failed: {str(e)}")
+
+    async def flush(self) -> None:
+        """
+        Write all buffered updates in a single transaction.
+        """
+        async with self._flush_lock:
+            await self._flush_pending()
+
+    async def _flush_pending(self, statements: Iterable[Tuple[str, tuple]] = ()) -> None:
+        # Callers hold _flush_lock: every statement on the shared connection
+        # runs under it, so no transaction ever interleaves with another
+        self._flush_needed.clear()
+        enqueued, self._enqueued = self._enqueued, []
+        visited, self._visited = self._visited, []
+        products, self._products = self._products, []
+        statements = list(statements)
+        if enqueued or visited or products or statements:
+            await asyncio.to_thread(self._write, enqueued, visited, products, statements)
+
+    def _write(self, enqueued, visited, products, statements=()) -> None:
+        # Inserts go first so a URL finished in this batch already has a row
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO urls (domain, url, depth) VALUES (?, ?, ?)",
+                enqueued
+            )
+            self._conn.executemany(
+                "UPDATE urls SET done = 1 WHERE domain = ? AND url = ?",
+                visited
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO products (domain, url) VALUES (?, ?)",
+                products
+            )
+            for sql, params in statements:
+                self._conn.execute(sql, params)
+
+    async def mark_domain_complete(self, domain: str, stats: Dict) -> None:
+        """
+        Record a domain as finished, in the same transaction as the pending
+        updates.
+        """
+        async with self._flush_lock:
+            await self._flush_pending([(
+                "INSERT OR REPLACE INTO domains (domain, status, stats) VALUES (?, 'complete', ?)",
+                (domain, json.dumps(stats))
+            )])
+
+    async def reset_domain(self, domain: str) -> None:
+        """
+        Drop any stored state for a domain so it is crawled from scratch.
+        """
+        async with self._flush_lock:
+            await self._flush_pending([
+                ("DELETE FROM urls WHERE domain = ?", (domain,)),
+                ("DELETE FROM products WHERE domain = ?", (domain,)),
+                ("INSERT OR REPLACE INTO domains (domain, status) VALUES (?, 'running')", (domain,)),
+            ])
+
+    async def load_domain(self, domain: str) -> Optional[Dict]:
+        """
+        Load the last checkpoint of a domain.
+
+        Returns:
+            Optional[Dict]: None if nothing is stored, otherwise a dict with
+            "status", "stats" (for complete domains), "visited" (URLs already
+            processed), "pending" ((url, depth) pairs still in the frontier)
+            and "product_urls"
+        """
+        async with self._flush_lock:
+            return await asyncio.to_thread(self._load_domain, domain)
+
+    def _load_domain(self, domain: str) -> Optional[Dict]:
+        row = self._conn.execute(
+            "SELECT status, stats FROM domains WHERE domain = ?", (domain,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        visited, pending = [], []
+        for url, depth, done in self._conn.execute(
+            "SELECT url, depth, done FROM urls WHERE domain = ?", (domain,)
+        ):
+            if done:
+                visited.append(url)
+            else:
+                pending.append((url, depth))
+
+        product_urls = [
+            url for (url,) in self._conn.execute(
+                "SELECT url FROM products WHERE domain = ?", (domain,)
+            )
+        ]
+        return {
+            "status": row[0],
+            "stats": json.loads(row[1]) if row[1] else None,
+            "visited": visited,
+            "pending": pending,
+            "product_urls": product_urls,
+        }
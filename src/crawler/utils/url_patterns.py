@@ -1,26 +1,275 @@
+import json
 import re
-from typing import List, Pattern
-from urllib.parse import urlparse
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
+from urllib.parse import parse_qsl, urlparse
+
+# Common product URL patterns
+PRODUCT_URL_PATTERNS: List[str] = [
+    r"/product[s]?/",
+    r"/item[s]?/",
+    r"/p/",
+    r"/pd/",
+    r"/dp/",  # Amazon style
+    r"/[A-Za-z0-9-]+/[A-Za-z0-9-]+-p-\d+",  # Shopify style
+    r"/catalog/product/view/id/\d+",  # Magento style
+    r"/shop/[^/]+/\d+",
+    r"/products/[^/]+$",
+    # Add more patterns as needed
+]
+
+# Path prefixes that are never product pages
+NON_PRODUCT_PREFIXES: Tuple[str, ...] = (
+    '/cart',
+    '/checkout',
+    '/account',
+    '/login',
+    '/register',
+    '/search',
+    '/category',
+    '/blog',
+    '/about',
+    '/contact',
+    '/help',
+    '/faq',
+    '/terms',
+    '/privacy',
+)
+
+# Listing pages (categories, collections, search results) link to many products
+LISTING_URL_PATTERNS: List[str] = [
+    r"/categor(?:y|ies)/",
+    r"/collections?/",
+    r"/c/",
+    r"/shop/",
+    r"/catalog/",
+    r"/department[s]?/",
+    r"/browse/",
+    r"/brand[s]?/",
+    r"/search",
+]
+
+# Further pages of a listing
+PAGINATION_PATTERNS: List[str] = [
+    r"[?&](?:page|p|pg|offset|start)=\d+",
+    r"/page/\d+",
+]
+
+# Extensions of links that never lead to an HTML page
+NON_HTML_EXTENSIONS: Tuple[str, ...] = (
+    'jpg', 'jpeg', 'png', 'gif', 'webp', 'avif', 'svg', 'ico', 'bmp', 'tif', 'tiff',
+    'pdf', 'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', 'csv', 'txt',
+    'zip', 'gz', 'tgz', 'rar', '7z', 'tar', 'exe', 'dmg', 'apk', 'iso',
+    'mp3', 'mp4', 'm4a', 'wav', 'ogg', 'webm', 'avi', 'mov', 'wmv', 'flv',
+    'css', 'js', 'json', 'xml', 'rss', 'atom',
+    'woff', 'woff2', 'ttf', 'eot', 'otf',
+)
+
+# Feeds, uploads, assets and APIs, whatever their extension
+NON_HTML_PATH_PATTERNS: List[str] = [
+    r"/(?:feed|rss|atom)/?$",
+    r"/wp-content/uploads/",
+    r"/wp-json/",
+    r"/cdn-cgi/",
+    r"/api/",
+    r"/static/",
+    r"/assets/",
+    r"/media/catalog/",
+    r"/\.well-known/",
+]
+
+_NON_HTML_MATCHER = re.compile(
+    "|".join(
+        [rf"\.(?:{'|'.join(NON_HTML_EXTENSIONS)})$"]
+        + [f"(?:{pattern})" for pattern in NON_HTML_PATH_PATTERNS]
+    ),
+    re.IGNORECASE
+)
+
+@lru_cache(maxsize=65536)
+def _is_non_html_path(path: str) -> bool:
+    return _NON_HTML_MATCHER.search(path) is not None
+
+def is_non_html_url(url: str) -> bool:
+    """
+    Check if a URL certainly does not lead to an HTML page, judging by its
+    extension or path, so it need not be fetched.
+
+    Args:
+        url (str): URL to check
+
+    Returns:
+        bool: True for images, documents, archives, media, assets, feeds and APIs
+    """
+    return _is_non_html_path(urlparse(url).path)
+
+_PAGINATION_MATCHER = re.compile("|".join(PAGINATION_PATTERNS), re.IGNORECASE)
+
+def is_pagination_url(url: str) -> bool:
+    """
+    Check if a URL is a numbered page of a listing ("?page=2", "/page/3").
+
+    Args:
+        url (str): URL to check
+
+    Returns:
+        bool: True if the URL matches PAGINATION_PATTERNS
+    """
+    parsed = urlparse(url)
+    target = f"{parsed.path}?{parsed.query}" if parsed.query else parsed.path
+    return _PAGINATION_MATCHER.search(target) is not None
+
+# Variable parts of a URL path, replaced when grouping URLs into templates.
+# The first three must match a whole path segment; numbers are replaced
+# wherever they occur
+TEMPLATE_SEGMENT_PATTERNS: List[Tuple[str, str]] = [
+    (r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", "{uuid}"),
+    (r"(?=[a-z]*\d)[0-9a-z_-]{24,}", "{token}"),  # session IDs, hashes
+    (r"\d{4}-\d{1,2}(?:-\d{1,2})?", "{date}"),
+    (r"\d+", "{n}"),
+]
+
+_TEMPLATE_SEGMENT_MATCHERS = [
+    (re.compile(f"(?:{pattern})$", re.IGNORECASE), replacement)
+    for pattern, replacement in TEMPLATE_SEGMENT_PATTERNS[:-1]
+]
+_TEMPLATE_NUMBER = re.compile(TEMPLATE_SEGMENT_PATTERNS[-1][0])
+
+def _template_segment(segment: str) -> str:
+    for matcher, replacement in _TEMPLATE_SEGMENT_MATCHERS:
+        if matcher.match(segment):
+            return replacement
+    return _TEMPLATE_NUMBER.sub(TEMPLATE_SEGMENT_PATTERNS[-1][1], segment)
+
+@lru_cache(maxsize=65536)
+def url_template(url: str) -> str:
+    """
+    Group a URL with others of the same shape.
+
+    Numbers, dates, UUIDs and session-like tokens in the path are replaced
+    by placeholders, path parameters (";jsessionid=...") are dropped and
+    the query keeps only its sorted parameter names, so every page of a
+    calendar, every session-ID copy of a path and every combination of
+    "?page=" and "?sort=" values share one template.
+
+    Args:
+        url (str): Absolute URL
+
+    Returns:
+        str: Template, e.g. "/archive/{date}/post-{n}?page&sort"
+    """
+    parsed = urlparse(url)
+    template = "/".join(_template_segment(segment) for segment in parsed.path.split("/"))
+    if parsed.query:
+        names = sorted({name for name, _ in parse_qsl(parsed.query, keep_blank_values=True)})
+        template += "?" + "&".join(names)
+    return template
 
 def get_common_product_patterns() -> List[Pattern]:
     """
     Returns a list of compiled regex patterns for common product URL formats.
     """
-    patterns = [
-        # Common product URL patterns
-        r"/product[s]?/",
-        r"/item[s]?/",
-        r"/p/",
-        r"/pd/",
-        r"/dp/",  # Amazon style
-        r"/[A-Za-z0-9-]+/[A-Za-z0-9-]+-p-\d+",  # Shopify style
-        r"/catalog/product/view/id/\d+",  # Magento style
-        r"/shop/[^/]+/\d+",
-        r"/products/[^/]+$",
-        # Add more patterns as needed
-    ]
-    
-    return [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+    return [re.compile(pattern, re.IGNORECASE) for pattern in PRODUCT_URL_PATTERNS]
+
+class ProductUrlClassifier:
+    def __init__(
+        self,
+        patterns: Optional[Iterable[str]] = None,
+        excluded_prefixes: Optional[Iterable[str]] = None,
+        cache_size: int = 65536
+    ):
+        """
+        Initialize a product URL classifier.
+
+        All product patterns and excluded prefixes are compiled once into a
+        single regex, so each path is checked in one pass. Results are
+        memoized per path because category pages link to the same paths
+        over and over.
+
+        Args:
+            patterns: Product URL regexes. Defaults to PRODUCT_URL_PATTERNS.
+            excluded_prefixes: Path prefixes that are never product pages.
+                Defaults to NON_PRODUCT_PREFIXES.
+            cache_size (int): Number of recent paths to memoize
+        """
+        patterns = list(PRODUCT_URL_PATTERNS if patterns is None else patterns)
+        excluded_prefixes = list(
+            NON_PRODUCT_PREFIXES if excluded_prefixes is None else excluded_prefixes
+        )
+
+        product_alternation = "|".join(f"(?:{pattern})" for pattern in patterns)
+        matcher = f".*?(?:{product_alternation})" if patterns else "(?!)"
+        if excluded_prefixes:
+            excluded_alternation = "|".join(
+                re.escape(prefix.lower()) for prefix in excluded_prefixes
+            )
+            matcher = f"(?!{excluded_alternation}){matcher}"
+
+        self._matcher = re.compile(matcher, re.IGNORECASE | re.DOTALL)
+        self._classify_path = lru_cache(maxsize=cache_size)(self._match_path)
+
+    def _match_path(self, path: str) -> bool:
+        return self._matcher.match(path) is not None
+
+    def is_product_path(self, path: str) -> bool:
+        """
+        Check if a URL path is likely to be a product page.
+
+        Args:
+            path (str): URL path, e.g. "/products/blue-shirt"
+
+        Returns:
+            bool: True if the path matches product page patterns
+        """
+        return self._classify_path(path.lower())
+
+    def is_product_url(self, url: str) -> bool:
+        """
+        Check if a URL is likely to be a product page.
+
+        Args:
+            url (str): URL to check
+
+        Returns:
+            bool: True if the URL matches product page patterns
+        """
+        return self._classify_path(urlparse(url).path.lower())
+
+    def classify_urls(self, urls: Iterable[str]) -> List[bool]:
+        """
+        Classify a batch of URLs.
+
+        Args:
+            urls: URLs to check
+
+        Returns:
+            List[bool]: One flag per input URL, in input order
+        """
+        classify_path = self._classify_path
+        return [classify_path(urlparse(url).path.lower()) for url in urls]
+
+    def cache_info(self):
+        """
+        Return hit/miss statistics of the path memo cache.
+        """
+        return self._classify_path.cache_info()
+
+    def cache_clear(self) -> None:
+        """
+        Empty the path memo cache.
+        """
+        self._classify_path.cache_clear()
+
+_default_classifier: Optional[ProductUrlClassifier] = None
+
+def get_default_classifier() -> ProductUrlClassifier:
+    """
+    Return the process-wide classifier built from the default patterns.
+    """
+    global _default_classifier
+    if _default_classifier is None:
+        _default_classifier = ProductUrlClassifier()
+    return _default_classifier
 
 def is_product_url(url: str) -> bool:
     """
@@ -32,34 +281,146 @@ def is_product_url(url: str) -> bool:
     Returns:
         bool: True if the URL matches product page patterns
     """
-    # Parse the URL
-    parsed = urlparse(url)
-    path = parsed.path.lower()
-    
-    # Skip obvious non-product URLs
-    if any(path.startswith(prefix) for prefix in [
-        '/cart',
-        '/checkout',
-        '/account',
-        '/login',
-        '/register',
-        '/search',
-        '/category',
-        '/blog',
-        '/about',
-        '/contact',
-        '/help',
-        '/faq',
-        '/terms',
-        '/privacy',
-    ]):
-        return False
-    
-    # Check against common product URL patterns
-    patterns = get_common_product_patterns()
-    
-    # Check if URL matches any product pattern
-    return any(pattern.search(path) is not None for pattern in patterns)
+    return get_default_classifier().is_product_url(url)
+
+# Product ID patterns, tried in order on the URL path and query. Each
+# pattern captures the ID; patterns with several groups (e.g. shop and item
+# IDs) join them with "-". Product keys are prefixed with the index of the
+# matching pattern, so "/p/123" and "?product_id=123" stay distinct
+PRODUCT_ID_PATTERNS: List[str] = [
+    r"/product[s]?/(\d+)",
+    r"/item[s]?/(\d+)",
+    r"/p/(\d+)",
+    r"/pd/(\d+)",
+    r"/dp/([A-Z0-9]+)",  # Amazon style
+    r"-p-(\d+)",  # Shopify style
+    r"/id/(\d+)",  # Magento style
+    r"/gp/product/([A-Z0-9]{10})",  # Amazon legacy
+    r"/ip/(?:[^/]+/)?(\d+)",  # Walmart style
+    r"/itm/(?:[^/]+/)?(\d+)",  # eBay style
+    r"-i\.(\d+)\.(\d+)",  # Shopee style
+    r"/prod(\d+)",  # Target style ("/prod12345")
+    r"/sku/([\w-]+)",
+    r"[?&](?:product_?id|pid|sku|item_?id|variant_of)=([\w-]+)",
+    # Product handle (last path segment), e.g. Shopify "/products/blue-shirt"
+    r"/products/(?:[^/?#]+/)*([^/?#]+)/?(?:\?|$)",
+]
+
+def _bare_domain(domain: str) -> str:
+    domain = domain.lower()
+    return domain[4:] if domain.startswith('www.') else domain
+
+class ProductIdExtractor:
+    def __init__(
+        self,
+        patterns: Optional[Iterable[str]] = None,
+        domain_patterns: Optional[Dict[str, Iterable[str]]] = None,
+        cache_size: int = 65536
+    ):
+        """
+        Initialize a product identity extractor.
+
+        A product reached through colour or size variants, tracking paths
+        or category-prefixed paths has one key, so its other URLs can be
+        recognized as the same product. A domain's own patterns are tried
+        before the default ones. A key is the product ID prefixed with the
+        index of the pattern that matched ("3:123"), so IDs of different URL
+        schemes never collide. Keys are memoized per domain and URL.
+
+        Args:
+            patterns: Product ID regexes. Defaults to PRODUCT_ID_PATTERNS.
+            domain_patterns: Extra regexes per domain, keyed by domain
+                without "www."
+            cache_size (int): Number of recent URLs to memoize
+        """
+        self.patterns = list(PRODUCT_ID_PATTERNS if patterns is None else patterns)
+        self.domain_patterns = {
+            _bare_domain(domain): list(domain_patterns_)
+            for domain, domain_patterns_ in (domain_patterns or {}).items()
+        }
+        self._matchers = self._compile(self.patterns)
+        self._domain_matchers = {
+            domain: self._compile(domain_patterns_) + self._matchers
+            for domain, domain_patterns_ in self.domain_patterns.items()
+        }
+        self._extract = lru_cache(maxsize=cache_size)(self._match_url)
+
+    @classmethod
+    def from_file(cls, path: str) -> "ProductIdExtractor":
+        """
+        Load patterns from a JSON file of the form:
+
+            {
+                "default": ["/article/(\\d+)"],
+                "domains": {
+                    "example.com": ["/shop/[^/]+/([A-Z]{2}\\d{6})"]
+                }
+            }
+
+        "default" patterns are added to PRODUCT_ID_PATTERNS and "domains"
+        patterns are tried first for their domain. Both sections are
+        optional.
+        """
+        with open(path, 'r') as f:
+            config = json.load(f)
+        return cls(
+            list(config.get("default", [])) + PRODUCT_ID_PATTERNS,
+            config.get("domains", {})
+        )
+
+    @staticmethod
+    def _compile(patterns: Iterable[str]) -> List[Pattern]:
+        return [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+
+    def _match_url(self, domain: str, url: str) -> str:
+        parsed = urlparse(url)
+        target = f"{parsed.path}?{parsed.query}" if parsed.query else parsed.path
+        for index, matcher in enumerate(self._domain_matchers.get(domain, self._matchers)):
+            match = matcher.search(target)
+            if match:
+                product_id = "-".join(group for group in match.groups() if group)
+                if product_id:
+                    return f"{index}:{product_id}"
+        return ""
+
+    def product_key(self, url: str, domain: str = "") -> str:
+        """
+        Return the product key of a URL.
+
+        Args:
+            url (str): URL to check
+            domain (str): Domain whose patterns apply
+
+        Returns:
+            str: Pattern index and product ID, or an empty string if no
+                pattern matches
+        """
+        return self._extract(_bare_domain(domain), url)
+
+    def product_keys(self, urls: Iterable[str], domain: str = "") -> List[str]:
+        """
+        Return the product keys of a batch of URLs, in input order.
+        """
+        domain = _bare_domain(domain)
+        extract = self._extract
+        return [extract(domain, url) for url in urls]
+
+    def product_id(self, url: str, domain: str = "") -> str:
+        """
+        Return the product ID of a URL, without the pattern index of its key.
+        """
+        return self.product_key(url, domain).partition(":")[2]
+
+_default_product_ids: Optional[ProductIdExtractor] = None
+
+def get_default_product_id_extractor() -> ProductIdExtractor:
+    """
+    Return the process-wide extractor built from the default patterns.
+    """
+    global _default_product_ids
+    if _default_product_ids is None:
+        _default_product_ids = ProductIdExtractor()
+    return _default_product_ids
 
 def extract_product_id(url: str) -> str:
     """
@@ -72,19 +433,4 @@ def extract_product_id(url: str) -> str:
     Returns:
         str: Extracted product ID or empty string
     """
-    patterns = [
-        r'/product[s]?/(\d+)',
-        r'/item[s]?/(\d+)',
-        r'/p/(\d+)',
-        r'/pd/(\d+)',
-        r'/dp/([A-Z0-9]+)',  # Amazon style
-        r'-p-(\d+)',  # Shopify style
-        r'/id/(\d+)',  # Magento style
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, url, re.IGNORECASE)
-        if match:
-            return match.group(1)
-    
-    return "" 
\ No newline at end of file
+    return get_default_product_id_extractor().product_id(url)
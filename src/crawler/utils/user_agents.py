@@ -0,0 +1,78 @@
+import logging
+import random
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Headers sent with every request besides the User-Agent
+DEFAULT_HEADERS: Dict[str, str] = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+    "Cache-Control": "max-age=0",
+}
+
+# Most common desktop User-Agents kept in the pool
+USER_AGENT_POOL_SIZE = 100
+
+# Used when the fake_useragent dataset cannot be loaded
+FALLBACK_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+)
+
+class UserAgentPool:
+    def __init__(self, user_agents: Iterable[str]):
+        """
+        Initialize a pool of User-Agents with their request headers built
+        up front, so picking one costs a random.choice() rather than a scan
+        of the fake_useragent dataset.
+
+        Args:
+            user_agents: User-Agent strings. Defaults to FALLBACK_USER_AGENT
+                if empty.
+        """
+        self.user_agents: List[str] = list(user_agents) or [FALLBACK_USER_AGENT]
+        self._headers = [
+            {"User-Agent": user_agent, **DEFAULT_HEADERS}
+            for user_agent in self.user_agents
+        ]
+
+    @classmethod
+    def load(cls, size: int = USER_AGENT_POOL_SIZE) -> "UserAgentPool":
+        """
+        Build a pool from the size most common desktop User-Agents of the
+        fake_useragent dataset, which is only imported here.
+        """
+        try:
+            from fake_useragent import UserAgent
+            entries = list(UserAgent().data_browsers)
+        except Exception as e:
+            logger.warning(f"Could not load User-Agent data, using a fixed User-Agent: {str(e)}")
+            return cls([])
+
+        desktop = [entry for entry in entries if entry.get("type") == "desktop"] or entries
+        desktop.sort(key=lambda entry: entry.get("percent", 0.0), reverse=True)
+        user_agents = dict.fromkeys(entry["useragent"] for entry in desktop if entry.get("useragent"))
+        return cls(list(user_agents)[:size])
+
+    def random_headers(self) -> Dict[str, str]:
+        """
+        Return the request headers of a random User-Agent.
+
+        The dict is shared by every caller; copy it before changing it.
+        """
+        return random.choice(self._headers)
+
+    def __len__(self) -> int:
+        return len(self.user_agents)
+
+_default_pool: Optional[UserAgentPool] = None
+
+def get_user_agent_pool() -> UserAgentPool:
+    """
+    Return the process-wide User-Agent pool, loading it on first use.
+    """
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = UserAgentPool.load()
+    return _default_pool
@@ -1,12 +1,20 @@
 import asyncio
 import argparse
+import json
 import logging
-from typing import List
+from typing import Dict, List
 import sys
 import os
 from dotenv import load_dotenv
-from crawler.crawler import EcommerceCrawler
+from crawler.crawler import SITEMAP_MODES, EcommerceCrawler
 from crawler.parallel_crawler import ParallelCrawler
+from crawler.distributed import CrawlCoordinator, run_worker_process
+from crawler.reprocess import reprocess_archive
+from crawler.utils.canonicalize import UrlCanonicalizer
+from crawler.utils.link_extractor import LINK_EXTRACTORS
+from crawler.utils.processes import START_METHODS, set_start_method
+from crawler.utils.seen_set import SEEN_SET_MODES
+from crawler.utils.url_patterns import ProductIdExtractor
 import multiprocessing
 
 # Set up logging
@@ -41,12 +49,23 @@ def crawl_parallel(crawler: ParallelCrawler, domains: List[str]):
     results = crawler.crawl(domains)
     return results
 
+def load_domain_weights(file_path: str) -> Dict[str, float]:
+    """
+    Load per-domain scheduler weights from a JSON object file.
+    """
+    try:
+        with open(file_path, 'r') as f:
+            return {domain: float(weight) for domain, weight in json.load(f).items()}
+    except Exception as e:
+        logger.error(f"Error reading domain weights file: {str(e)}")
+        sys.exit(1)
+
 def print_results_summary(results: dict):
     """
     Print detailed summary of crawling results.
     """
     total_products = sum(
-        len(result['product_urls'])
+        result.get('stats', {}).get('total_urls_found', 0)
         for result in results.values()
     )
     
@@ -55,7 +74,7 @@ def print_results_summary(results: dict):
     
     for domain, result in results.items():
         stats = result.get('stats', {})
-        urls_found = len(result.get('product_urls', []))
+        urls_found = stats.get('total_urls_found', 0)
         urls_visited = stats.get('total_urls_visited', 0)
         depth = stats.get('depth_reached', 0)
         duration = stats.get('crawl_time', {}).get('duration_seconds', 0)
@@ -63,8 +82,38 @@ def print_results_summary(results: dict):
         logger.info(f"\nDomain: {domain}")
         logger.info(f"- Product URLs found: {urls_found}")
         logger.info(f"- Total URLs visited: {urls_visited}")
+        if urls_visited:
+            logger.info(f"- Products per page: {urls_found / urls_visited:.2f}")
+        if stats.get('product_variants_skipped'):
+            logger.info(f"- Variant URLs of known products skipped: {stats['product_variants_skipped']}")
+        if stats.get('near_duplicate_pages'):
+            logger.info(
+                f"- Near-duplicate pages not expanded: {stats['near_duplicate_pages']} "
+                f"({stats['near_duplicate_links_pruned']} links, "
+                f"~{stats['near_duplicate_bytes_saved'] / (1024 * 1024):.1f} MB saved)"
+            )
+        if stats.get('urls_filtered_before_fetch') or stats.get('responses_aborted'):
+            logger.info(
+                f"- Non-HTML requests avoided: {stats.get('urls_filtered_before_fetch', 0)} URLs filtered, "
+                f"{stats.get('responses_aborted', 0)} responses aborted "
+                f"(~{stats.get('bytes_avoided', 0) / (1024 * 1024):.1f} MB not downloaded)"
+            )
+        templates = stats.get('url_templates') or {}
+        if templates.get('throttled_count'):
+            logger.info(
+                f"- URL templates throttled: {templates['throttled_count']} "
+                f"({templates['urls_dropped']} URLs dropped)"
+            )
+        if stats.get('budget_exhausted'):
+            logger.info(f"- Stopped early: {stats['budget_exhausted']} budget used up")
         logger.info(f"- Depth reached: {depth}")
         logger.info(f"- Duration: {duration:.2f} seconds")
+        connections = stats.get('connections')
+        if connections:
+            logger.info(
+                f"- Connections: {connections['new_connections']} new, "
+                f"{connections['reused_connections']} reused"
+            )
         
         if 'error' in result:
             logger.warning(f"- Encountered error: {result['error']}")
@@ -88,6 +137,42 @@ def main():
         type=str,
         help='Path to file containing domains (one per line)'
     )
+    group.add_argument(
+        '--worker',
+        metavar='ADDRESS',
+        help='Run as a worker for the coordinator at host:port or unix:/path'
+    )
+    group.add_argument(
+        '--reprocess',
+        metavar='ARCHIVE_DIR',
+        help='Re-extract product URLs from a page archive without fetching anything'
+    )
+    parser.add_argument(
+        '--coordinator',
+        metavar='ADDRESS',
+        nargs='?',
+        const='127.0.0.1:8765',
+        default=None,
+        help='Coordinate workers connecting to host:port or unix:/path (default: 127.0.0.1:8765)'
+    )
+    parser.add_argument(
+        '--local-workers',
+        type=int,
+        default=0,
+        help='Worker processes to start on this machine in coordinator mode'
+    )
+    parser.add_argument(
+        '--lease-size',
+        type=int,
+        default=int(os.getenv('LEASE_SIZE', '50')),
+        help='Maximum URLs leased to a worker at once in coordinator mode'
+    )
+    parser.add_argument(
+        '--lease-timeout',
+        type=float,
+        default=float(os.getenv('LEASE_TIMEOUT', '120')),
+        help='Seconds before an unrenewed lease is given to another worker'
+    )
     
     parser.add_argument(
         '--parallel',
@@ -98,7 +183,25 @@ def main():
         '--processes',
         type=int,
         default=multiprocessing.cpu_count(),
-        help='Number of processes to use in parallel mode'
+        help='Number of processes to use in parallel and reprocess modes'
+    )
+    parser.add_argument(
+        '--domains-per-worker',
+        type=int,
+        default=int(os.getenv('DOMAINS_PER_WORKER', '4')),
+        help='Domains each process crawls at once in parallel mode (leases per worker in distributed mode)'
+    )
+    parser.add_argument(
+        '--shard-domains',
+        nargs='+',
+        default=None,
+        help='Large domains to split across processes by URL hash in parallel mode'
+    )
+    parser.add_argument(
+        '--shards-per-domain',
+        type=int,
+        default=None,
+        help='Processes each --shard-domains domain is split across (defaults to --processes)'
     )
     parser.add_argument(
         '--max-concurrent',
@@ -110,7 +213,57 @@ def main():
         '--crawl-delay',
         type=float,
         default=float(os.getenv('CRAWL_DELAY', '1.0')),
-        help='Delay between requests to the same domain'
+        help='Delay between requests to the same domain (initial delay with --rate-limit adaptive)'
+    )
+    parser.add_argument(
+        '--max-in-flight',
+        type=int,
+        default=int(os.environ['MAX_IN_FLIGHT']) if os.getenv('MAX_IN_FLIGHT') else None,
+        help='Maximum requests in flight per process, shared fairly between domains '
+             '(defaults to --connection-limit, 0 for no limit)'
+    )
+    parser.add_argument(
+        '--domain-weights',
+        type=str,
+        default=None,
+        help='JSON file mapping domains to their relative share of the in-flight requests'
+    )
+    parser.add_argument(
+        '--connection-limit',
+        type=int,
+        default=int(os.getenv('CONNECTION_LIMIT', '100')),
+        help='Maximum open connections per process (0 for no limit)'
+    )
+    parser.add_argument(
+        '--connections-per-host',
+        type=int,
+        default=int(os.getenv('CONNECTIONS_PER_HOST', '0')) or None,
+        help='Maximum open connections per host (defaults to --max-concurrent)'
+    )
+    parser.add_argument(
+        '--dns-ttl',
+        type=int,
+        default=int(os.getenv('DNS_TTL', '300')),
+        help='Seconds resolved host addresses are cached'
+    )
+    parser.add_argument(
+        '--rate-limit',
+        choices=['adaptive', 'fixed'],
+        default=os.getenv('RATE_LIMIT', 'adaptive'),
+        help='adaptive: tune each domain\'s request rate from response times, 429s and 5xx; '
+             'fixed: one request per --crawl-delay'
+    )
+    parser.add_argument(
+        '--max-rate',
+        type=float,
+        default=float(os.getenv('MAX_RATE', '20.0')),
+        help='Highest requests/second per domain with --rate-limit adaptive'
+    )
+    parser.add_argument(
+        '--rate-burst',
+        type=int,
+        default=int(os.getenv('RATE_BURST', '5')),
+        help='Number of requests that may be sent to a domain back to back in adaptive mode'
     )
     parser.add_argument(
         '--max-depth',
@@ -118,6 +271,31 @@ def main():
         default=int(os.getenv('MAX_DEPTH', '3')),
         help='Maximum crawl depth'
     )
+    parser.add_argument(
+        '--frontier',
+        choices=['best-first', 'bfs'],
+        default=os.getenv('FRONTIER', 'best-first'),
+        help='best-first: fetch the links most likely to lead to products first; '
+             'bfs: fetch in discovery order'
+    )
+    parser.add_argument(
+        '--max-pages',
+        type=int,
+        default=int(os.getenv('MAX_PAGES', '0')),
+        help='Maximum pages fetched per domain (0 for no limit)'
+    )
+    parser.add_argument(
+        '--deadline',
+        type=float,
+        default=float(os.getenv('DEADLINE', '0')),
+        help='Stop every domain this many seconds after the run starts (0 for no limit)'
+    )
+    parser.add_argument(
+        '--max-domain-time',
+        type=float,
+        default=float(os.getenv('MAX_DOMAIN_TIME', '0')),
+        help='Maximum seconds spent crawling each domain (0 for no limit)'
+    )
     parser.add_argument(
         '--timeout',
         type=int,
@@ -130,6 +308,23 @@ def main():
         default='output',
         help='Directory to store output files'
     )
+    parser.add_argument(
+        '--metrics-file',
+        default=os.getenv('METRICS_FILE') or None,
+        help='Write a JSON snapshot of per-host request timings to this file periodically'
+    )
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        default=int(os.getenv('METRICS_PORT', '0')),
+        help='Serve per-host request timings in Prometheus format on 127.0.0.1:PORT/metrics (0 to disable)'
+    )
+    parser.add_argument(
+        '--metrics-interval',
+        type=float,
+        default=float(os.getenv('METRICS_INTERVAL', '10')),
+        help='Seconds between metrics snapshots'
+    )
     parser.add_argument(
         '--max-retries',
         type=int,
@@ -142,15 +337,203 @@ def main():
         default=float(os.getenv('RETRY_DELAY', '2.0')),
         help='Initial delay between retries (will be exponentially increased)'
     )
+    parser.add_argument(
+        '--parser',
+        choices=sorted(LINK_EXTRACTORS),
+        default=os.getenv('PARSER', 'stream'),
+        help='Link extraction backend (stream: incremental regex scanner, soup: BeautifulSoup)'
+    )
+    parser.add_argument(
+        '--max-body-size',
+        type=int,
+        default=int(os.getenv('MAX_BODY_SIZE', str(5 * 1024 * 1024))),
+        help='Maximum number of bytes to read from a single page'
+    )
+    parser.add_argument(
+        '--parse-workers',
+        type=int,
+        default=int(os.getenv('PARSE_WORKERS', '0')),
+        help='Parse pages in this many worker processes (0 parses on the event loop; async mode only)'
+    )
+    parser.add_argument(
+        '--start-method',
+        choices=START_METHODS,
+        default=os.getenv('START_METHOD', 'default'),
+        help='How worker processes are started: the platform default, or forked from a preloaded fork server'
+    )
+    parser.add_argument(
+        '--max-parse-jobs',
+        type=int,
+        default=None,
+        help='Maximum number of parse jobs in flight (defaults to twice --parse-workers)'
+    )
+    parser.add_argument(
+        '--state-file',
+        type=str,
+        default=None,
+        help='SQLite file for crawl checkpoints (defaults to <output-dir>/crawl_state.sqlite)'
+    )
+    parser.add_argument(
+        '--no-checkpoint',
+        action='store_true',
+        help='Do not record crawl state on disk'
+    )
+    parser.add_argument(
+        '--checkpoint-interval',
+        type=float,
+        default=float(os.getenv('CHECKPOINT_INTERVAL', '5.0')),
+        help='Seconds between crawl state checkpoints'
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Continue from the last checkpoint instead of starting over'
+    )
+    parser.add_argument(
+        '--seen-mode',
+        choices=sorted(SEEN_SET_MODES),
+        default=os.getenv('SEEN_MODE', 'exact'),
+        help='Visited-URL structure: exact (64-bit fingerprints) or bloom (probabilistic, smallest)'
+    )
+    parser.add_argument(
+        '--seen-capacity',
+        type=int,
+        default=int(os.getenv('SEEN_CAPACITY', '1024')),
+        help='Expected number of URLs per domain used to size the visited-URL structure'
+    )
+    parser.add_argument(
+        '--bloom-fp-rate',
+        type=float,
+        default=float(os.getenv('BLOOM_FP_RATE', '0.001')),
+        help='False-positive rate of the bloom visited-URL structure'
+    )
+    parser.add_argument(
+        '--canonical-rules',
+        type=str,
+        default=os.getenv('CANONICAL_RULES'),
+        help='JSON file with default and per-domain URL canonicalization rules'
+    )
+    parser.add_argument(
+        '--no-canonicalize',
+        action='store_true',
+        help='Crawl discovered URLs exactly as written'
+    )
+    parser.add_argument(
+        '--product-id-rules',
+        type=str,
+        default=os.getenv('PRODUCT_ID_RULES'),
+        help='JSON file with default and per-domain product ID regexes'
+    )
+    parser.add_argument(
+        '--no-product-dedup',
+        action='store_true',
+        help='Record and fetch every product URL, even variants of a product already found'
+    )
+    parser.add_argument(
+        '--template-budget',
+        type=int,
+        default=int(os.getenv('TEMPLATE_BUDGET', '1000')),
+        help='Maximum non-product, non-pagination URLs fetched per URL template and domain (0 disables template budgets)'
+    )
+    parser.add_argument(
+        '--no-prefetch-filter',
+        action='store_true',
+        help='Fetch links to images, documents, assets and feeds too (they are still dropped after the headers)'
+    )
+    parser.add_argument(
+        '--no-near-duplicates',
+        action='store_true',
+        help='Expand the links of every page, including near-duplicates of pages already expanded'
+    )
+    parser.add_argument(
+        '--near-duplicate-distance',
+        type=int,
+        default=int(os.getenv('NEAR_DUPLICATE_DISTANCE', '3')),
+        help='Largest SimHash bit difference between two link sets counted as near-duplicates'
+    )
+    parser.add_argument(
+        '--gzip-output',
+        action='store_true',
+        help='Gzip-compress the JSONL product files'
+    )
+    parser.add_argument(
+        '--output-max-mb',
+        type=int,
+        default=int(os.getenv('OUTPUT_MAX_MB', '256')),
+        help='Start a new product file after this many megabytes (0 disables rotation)'
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Revalidate pages with conditional requests and reuse the links of unchanged pages'
+    )
+    parser.add_argument(
+        '--cache-file',
+        type=str,
+        default=None,
+        help='SQLite file for the HTTP validator cache (defaults to <output-dir>/http_cache.sqlite)'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Do not record validators and outlinks for later incremental runs'
+    )
+    parser.add_argument(
+        '--cache-max-age',
+        type=float,
+        default=float(os.getenv('CACHE_MAX_AGE', str(7 * 24 * 3600))),
+        help='Seconds a page confirmed unchanged by a 304 is not requested again in incremental mode'
+    )
+    parser.add_argument(
+        '--sitemaps',
+        choices=SITEMAP_MODES,
+        default=os.getenv('SITEMAPS', 'seed'),
+        help='Sitemap discovery (off: link crawl only, seed: seed the link crawl from sitemaps, '
+             'only: skip the link crawl when sitemaps list products)'
+    )
+    parser.add_argument(
+        '--archive-dir',
+        default=os.getenv('ARCHIVE_DIR') or None,
+        help='Keep a compressed copy of every fetched page in this directory for --reprocess'
+    )
+    parser.add_argument(
+        '--archive-segment-mb',
+        type=int,
+        default=int(os.getenv('ARCHIVE_SEGMENT_MB', '256')),
+        help='Start a new archive segment file after this many megabytes'
+    )
     
     args = parser.parse_args()
     
     # Get domains list
-    domains = (
-        args.domains if args.domains
-        else load_domains_from_file(args.input)
-    )
+    domains = []
+    if args.domains:
+        domains = args.domains
+    elif args.input:
+        domains = load_domains_from_file(args.input)
+
+    if args.coordinator and (args.parallel or args.worker):
+        parser.error('--coordinator cannot be combined with --parallel or --worker')
+
+    if args.reprocess and (args.coordinator or args.parallel or args.archive_dir):
+        parser.error('--reprocess cannot be combined with --coordinator, --parallel or --archive-dir')
     
+    if args.resume and args.no_checkpoint:
+        parser.error('--resume cannot be combined with --no-checkpoint')
+
+    if args.incremental and args.no_cache:
+        parser.error('--incremental cannot be combined with --no-cache')
+
+    cache_file = None
+    if not args.no_cache:
+        cache_file = args.cache_file or os.path.join(args.output_dir, 'http_cache.sqlite')
+        os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+
+    state_file = None
+    if not args.no_checkpoint:
+        state_file = args.state_file or os.path.join(args.output_dir, 'crawl_state.sqlite')
+        os.makedirs(os.path.dirname(os.path.abspath(state_file)), exist_ok=True)
+
     # Prepare crawler configuration
     crawler_config = {
         'max_concurrent_requests': args.max_concurrent,
@@ -159,14 +542,118 @@ def main():
         'timeout': args.timeout,
         'output_dir': args.output_dir,
         'max_retries': args.max_retries,
-        'retry_delay': args.retry_delay
+        'retry_delay': args.retry_delay,
+        'parser': args.parser,
+        'max_body_size': args.max_body_size,
+        'parse_workers': args.parse_workers,
+        'max_parse_jobs': args.max_parse_jobs,
+        'state_file': state_file,
+        'resume': args.resume,
+        'checkpoint_interval': args.checkpoint_interval,
+        'seen_mode': args.seen_mode,
+        'seen_capacity': args.seen_capacity,
+        'bloom_fp_rate': args.bloom_fp_rate,
+        'canonicalize': not args.no_canonicalize,
+        'canonical_rules': None if args.no_canonicalize else args.canonical_rules,
+        'output_compress': args.gzip_output,
+        'output_max_file_size': args.output_max_mb * 1024 * 1024,
+        'cache_file': cache_file,
+        'incremental': args.incremental,
+        'cache_max_age': args.cache_max_age,
+        'sitemap_mode': args.sitemaps,
+        'adaptive_rate': args.rate_limit == 'adaptive',
+        'max_rate': args.max_rate,
+        'rate_burst': args.rate_burst,
+        'connection_limit': args.connection_limit,
+        'connections_per_host': args.connections_per_host,
+        'dns_ttl': args.dns_ttl,
+        'frontier_mode': args.frontier,
+        'max_pages_per_domain': args.max_pages or None,
+        'max_domain_time': args.max_domain_time or None,
+        'metrics_file': args.metrics_file,
+        'metrics_port': args.metrics_port or None,
+        'metrics_interval': args.metrics_interval,
+        'archive_dir': args.archive_dir,
+        'archive_segment_size': args.archive_segment_mb * 1024 * 1024,
+        'near_duplicates': not args.no_near_duplicates,
+        'near_duplicate_distance': args.near_duplicate_distance,
+        'template_budget': args.template_budget,
+        'prefetch_filter': not args.no_prefetch_filter,
+        'product_dedup': not args.no_product_dedup,
+        'product_id_rules': None if args.no_product_dedup else args.product_id_rules,
+        'max_in_flight': args.max_in_flight,
+        'domain_weights': load_domain_weights(args.domain_weights) if args.domain_weights else None,
+        'deadline': args.deadline or None
     }
     
+    # The coordinator keeps the checkpoints in distributed mode
+    worker_config = dict(crawler_config, state_file=None, resume=False)
+    set_start_method(args.start_method)
+
     try:
-        if args.parallel:
+        if args.worker:
+            logger.info(f"Starting worker for coordinator at {args.worker}")
+            run_worker_process(args.worker, worker_config, args.domains_per_worker)
+            return
+
+        canonicalizer = None
+        if args.canonical_rules and not args.no_canonicalize:
+            canonicalizer = UrlCanonicalizer.from_file(args.canonical_rules)
+        elif not args.no_canonicalize:
+            canonicalizer = UrlCanonicalizer()
+        product_ids = None
+        if args.product_id_rules and not args.no_product_dedup:
+            product_ids = ProductIdExtractor.from_file(args.product_id_rules)
+        elif not args.no_product_dedup:
+            product_ids = ProductIdExtractor()
+
+        if args.reprocess:
+            logger.info(f"Reprocessing page archive {args.reprocess}")
+            results = asyncio.run(reprocess_archive(
+                args.reprocess,
+                output_dir=args.output_dir,
+                processes=args.processes,
+                parser=args.parser,
+                canonicalizer=canonicalizer,
+                product_ids=product_ids,
+                seen_mode=args.seen_mode,
+                seen_capacity=args.seen_capacity,
+                bloom_fp_rate=args.bloom_fp_rate,
+                output_compress=args.gzip_output,
+                output_max_file_size=args.output_max_mb * 1024 * 1024
+            ))
+        elif args.coordinator:
+            coordinator = CrawlCoordinator(
+                args.coordinator,
+                max_depth=args.max_depth,
+                output_dir=args.output_dir,
+                batch_size=args.lease_size,
+                lease_timeout=args.lease_timeout,
+                seen_mode=args.seen_mode,
+                seen_capacity=args.seen_capacity,
+                bloom_fp_rate=args.bloom_fp_rate,
+                canonicalizer=canonicalizer,
+                product_ids=product_ids,
+                prefetch_filter=not args.no_prefetch_filter,
+                output_compress=args.gzip_output,
+                output_max_file_size=args.output_max_mb * 1024 * 1024,
+                state_file=state_file,
+                resume=args.resume,
+                checkpoint_interval=args.checkpoint_interval,
+                timeout=args.timeout
+            )
+            # Local workers would all claim the same metrics file and port
+            local_worker_config = dict(worker_config, metrics_file=None, metrics_port=None)
+            results = asyncio.run(coordinator.run(
+                domains, args.local_workers, local_worker_config, args.domains_per_worker
+            ))
+        elif args.parallel:
             logger.info(f"Starting parallel crawler with {args.processes} processes")
             crawler = ParallelCrawler(
                 max_processes=args.processes,
+                domains_per_worker=args.domains_per_worker,
+                shard_domains=args.shard_domains,
+                shards_per_domain=args.shards_per_domain,
                 **crawler_config
             )
             results = crawl_parallel(crawler, domains)
@@ -179,6 +666,8 @@ def main():
         
     except KeyboardInterrupt:
         logger.info("Crawling interrupted by user")
+        if state_file:
+            logger.info(f"Crawl state saved to {state_file}; rerun with --resume to continue")
         sys.exit(0)
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
@@ -0,0 +1,33 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from synthetic_shop import ShopConfig, start_shop  # noqa: E402
+
+@pytest.fixture(scope="session")
+def shop():
+    """
+    A small synthetic shop served over HTTPS: (config, domain).
+    """
+    if shutil.which("openssl") is None:
+        pytest.skip("the synthetic shop needs the openssl command")
+    config = ShopConfig(
+        categories=3,
+        products_per_category=30,
+        page_size=10,
+        fanout=2,
+        chrome_links=4,
+        page_kb=1,
+        latency_ms=5.0,
+        latency_sigma=0.0,
+    )
+    process, domain = start_shop(config)
+    yield config, domain
+    process.terminate()
+    process.join()
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from crawler.utils.canonicalize import CanonicalizationRules, UrlCanonicalizer
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://shop.com/products/a", "https://shop.com/products/a"),
+    # Host and scheme case, www and https
+    ("HTTP://WWW.Shop.com/Products/A", "https://shop.com/Products/A"),
+    ("http://shop.com", "https://shop.com/"),
+    # Default ports of the original and of the rewritten scheme
+    ("http://shop.com:80/x", "https://shop.com/x"),
+    ("https://shop.com:443/x", "https://shop.com/x"),
+    ("http://shop.com:8080/x", "https://shop.com:8080/x"),
+    ("https://shop.com:8443/x", "https://shop.com:8443/x"),
+    # Trailing slash
+    ("https://shop.com/collections/shoes/", "https://shop.com/collections/shoes"),
+    ("https://shop.com/collections//", "https://shop.com/collections"),
+    ("https://shop.com/", "https://shop.com/"),
+    # Query order, tracking parameters and empty parameters
+    ("https://shop.com/s?q=boots&color=red", "https://shop.com/s?color=red&q=boots"),
+    ("https://shop.com/s?utm_source=x&q=1&gclid=2&&UTM_Medium=y", "https://shop.com/s?q=1"),
+    ("https://shop.com/s?utm_source=x", "https://shop.com/s"),
+    # Fragment
+    ("https://shop.com/products/a#reviews", "https://shop.com/products/a"),
+    # IPv6 host
+    ("http://[::1]:8080/x", "https://[::1]:8080/x"),
+    # Unparseable port
+    ("https://shop.com:port/x", "https://shop.com:port/x"),
+])
+def test_canonicalize(url, expected):
+    assert UrlCanonicalizer().canonicalize(url) == expected
+
+def test_rules_can_be_disabled():
+    rules = CanonicalizationRules(
+        strip_www=False,
+        force_https=False,
+        strip_trailing_slash=False,
+        sort_query=False,
+        drop_fragment=False,
+    )
+    canonicalizer = UrlCanonicalizer(rules)
+    assert canonicalizer.canonicalize("http://www.shop.com:80/a/?b=1&a=2#top") == "http://www.shop.com/a/?b=1&a=2#top"
+
+def test_preferred_host():
+    canonicalizer = UrlCanonicalizer()
+    assert canonicalizer.canonical_host("www.shop.com") == "shop.com"
+    # The site turned out to be served from www: both forms use it
+    canonicalizer.prefer_host("WWW.shop.com")
+    assert canonicalizer.canonicalize("https://shop.com/a") == "https://www.shop.com/a"
+    assert canonicalizer.canonicalize("http://www.shop.com/a") == "https://www.shop.com/a"
+    assert canonicalizer.canonical_host("shop.com") == "www.shop.com"
+    # The first response decides
+    canonicalizer.prefer_host("shop.com")
+    assert canonicalizer.canonicalize("https://shop.com/a") == "https://www.shop.com/a"
+    # Other hosts are unaffected
+    assert canonicalizer.canonicalize("https://www.other.com/a") == "https://other.com/a"
+
+def test_preferred_host_needs_strip_www():
+    canonicalizer = UrlCanonicalizer(domain_rules={"shop.com": CanonicalizationRules(strip_www=False)})
+    canonicalizer.prefer_host("www.shop.com")
+    assert canonicalizer.canonicalize("https://shop.com/a") == "https://shop.com/a"
+
+def test_domain_rules_from_file(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({
+        "default": {"drop_params": ["sort"]},
+        "domains": {"www.shop.com": {"keep_params": ["id", "page"], "force_https": False}},
+    }))
+    canonicalizer = UrlCanonicalizer.from_file(str(path))
+    assert canonicalizer.canonicalize("http://other.com/s?sort=asc&utm_id=1&q=x") == "https://other.com/s?q=x"
+    assert canonicalizer.canonicalize("http://shop.com/p?page=2&q=x&id=7") == "http://shop.com/p?id=7&page=2"
+    assert canonicalizer.canonicalize("http://shop.com:80/p") == "http://shop.com/p"
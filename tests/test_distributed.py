@@ -0,0 +1,91 @@
+import asyncio
+
+from crawler.crawler import EcommerceCrawler
+from crawler.distributed import (
+    CrawlCoordinator,
+    CrawlWorker,
+    open_connection,
+    read_message,
+    send_message,
+)
+from crawler.utils.canonicalize import UrlCanonicalizer
+
+def _coordinator(tmp_path, **kwargs):
+    return CrawlCoordinator(
+        f"unix:{tmp_path / 'coordinator.sock'}",
+        max_depth=6,
+        output_dir=str(tmp_path / "output"),
+        batch_size=5,
+        canonicalizer=UrlCanonicalizer(),
+        **kwargs
+    )
+
+def _worker(tmp_path, coordinator):
+    crawler = EcommerceCrawler(
+        output_dir=str(tmp_path / "worker"),
+        crawl_delay=0,
+        max_concurrent_requests=4,
+        sitemap_mode="off",
+    )
+    return CrawlWorker(coordinator.address, crawler, slots=2)
+
+def test_worker_crawls_every_lease(tmp_path, shop):
+    config, domain = shop
+    coordinator = _coordinator(tmp_path)
+    worker = _worker(tmp_path, coordinator)
+
+    async def run():
+        results, _ = await asyncio.wait_for(
+            asyncio.gather(coordinator.run([domain]), worker.run()), timeout=60
+        )
+        return results
+
+    stats = asyncio.run(run())[domain]["stats"]
+    assert stats["total_urls_found"] == config.catalog_size
+    assert stats["total_urls_visited"] == worker.pages_fetched
+    assert stats["leases_granted"] > 1
+    assert stats["leases_reassigned"] == 0
+    assert coordinator.workers_lost == 0
+    assert coordinator.product_files
+
+def test_expired_and_lost_leases_are_reassigned(tmp_path, shop):
+    config, domain = shop
+    coordinator = _coordinator(tmp_path, lease_timeout=0.4)
+    worker = _worker(tmp_path, coordinator)
+
+    async def stalled_worker():
+        # Takes the start URL and never renews it or reports back
+        reader, writer = await CrawlWorker(coordinator.address, None)._connect()
+        await send_message(writer, {"type": "lease"})
+        stale = await read_message(reader)
+        await asyncio.sleep(1.0)
+        # The lease was reassigned when it expired: its late result is dropped
+        await send_message(writer, {"type": "result", "lease": stale["lease"], "pages": [
+            {"url": url, "links": [], "products": [f"https://{domain}/products/stale"]}
+            for url, _ in stale["urls"]
+        ]})
+        return stale
+
+    async def lost_worker():
+        # Disconnects while holding a lease
+        await asyncio.sleep(1.2)
+        reader, writer = await open_connection(coordinator.address)
+        await send_message(writer, {"type": "lease"})
+        message = await read_message(reader)
+        writer.close()
+        return message
+
+    async def run():
+        crawl = asyncio.create_task(coordinator.run([domain]))
+        stale = await stalled_worker()
+        lost = await lost_worker()
+        await asyncio.wait_for(asyncio.gather(crawl, worker.run()), timeout=60)
+        return crawl.result(), stale, lost
+
+    results, stale, lost = asyncio.run(run())
+    stats = results[domain]["stats"]
+    assert stale["urls"] == [[f"https://{domain}/", 0]]
+    assert lost["urls"] == stale["urls"]
+    assert stats["leases_reassigned"] == 2
+    assert coordinator.workers_lost == 1
+    assert stats["total_urls_found"] == config.catalog_size
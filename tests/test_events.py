@@ -0,0 +1,40 @@
+import asyncio
+from contextlib import aclosing
+
+from crawler.crawler import EcommerceCrawler
+
+def test_slow_consumer_holds_the_crawl_back_and_break_stops_it(tmp_path, shop):
+    config, domain = shop
+    crawler = EcommerceCrawler(
+        output_dir=str(tmp_path),
+        crawl_delay=0,
+        max_concurrent_requests=2,
+        max_depth=6,
+        sitemap_mode="off",
+    )
+
+    async def run():
+        pages = 0
+        async with aclosing(crawler.stream([domain], max_pending_events=5)) as events:
+            async for event in events:
+                assert event.kind != "domain"
+                pages += event.kind == "page"
+                await asyncio.sleep(0.01)
+                if pages == 20:
+                    break
+        limiter = crawler.rate_limiters[domain]
+        requests = limiter.requests
+        # Only pages whose events did not fit in the channel and the ones in
+        # flight were fetched ahead of the consumer (plus the host probe)
+        assert requests <= pages + 5 + crawler.max_concurrent_requests + 1
+
+        await asyncio.sleep(0.3)
+        assert limiter.requests == requests
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+        return requests
+
+    requests = asyncio.run(run())
+    # Far fewer pages than the whole shop were fetched
+    assert requests < config.catalog_size
+    assert crawler._events is None
+    assert crawler._session is None
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+
+from crawler.frontier import Frontier, TemplateBudget
+
+def test_pagination_is_exempt_from_template_budget():
+    budget = TemplateBudget(max_urls=10)
+    admitted = [budget.admit(f"https://s.com/category/7?page={page}") for page in range(1, 50)]
+    assert all(admitted)
+
+def test_other_urls_are_cut_off_at_budget(caplog):
+    budget = TemplateBudget(max_urls=10, domain="s.com")
+    with caplog.at_level(logging.INFO, logger="crawler.frontier"):
+        admitted = [budget.admit(f"https://s.com/calendar/{day}") for day in range(20)]
+    assert admitted.count(True) == 10
+    assert budget.stats()["throttled"][0]["reason"] == "budget"
+    assert any("budget of 10" in record.getMessage() for record in caplog.records)
+
+def test_unproductive_pagination_is_throttled():
+    budget = TemplateBudget(max_urls=10, probe_pages=5)
+    for page in range(1, 6):
+        url = f"https://s.com/category/7?page={page}"
+        assert budget.admit(url)
+        budget.record_page(url, 0, [f"https://s.com/category/7?page={page + 1}"])
+    assert not budget.admit("https://s.com/category/7?page=7")
+
+def test_frontier_respects_max_depth():
+    frontier = Frontier(max_depth=2)
+    assert frontier.add("https://s.com/", 0)
+    assert frontier.add("https://s.com/a", 2)
+    assert not frontier.add("https://s.com/b", 3)
+    assert len(frontier) == 2
+    # A URL refused as too deep can still be found at an allowed depth
+    assert frontier.add("https://s.com/b", 1)
+
+def test_frontier_rejects_duplicates():
+    frontier = Frontier(max_depth=3)
+    assert frontier.add("https://s.com/a", 1)
+    assert not frontier.add("https://s.com/a", 1)
+    assert not frontier.add("https://s.com/a", 0)
+    assert len(frontier) == 1
+
+    async def drain():
+        entry = await frontier.get()
+        frontier.task_done()
+        return entry
+
+    assert asyncio.run(drain()) == ("https://s.com/a", 1)
+    # Processed URLs stay seen
+    assert not frontier.add("https://s.com/a", 2)
+
+def test_close_drops_queued_urls_and_waits_for_held_ones():
+    async def run():
+        frontier = Frontier(max_depth=3)
+        for i in range(10):
+            frontier.add(f"https://s.com/{i}", 1)
+        # Two workers hold an entry each when the budget runs out
+        held = [await frontier.get(), await frontier.get()]
+        assert frontier.close() == 8
+        assert len(frontier) == 0
+
+        # Links found by the workers are refused
+        assert not frontier.add("https://s.com/new", 2)
+        join = asyncio.create_task(frontier.join())
+        await asyncio.sleep(0.01)
+        assert not join.done()
+        for _ in held:
+            frontier.task_done()
+        await asyncio.wait_for(join, timeout=1)
+        return held
+
+    assert asyncio.run(run()) == [("https://s.com/0", 1), ("https://s.com/1", 1)]
+
+def test_prioritized_frontier_and_restore():
+    async def run():
+        frontier = Frontier(max_depth=3, prioritized=True)
+        frontier.restore(
+            ["https://s.com/", "https://s.com/done"],
+            [("https://s.com/deep", 3), ("https://s.com/done", 1), ("https://s.com/shallow", 1)],
+        )
+        frontier.add("https://s.com/best", 2, priority=5.0)
+        assert not frontier.add("https://s.com/done", 1)
+        order = []
+        while len(frontier):
+            order.append(await frontier.get())
+            frontier.task_done()
+        await frontier.join()
+        return order
+
+    assert asyncio.run(run()) == [
+        ("https://s.com/best", 2),
+        ("https://s.com/shallow", 1),
+        ("https://s.com/deep", 3),
+    ]
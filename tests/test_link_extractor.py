@@ -0,0 +1,60 @@
+import pytest
+
+from crawler.utils.link_extractor import SoupLinkExtractor, StreamingLinkExtractor
+
+FIXTURE = """<!DOCTYPE html>
+<html><head>
+<title>Shoes &amp; boots</title>
+<link rel="stylesheet" href="/static/site.css">
+<link rel="next" href="/collections/shoes?page=2">
+<style>
+  .promo::after { content: '<a href="/from-style">'; }
+</style>
+<script type="text/javascript">
+  var tpl = '<a href="/from-script">' + "</scr" + "ipt>";
+  if (a < b && c > d) { document.write("<a href='/from-script-2'>x</a>"); }
+</script>
+<script type="text/template" id="card"><a href="/from-template-script">{{name}}</a></script>
+<SCRIPT src="/app.js"></SCRIPT >
+</head><body>
+<!-- <a href="/from-comment">old nav</a> -->
+<nav><a class="nav" href="/collections/shoes">Shoes</a> <a href='/collections/boots'>Boots</a></nav>
+<!--
+  multi-line comment <a href="/from-comment-2">
+  -- still a comment
+-->
+<a href="/products/runner?color=red&amp;size=9" title="Runner > fast">Runner</a>
+<a data-x="1" href=/products/trail>Trail</a>
+<template><a href="/from-template">Template</a></template>
+<noscript><a href="/from-noscript">No JS</a></noscript>
+<a name="top">No href</a>
+<a href="  /products/padded  ">Padded</a>
+<!----><a href="/after-empty-comment">After</a>
+</body></html>
+"""
+
+def _extract(extractor_class, html, chunk_size):
+    extractor = extractor_class()
+    for start in range(0, len(html), chunk_size):
+        extractor.feed(html[start:start + chunk_size])
+    return extractor.close()
+
+def test_streaming_skips_comments_scripts_and_styles():
+    links = _extract(StreamingLinkExtractor, FIXTURE, len(FIXTURE))
+    assert links == [
+        "/collections/shoes?page=2",
+        "/collections/shoes",
+        "/collections/boots",
+        "/products/runner?color=red&size=9",
+        "/products/trail",
+        "/from-template",
+        "/from-noscript",
+        "/products/padded",
+        "/after-empty-comment",
+    ]
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 16, 64, 1024])
+def test_streaming_matches_soup_across_chunk_boundaries(chunk_size):
+    expected = _extract(SoupLinkExtractor, FIXTURE, len(FIXTURE))
+    links = _extract(StreamingLinkExtractor, FIXTURE, chunk_size)
+    assert sorted(link.strip() for link in links) == sorted(link.strip() for link in expected)
@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from crawler.utils.page_archive import ArchiveReader, PageArchive
+
+def _fail_once(target, name):
+    original = getattr(target, name)
+    calls = []
+
+    def fail(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise OSError(28, "No space left on device")
+        return original(*args, **kwargs)
+
+    setattr(target, name, fail)
+    return calls
+
+def test_archive_keeps_pages_when_a_write_fails(tmp_path):
+    async def run():
+        async with PageArchive(str(tmp_path), flush_interval=60) as archive:
+            archive.add("a.com", "https://a.com/1", b"<html>1</html>", "utf-8")
+            await archive.flush()
+            _fail_once(archive._segment, "write")
+            archive.add("a.com", "https://a.com/2", b"<html>2</html>", "utf-8")
+            with pytest.raises(OSError):
+                await archive.flush()
+            archive.add("a.com", "https://a.com/3", b"<html>3</html>", "utf-8")
+        return archive
+
+    archive = asyncio.run(run())
+    assert archive.pages_written == 3
+    assert archive._pending_bytes == 0
+    reader = ArchiveReader(str(tmp_path))
+    try:
+        assert len(reader.segments()) == 2
+        pages = {
+            url: body
+            for segment in reader.segments()
+            for body, entries in reader.iter_segment(segment)
+            for _, url, _ in entries
+        }
+    finally:
+        reader.close()
+    assert pages == {f"https://a.com/{i}": f"<html>{i}</html>".encode() for i in (1, 2, 3)}
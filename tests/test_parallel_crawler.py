@@ -0,0 +1,48 @@
+import multiprocessing
+import socket
+import threading
+import time
+
+from crawler.parallel_crawler import ParallelCrawler
+
+def _silent_listeners(count):
+    # Accept connections but never answer, so every crawl hangs
+    listeners = []
+    for _ in range(count):
+        listener = socket.socket()
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(16)
+        listeners.append(listener)
+    return listeners
+
+def test_queued_domains_fail_when_all_workers_die(tmp_path):
+    listeners = _silent_listeners(4)
+    domains = [f"127.0.0.1:{listener.getsockname()[1]}" for listener in listeners]
+    crawler = ParallelCrawler(
+        max_processes=1,
+        domains_per_worker=1,
+        output_dir=str(tmp_path),
+        sitemap_mode="off",
+        timeout=60,
+    )
+
+    # Other tests' servers are children of this process too
+    bystanders = set(multiprocessing.active_children())
+
+    def kill_workers():
+        for process in set(multiprocessing.active_children()) - bystanders:
+            process.kill()
+
+    killer = threading.Timer(3.0, kill_workers)
+    killer.start()
+    started = time.monotonic()
+    try:
+        results = dict(crawler.iter_results(domains))
+    finally:
+        killer.cancel()
+        for listener in listeners:
+            listener.close()
+
+    assert sorted(results) == sorted(domains)
+    assert all("error" in result for result in results.values())
+    assert time.monotonic() - started < 30
@@ -0,0 +1,65 @@
+from crawler.utils.product_index import create_product_index
+from crawler.utils.url_patterns import ProductIdExtractor, extract_product_id
+
+def test_nested_handles_are_distinct_products():
+    extractor = ProductIdExtractor()
+    nike = extractor.product_key("https://s.com/products/shoes/nike-air-max")
+    adidas = extractor.product_key("https://s.com/products/shoes/adidas-ultra")
+    assert nike and adidas
+    assert nike != adidas
+
+def test_handle_variants_share_a_key():
+    extractor = ProductIdExtractor()
+    assert (
+        extractor.product_key("https://s.com/products/blue-shirt")
+        == extractor.product_key("https://s.com/products/blue-shirt/?color=red")
+    )
+
+def test_ids_of_different_patterns_do_not_collide():
+    extractor = ProductIdExtractor()
+    keys = {
+        extractor.product_key(url)
+        for url in (
+            "https://s.com/products/123",
+            "https://s.com/items/123",
+            "https://s.com/p/123",
+            "https://s.com/collections/all?product_id=123",
+        )
+    }
+    assert len(keys) == 4
+
+def test_numeric_id_variants_share_a_key():
+    extractor = ProductIdExtractor()
+    keys = {
+        extractor.product_key(url)
+        for url in (
+            "https://s.com/products/123?color=red",
+            "https://s.com/products/123-blue-shirt",
+            "https://s.com/category/shirts/products/123",
+        )
+    }
+    assert len(keys) == 1
+
+def test_extract_product_id_returns_bare_id():
+    assert extract_product_id("https://s.com/dp/B000123456") == "B000123456"
+
+def test_index_keeps_products_with_nested_handles():
+    index = create_product_index(extractor=ProductIdExtractor(), domain="s.com")
+    added = index.add_batch([
+        "https://s.com/products/shoes/nike-air-max",
+        "https://s.com/products/shoes/adidas-ultra",
+        "https://s.com/products/123",
+        "https://s.com/items/123",
+    ])
+    assert len(added) == 4
+
+def test_listing_pages_are_not_variants():
+    index = create_product_index(extractor=ProductIdExtractor(), domain="s.com")
+    index.add("https://s.com/products/shoes")
+    assert not index.is_variant("https://s.com/products/shoes?page=2")
+    assert not index.is_variant("https://s.com/collections/shoes?page=2")
+
+def test_product_variants_are_skipped():
+    index = create_product_index(extractor=ProductIdExtractor(), domain="s.com")
+    index.add("https://s.com/products/123")
+    assert index.is_variant("https://s.com/products/123-blue-shirt")
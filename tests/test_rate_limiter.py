@@ -0,0 +1,91 @@
+import asyncio
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from crawler.crawler import EcommerceCrawler
+from crawler.utils.rate_limiter import RateLimiter, parse_retry_after
+
+def _acquire_times(limiter, count):
+    async def run():
+        started = time.monotonic()
+        times = []
+        for _ in range(count):
+            await limiter.acquire()
+            times.append(time.monotonic() - started)
+        return times
+    return asyncio.run(run())
+
+def test_tokens_refill_at_the_rate_up_to_burst():
+    limiter = RateLimiter(0.1, burst=3)
+    times = _acquire_times(limiter, 5)
+    # Three back to back, then one every delay
+    assert times[2] < 0.05
+    assert times[3] == pytest.approx(0.1, abs=0.04)
+    assert times[4] == pytest.approx(0.2, abs=0.04)
+
+    time.sleep(0.5)
+    # An idle period refills at most burst tokens
+    times = _acquire_times(limiter, 4)
+    assert times[2] < 0.05
+    assert times[3] == pytest.approx(0.1, abs=0.04)
+
+def test_fixed_rate_limit_never_bursts(tmp_path):
+    crawler = EcommerceCrawler(output_dir=str(tmp_path), crawl_delay=0.1, adaptive_rate=False, rate_burst=5)
+    limiter = crawler._create_rate_limiter()
+    assert limiter.burst == 1
+    times = _acquire_times(limiter, 3)
+    assert times[1] == pytest.approx(0.1, abs=0.04)
+
+    crawler = EcommerceCrawler(output_dir=str(tmp_path), crawl_delay=0.1, adaptive_rate=True, rate_burst=5)
+    assert crawler._create_rate_limiter().burst == 5
+
+def test_adaptive_rate_increases_additively_and_backs_off_multiplicatively():
+    limiter = RateLimiter(0.5, adaptive=True, max_rate=4.0, min_rate=0.5)
+    assert limiter.rate == 2.0
+    for _ in range(20):
+        limiter.record_response(200, 0.01)
+    assert limiter.rate == 4.0
+
+    limiter.record_response(429, 0.01)
+    assert limiter.rate == 2.0
+    # Responses to requests sent at the old rate do not cut it again
+    limiter.record_response(503, 0.01)
+    assert limiter.rate == 2.0
+    assert limiter.throttled == 2
+
+    limiter._last_decrease -= 1.0
+    limiter.record_response(503, 0.01)
+    assert limiter.rate == 1.0
+    for _ in range(3):
+        limiter._last_decrease -= 1.0
+        limiter.record_error()
+    assert limiter.rate == 0.5
+
+def test_fixed_rate_ignores_congestion():
+    limiter = RateLimiter(0.5)
+    limiter.record_response(429, 0.01)
+    limiter.record_response(503, 0.01)
+    limiter.record_error()
+    assert limiter.rate == 2.0
+    assert limiter.throttled == 3
+
+@pytest.mark.parametrize("adaptive", [False, True])
+def test_retry_after_pauses_the_host(adaptive):
+    limiter = RateLimiter(0.01, adaptive=adaptive, burst=5)
+    limiter.record_response(429, 0.01, retry_after=0.3)
+    times = _acquire_times(limiter, 2)
+    # Tokens are available, but nothing is sent before the pause ends
+    assert times[0] >= 0.3
+    assert times[1] < 0.4
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after("-5") == 0.0
+    assert parse_retry_after("100000") == 300.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=60)
+    assert parse_retry_after(format_datetime(retry_at, usegmt=True)) == pytest.approx(60, abs=2)
@@ -0,0 +1,46 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+from crawler.utils.result_sink import JsonlResultSink
+
+def _fail_once(target, name):
+    original = getattr(target, name)
+    calls = []
+
+    def fail(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise OSError(28, "No space left on device")
+        return original(*args, **kwargs)
+
+    setattr(target, name, fail)
+    return calls
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_sink_keeps_records_when_a_write_fails(tmp_path, compress):
+    async def run():
+        async with JsonlResultSink(str(tmp_path), compress=compress, flush_interval=60) as sink:
+            for i in range(5):
+                sink.write({"url": f"https://a.com/products/{i}"})
+            await sink.flush()
+            _fail_once(sink._file, "write")
+            for i in range(5, 10):
+                sink.write({"url": f"https://a.com/products/{i}"})
+            with pytest.raises(OSError):
+                await sink.flush()
+            sink.write({"url": "https://a.com/products/10"})
+        return sink
+
+    sink = asyncio.run(run())
+    # The failed flush's records went to a new file with the later ones
+    assert len(sink.files) == 2
+    assert sink.records_written == 11
+    urls = []
+    for path in sink.files:
+        opener = gzip.open if compress else open
+        with opener(path, "rt") as f:
+            urls.extend(json.loads(line)["url"] for line in f)
+    assert urls == [f"https://a.com/products/{i}" for i in range(11)]
@@ -0,0 +1,75 @@
+import asyncio
+
+from crawler.utils.scheduler import FairScheduler
+
+async def _crawl(scheduler, pages, order):
+    async def fetch(domain):
+        async with scheduler.slot(domain):
+            order.append(domain)
+            await asyncio.sleep(0.001)
+
+    # Every page of the heavy domain is queued before the light one starts
+    await asyncio.gather(*(fetch(domain) for domain, count in pages for _ in range(count)))
+
+def test_light_domain_interleaves_with_heavy_one():
+    scheduler = FairScheduler(2)
+    order = []
+    asyncio.run(_crawl(scheduler, [("heavy.com", 40), ("light.com", 5)], order))
+
+    assert len(order) == 45
+    assert scheduler.in_flight == 0
+    # The light domain is served round-robin with the heavy one instead of
+    # waiting for its 40 queued pages
+    last_light = max(i for i, domain in enumerate(order) if domain == "light.com")
+    assert last_light < 14
+    assert scheduler.stats("light.com")["requests"] == 5
+    assert scheduler.stats("heavy.com")["requests"] == 40
+
+def test_weights_set_each_domain_share():
+    scheduler = FairScheduler(1, weights={"big.com": 3.0})
+    order = []
+    asyncio.run(_crawl(scheduler, [("big.com", 30), ("small.com", 30)], order))
+
+    # While both domains wait, big.com gets three slots for each of small.com's
+    contended = order[:40]
+    assert contended.count("big.com") == 30
+    assert contended.count("small.com") == 10
+
+def test_cancelled_waiters_do_not_leak_slots():
+    async def run():
+        scheduler = FairScheduler(1)
+        await scheduler.acquire("a.com")
+
+        waiting = asyncio.create_task(scheduler.acquire("b.com"))
+        granted = asyncio.create_task(scheduler.acquire("c.com"))
+        later = asyncio.create_task(scheduler.acquire("d.com"))
+        await asyncio.sleep(0.01)
+        assert scheduler.in_flight == 1
+
+        # Cancelled while waiting: skipped when the slot is freed
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        scheduler.release()
+        assert scheduler.in_flight == 1
+        # Cancelled after the slot was granted, before it resumed
+        granted.cancel()
+        await asyncio.gather(granted, return_exceptions=True)
+        assert waiting.cancelled() and granted.cancelled()
+
+        # Both slots went back to the pool and on to the next waiter
+        await asyncio.wait_for(later, timeout=1)
+        assert scheduler.in_flight == 1
+        scheduler.release()
+        assert scheduler.in_flight == 0
+
+        # Nothing is left queued: a new request is granted at once
+        await asyncio.wait_for(scheduler.acquire("e.com"), timeout=1)
+        scheduler.release()
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert scheduler.in_flight == 0
+    assert not scheduler._waiters and not scheduler._ready
+    assert scheduler.stats("b.com")["requests"] == 0
+    assert scheduler.stats("c.com")["requests"] == 1
+    assert scheduler.stats("d.com")["requests"] == 1
@@ -0,0 +1,49 @@
+import pytest
+
+from crawler.utils.seen_set import BloomSeenSet, ExactSeenSet, create_seen_set
+
+def _urls(prefix, count):
+    return [f"https://shop.com/{prefix}/{i}?page={i % 7}" for i in range(count)]
+
+def test_exact_set_grows_past_capacity():
+    seen = ExactSeenSet(capacity=16)
+    initial_bytes = seen.memory_bytes()
+    urls = _urls("seen", 20000)
+    assert all(seen.add(url) for url in urls)
+    assert len(seen) == len(urls)
+    assert seen.memory_bytes() > initial_bytes
+
+    assert all(url in seen for url in urls)
+    assert not any(seen.add(url) for url in urls)
+    assert len(seen) == len(urls)
+    assert not any(url in seen for url in _urls("unseen", 20000))
+
+@pytest.mark.parametrize("fp_rate", [0.01, 0.001])
+def test_bloom_set_keeps_its_error_rate_past_capacity(fp_rate):
+    seen = BloomSeenSet(capacity=1000, fp_rate=fp_rate)
+    urls = _urls("seen", 30000)
+    added = sum(seen.add(url) for url in urls)
+    # A new URL is only rejected by a false positive; fewer of them are
+    # measured below
+    assert len(seen) == added
+    assert added >= len(urls) * (1 - 2 * fp_rate)
+    assert seen.stats()["filters"] > 1
+
+    # Never a false negative
+    assert all(url in seen for url in urls)
+    assert not any(seen.add(url) for url in urls)
+
+    unseen = _urls("unseen", 100000)
+    false_positives = sum(url in seen for url in unseen)
+    assert false_positives / len(unseen) < fp_rate
+
+def test_bloom_set_rejects_invalid_error_rates():
+    for fp_rate in (0, 1, -0.5):
+        with pytest.raises(ValueError):
+            BloomSeenSet(fp_rate=fp_rate)
+
+def test_create_seen_set():
+    assert isinstance(create_seen_set("exact"), ExactSeenSet)
+    assert isinstance(create_seen_set("bloom", 100, 0.01), BloomSeenSet)
+    with pytest.raises(ValueError):
+        create_seen_set("nope")
@@ -0,0 +1,83 @@
+import asyncio
+import multiprocessing
+import sqlite3
+import time
+
+from crawler.crawler import EcommerceCrawler
+from crawler.utils.state_store import CrawlStateStore
+from crawler.utils.url_patterns import is_product_url
+
+def _crawler(tmp_path, resume, crawl_delay):
+    return EcommerceCrawler(
+        output_dir=str(tmp_path / "output"),
+        state_file=str(tmp_path / "state.sqlite"),
+        resume=resume,
+        checkpoint_interval=0.05,
+        crawl_delay=crawl_delay,
+        max_concurrent_requests=2,
+        max_depth=6,
+        sitemap_mode="off",
+    )
+
+def _crawl(tmp_path, domain, resume, crawl_delay=0.0) -> None:
+    asyncio.run(_crawler(tmp_path, resume, crawl_delay).crawl_domains([domain]))
+
+def _visited_rows(path) -> int:
+    try:
+        with sqlite3.connect(f"file:{path}?mode=ro", uri=True) as conn:
+            return conn.execute("SELECT COUNT(*) FROM urls WHERE done = 1").fetchone()[0]
+    except sqlite3.Error:
+        return 0
+
+async def _load(path, domain):
+    async with CrawlStateStore(path) as store:
+        return await store.load_domain(domain)
+
+def test_resume_after_killed_crawl(tmp_path, shop):
+    config, domain = shop
+    state_file = str(tmp_path / "state.sqlite")
+
+    # Paced so the crawl is still running when it is killed
+    process = multiprocessing.Process(target=_crawl, args=(tmp_path, domain, False, 0.05))
+    process.start()
+    deadline = time.monotonic() + 30
+    while _visited_rows(state_file) < 10 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    process.kill()
+    process.join()
+
+    checkpoint = asyncio.run(_load(state_file, domain))
+    assert checkpoint["status"] == "running"
+    assert len(checkpoint["visited"]) >= 10
+    assert checkpoint["pending"]
+    pending = {url for url, _ in checkpoint["pending"]}
+    assert not pending & set(checkpoint["visited"])
+    assert all(is_product_url(url) for url in checkpoint["product_urls"])
+
+    _crawl(tmp_path, domain, True)
+    final = asyncio.run(_load(state_file, domain))
+    assert final["status"] == "complete"
+    assert not final["pending"]
+    assert set(checkpoint["visited"]) <= set(final["visited"])
+    assert set(checkpoint["product_urls"]) <= set(final["product_urls"])
+    assert len(final["product_urls"]) == config.catalog_size
+
+def test_domain_updates_do_not_interleave_with_checkpoints(tmp_path):
+    async def run():
+        async with CrawlStateStore(str(tmp_path / "state.sqlite"), checkpoint_interval=0.001) as store:
+            await store.reset_domain("a.com")
+            for round_ in range(50):
+                for i in range(200):
+                    store.record_enqueued("a.com", f"https://a.com/{round_}/{i}", 1)
+                    store.record_products("a.com", [f"https://a.com/products/{round_}-{i}"])
+                await asyncio.gather(
+                    store.flush(),
+                    store.reset_domain("b.com"),
+                    store.mark_domain_complete("c.com", {"round": round_}),
+                )
+            return await store.load_domain("a.com"), await store.load_domain("c.com")
+
+    a, c = asyncio.run(run())
+    assert len(a["pending"]) == 50 * 200
+    assert len(a["product_urls"]) == 50 * 200
+    assert c["stats"] == {"round": 49}